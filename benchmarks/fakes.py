@@ -0,0 +1,138 @@
+import random
+import numpy as np
+import pandas as pd
+from fund.providers.fundamental_data_provider import FundamentalDataProvider
+from fund.providers.records import SeriesBatch
+from fund.repositories.fundamental_data_repository import SERIES_COLUMNS
+
+# 真實 Ticker.info 約有 150 個鍵，其中 40 個會被寫入資料表
+FILLER_KEYS = [f'extraField{i}' for i in range(110)]
+
+def synthetic_info(ticker: str, seed=0):
+    """產生與 yfinance Ticker.info 結構相近的假資料"""
+    rng = random.Random(f"{ticker}:{seed}")
+    info = {
+        'symbol': ticker,
+        'shortName': f'{ticker} Holdings',
+        'sector': rng.choice(['Technology', 'Financial Services', 'Industrials']),
+        'industry': 'Semiconductors',
+        'country': 'Taiwan',
+        'currency': 'TWD',
+        'exchange': 'TAI',
+        'marketCap': rng.randint(10**8, 10**13),
+        'trailingPE': rng.uniform(5, 60),
+        'forwardPE': rng.uniform(5, 60),
+        'priceToBook': rng.uniform(0.5, 10),
+        'priceToSalesTrailing12Months': rng.uniform(0.5, 20),
+        'enterpriseToRevenue': rng.uniform(0.5, 20),
+        'enterpriseToEbitda': rng.uniform(2, 40),
+        'pegRatio': rng.uniform(0.1, 5),
+        'debtToEquity': rng.uniform(0, 300),
+        'currentRatio': rng.uniform(0.2, 5),
+        'quickRatio': rng.uniform(0.1, 4),
+        'totalCash': rng.randint(10**6, 10**11),
+        'totalDebt': rng.randint(10**6, 10**11),
+        'returnOnEquity': rng.uniform(-0.2, 0.5),
+        'returnOnAssets': rng.uniform(-0.1, 0.3),
+        'profitMargins': rng.uniform(-0.1, 0.5),
+        'operatingMargins': rng.uniform(-0.1, 0.5),
+        'grossMargins': rng.uniform(0, 0.8),
+        'revenueGrowth': rng.uniform(-0.3, 0.6),
+        'earningsGrowth': rng.uniform(-0.5, 1.0),
+        'totalRevenue': rng.randint(10**7, 10**12),
+        'netIncomeToCommon': rng.randint(10**6, 10**11),
+        'dividendYield': rng.uniform(0, 0.08),
+        'dividendRate': rng.uniform(0, 20),
+        'payoutRatio': rng.uniform(0, 1),
+        'exDividendDate': 1718928000,
+        'beta': rng.uniform(0.3, 2),
+        'bookValue': rng.uniform(5, 300),
+        'sharesOutstanding': rng.randint(10**7, 10**10),
+        'currentPrice': rng.uniform(10, 1200),
+        'fiftyTwoWeekHigh': rng.uniform(100, 1200),
+        'fiftyTwoWeekLow': rng.uniform(10, 100),
+        'averageVolume': rng.randint(10**4, 10**8),
+    }
+    for key in FILLER_KEYS:
+        info[key] = rng.random()
+    return info
+
+def synthetic_series(length, freq='MS', end='2025-10-01', seed=0):
+    """產生 FRED 風格的時間序列 (DatetimeIndex, float64)"""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(end=end, periods=length, freq=freq)
+    values = 100 + np.cumsum(rng.normal(0.2, 1.0, size=length))
+    return pd.Series(values, index=index)
+
+class FakeFred:
+    """以合成資料回應 get_series 的 FRED 用戶端"""
+
+    FREQUENCIES = {
+        'CPIAUCSL': 'MS',
+        'PAYEMS': 'MS',
+        'DCOILWTICO': 'B',
+    }
+
+    def __init__(self, length=600):
+        self.length = length
+        self._cache = {}
+
+    def get_series(self, series_id, **kwargs):
+        if series_id not in self._cache:
+            self._cache[series_id] = synthetic_series(self.length, self.FREQUENCIES.get(series_id, 'MS'))
+        return self._cache[series_id].copy()
+
+class FakeFundamentalDataProvider(FundamentalDataProvider):
+    """不連網的 FundamentalDataProvider，上游呼叫改以合成資料回應"""
+
+    def __init__(self, series_length=600, seed=0):
+        self.fred = FakeFred(series_length)
+        self.series_length = series_length
+        self.seed = seed
+
+    def _ensure_fred_available(self):
+        pass
+
+    def _ticker_info(self, ticker: str):
+        return synthetic_info(ticker, self.seed)
+
+    def _price_history(self, ticker: str, **kwargs):
+        series = synthetic_series(self.series_length, 'B', seed=self.seed)
+        return pd.DataFrame({'Open': series, 'High': series + 1, 'Low': series - 1, 'Close': series, 'Volume': 1000})
+
+class InMemoryRepository:
+    """以 dict 模擬 FundamentalDataRepository 的寫入語意 (先比對再更新)"""
+
+    def __init__(self):
+        self.tables = {}
+        self.writes = 0
+
+    def _table(self, market: str):
+        return self.tables.setdefault(market, {})
+
+    def save_fundamental_data(self, market: str, data):
+        table = self._table(market)
+        if market in SERIES_COLUMNS:
+            data_list = data if isinstance(data, (list, SeriesBatch)) else [data]
+            for item in data_list:
+                if table.get(item['date']) != item:
+                    table[item['date']] = dict(item)
+                    self.writes += 1
+            return
+        symbol = data['symbol']
+        if table.get(symbol) != data:
+            table[symbol] = dict(data)
+            self.writes += 1
+
+    def list_symbols(self, market: str):
+        return sorted(self._table(market))
+
+    def get_fundamental_data(self, market: str, symbol: str):
+        return self._table(market).get(symbol)
+
+    def get_series_range(self, market: str, start_date=None, end_date=None):
+        return [row for date, row in sorted(self._table(market).items())
+                if (not start_date or date >= start_date) and (not end_date or date <= end_date)]
+
+    def get_last_update(self, market: str):
+        return self.writes
@@ -0,0 +1,160 @@
+"""離線效能基準測試
+
+用法:
+    python -m benchmarks.run                       # 執行並與 baseline.json 比對
+    python -m benchmarks.run --update-baseline     # 以本次結果更新基準
+    python -m benchmarks.run --symbols 5000 --series-length 1200 --baseline large.json --update-baseline
+
+基準檔案記錄產生時的資料規模 (--symbols/--series-length)，只與相同規模的執行結果比對。
+任一項指標較基準退步超過容許比例，或基準檔案/指標缺漏、規模不符時以非零狀態碼結束。
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from benchmarks.fakes import FakeFundamentalDataProvider, InMemoryRepository
+from fund.services.fundamental_data_service import FundamentalDataService
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# 指標名稱 -> 是否越大越好
+METRICS = {
+    'ingest_symbols_per_sec': True,
+    'cpi_range_rows_per_sec': True,
+    'nfp_range_rows_per_sec': True,
+    'oil_range_rows_per_sec': True,
+    'gold_range_rows_per_sec': True,
+    'cli_startup_seconds': False,
+    'ingest_peak_memory_mib': False,
+}
+
+def bench_ingest(n_symbols, series_length):
+    """股票基本面寫入吞吐量與峰值記憶體"""
+    service = FundamentalDataService(FakeFundamentalDataProvider(series_length), InMemoryRepository())
+    symbols = [str(1000 + i) for i in range(n_symbols)]
+    tracemalloc.start()
+    start = time.perf_counter()
+    for symbol in symbols:
+        service.fetch_and_store(symbol, 'tw')
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'ingest_symbols_per_sec': n_symbols / elapsed,
+        'ingest_peak_memory_mib': peak / 1024 / 1024,
+    }
+
+def bench_ranges(series_length, repeat):
+    """總經/大宗商品期間查詢 (provider 轉換 + repository 寫入) 的每秒列數"""
+    service = FundamentalDataService(FakeFundamentalDataProvider(series_length), InMemoryRepository())
+    start_date, end_date = '1900-01-01', '2100-01-01'
+    cases = {
+        'cpi': service.fetch_and_store_cpi_us_range,
+        'nfp': service.fetch_and_store_nfp_us_range,
+        'oil': service.fetch_and_store_oil_price_range,
+        'gold': service.fetch_and_store_gold_price_range,
+    }
+    results = {}
+    for name, fetch in cases.items():
+        rows = 0
+        start = time.perf_counter()
+        for _ in range(repeat):
+            rows += len(fetch(start_date, end_date))
+        results[f'{name}_range_rows_per_sec'] = rows / (time.perf_counter() - start)
+    return results
+
+def bench_cli_startup(repeat):
+    """CLI 模組載入時間 (取中位數)"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'import fund.fundamental'], check=True)
+        samples.append(time.perf_counter() - start)
+    return {'cli_startup_seconds': statistics.median(samples)}
+
+def load_baseline(path):
+    """讀取基準檔案，回傳 (資料規模, 指標)；檔案不存在時回傳 (None, {})"""
+    if not os.path.exists(path):
+        return None, {}
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data.get('params'), data.get('metrics', {})
+
+def missing_metrics(results, baseline):
+    """本次有量測但基準中缺少的指標"""
+    return [name for name in METRICS if name in results and name not in baseline]
+
+def compare(results, baseline, tolerance):
+    """與基準比對，回傳退步項目 (只比對本次有量測且基準中存在的指標)"""
+    regressions = []
+    for name, higher_is_better in METRICS.items():
+        if name not in results or name not in baseline:
+            continue
+        current, expected = results[name], baseline[name]
+        if higher_is_better:
+            regressed = current < expected * (1 - tolerance)
+        else:
+            regressed = current > expected * (1 + tolerance)
+        if regressed:
+            regressions.append((name, expected, current))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='fund 離線效能基準測試')
+    parser.add_argument('--symbols', type=int, default=2000, help='寫入的股票數量')
+    parser.add_argument('--series-length', type=int, default=600, help='合成時間序列長度')
+    parser.add_argument('--repeat', type=int, default=5, help='期間查詢與 CLI 啟動重複次數')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='容許退步比例')
+    parser.add_argument('--baseline', type=str, default=BASELINE_PATH, help='基準檔案路徑')
+    parser.add_argument('--update-baseline', action='store_true', help='以本次結果覆寫基準')
+    parser.add_argument('--skip-cli', action='store_true', help='略過 CLI 啟動時間量測')
+    args = parser.parse_args()
+
+    results = {}
+    results.update(bench_ingest(args.symbols, args.series_length))
+    results.update(bench_ranges(args.series_length, args.repeat))
+    if not args.skip_cli:
+        results.update(bench_cli_startup(args.repeat))
+
+    for name, value in results.items():
+        print(f"  {name:<28} {value:>14.3f}")
+
+    params = {'symbols': args.symbols, 'series_length': args.series_length}
+    recorded, baseline = load_baseline(args.baseline)
+
+    if args.update_baseline:
+        # 相同規模時保留本次未量測的指標 (例如 --skip-cli 時的 CLI 啟動時間)
+        if recorded != params:
+            baseline = {}
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'params': params, 'metrics': baseline}, f, indent=2)
+            f.write('\n')
+        print(f"✓ baseline updated: {args.baseline}")
+        return 0
+
+    if not baseline:
+        print(f"✗ baseline not found: {args.baseline} (run with --update-baseline first)")
+        return 1
+    if recorded != params:
+        print(f"✗ baseline {args.baseline} was recorded with {recorded}, current run uses {params} "
+              f"(rerun with the same parameters or use another --baseline)")
+        return 1
+    missing = missing_metrics(results, baseline)
+    if missing:
+        print(f"✗ metrics missing from baseline: {', '.join(missing)} (run with --update-baseline)")
+        return 1
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        for name, expected, current in regressions:
+            print(f"✗ REGRESSION {name}: baseline={expected:.3f} current={current:.3f}")
+        return 1
+    print("✓ no regressions against baseline")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from fund.repositories.fundamental_data_repository import FUNDAMENTAL_COLUMNS
+from fund.services.query_service import QueryService
+
+# 篩選時以字串比對的欄位，其餘欄位皆轉為數值
+TEXT_COLUMNS = ('symbol', 'shortName', 'sector', 'industry', 'country', 'currency', 'financialCurrency', 'exchange', 'exDividendDate')
+
+SCREEN_SUFFIXES = {
+    '_min': '>=',
+    '_max': '<=',
+    '_gt': '>',
+    '_lt': '<',
+}
+
+def parse_screen_query(query):
+    """將查詢字串轉為篩選條件，例: trailingPE_max=15&sector=Technology&order=-marketCap"""
+    filters = []
+    order_by = None
+    descending = False
+    limit = 100
+    for name, values in sorted(query.items()):
+        value = values[-1]
+        if name == 'order':
+            descending = value.startswith('-')
+            order_by = value.lstrip('-')
+            continue
+        if name == 'limit':
+            limit = max(1, min(int(value), 1000))
+            continue
+        if name == 'fx':
+            continue
+        column, op = name, '='
+        for suffix, suffix_op in SCREEN_SUFFIXES.items():
+            if name.endswith(suffix) and name[:-len(suffix)] in FUNDAMENTAL_COLUMNS:
+                column, op = name[:-len(suffix)], suffix_op
+                break
+        if column not in FUNDAMENTAL_COLUMNS:
+            raise ValueError(f"不支援的篩選欄位: {name}")
+        filters.append((column, op, value if column in TEXT_COLUMNS else float(value)))
+    return filters, order_by, descending, limit
+
+class FundamentalApiHandler(BaseHTTPRequestHandler):
+    """唯讀 HTTP/JSON API
+
+    GET /symbols/{market}
+    GET /symbols/{market}/{symbol}
+    GET /screen/{market}?{column}_min=&{column}_max=&order=-{column}&limit=
+    GET /screen/all?...  (unified 資料表配置下跨市場篩選)
+    GET /screen/{market}?...&fx=USD  (金額欄位以報告幣別篩選、排序與輸出)
+    GET /macro/{cpi|nfp|oil|gold}?start=&end=
+    GET /health
+    """
+
+    query_service = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        # 預設會將每個請求寫入 stderr，熱路徑上關閉
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split('/') if p]
+        query = parse_qs(url.query)
+        try:
+            entry = self._route(parts, query)
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        except Exception as e:
+            self._send_json(500, {'error': str(e)})
+            return
+        if entry is None:
+            self._send_json(404, {'error': 'not found'})
+            return
+        if isinstance(entry, dict):
+            self._send_json(200, entry)
+            return
+        self._send_cached(entry)
+
+    def _route(self, parts, query):
+        service = self.query_service
+        if parts == ['health']:
+            return {'status': 'ok', 'cache': service.stats()}
+        if len(parts) == 2 and parts[0] == 'symbols':
+            return service.list_symbols(parts[1])
+        if len(parts) == 3 and parts[0] == 'symbols':
+            return service.get_symbol(parts[1], parts[2])
+        if len(parts) == 2 and parts[0] == 'screen':
+            filters, order_by, descending, limit = parse_screen_query(query)
+            currency = query.get('fx', [None])[-1]
+            return service.screen(parts[1], filters, order_by=order_by, descending=descending, limit=limit,
+                                  currency=currency)
+        if len(parts) == 2 and parts[0] == 'macro':
+            start = query.get('start', [None])[-1]
+            end = query.get('end', [None])[-1]
+            return service.get_series(parts[1], start, end)
+        return None
+
+    def _send_cached(self, entry):
+        etags = [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]
+        if entry.etag in etags or '*' in etags:
+            self.send_response(304)
+            self.send_header('ETag', entry.etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        use_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+        body = entry.gzip_body if use_gzip else entry.body
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('ETag', entry.etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def create_server(host='127.0.0.1', port=8000, cache_size=1024, revalidate_seconds=1.0, query_service=None):
+    """建立 API 伺服器"""
+    service = query_service or QueryService(cache_size=cache_size, revalidate_seconds=revalidate_seconds)
+    handler = type('BoundFundamentalApiHandler', (FundamentalApiHandler,), {'query_service': service})
+    return ThreadingHTTPServer((host, port), handler)
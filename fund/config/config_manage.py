@@ -1,75 +1,150 @@
 import os
 import json
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# 環境變數前綴: FUND_DB_SERVER 覆寫 db_server，FUND_HOME 指定配置目錄
+ENV_PREFIX = "FUND_"
+HOME_ENV = "FUND_HOME"
+
+@contextmanager
+def _file_lock(path):
+    """以鎖定檔序列化跨行程的配置寫入"""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
 
 class ConfigManager:
-    """配置檔案管理類 - 負責配置檔案的創建和 I/O 操作"""
-    
+    """配置檔案管理類 - 負責配置檔案的創建和 I/O 操作
+
+    讀取結果依檔案 mtime 快取，檔案被其他行程改寫時才重新解析；寫入時持有鎖定檔，
+    以最新檔案內容套用變更後整檔取代 (tmp + os.replace)，不會留下寫到一半的檔案。
+    FUND_<KEY> 環境變數優先於配置檔 (例如 FUND_DB_PASSWORD)。
+    """
+
     _instance = None
-    
+
     def __new__(cls):
         """singleton"""
         if cls._instance is None:
             cls._instance = super(ConfigManager, cls).__new__(cls)
             cls._instance._initialized = False
         return cls._instance
-    
+
     def __init__(self):
         if self._initialized:
             return
-            
-        config_dir = os.path.join(os.getcwd(), ".fund")
+
+        config_dir = os.environ.get(HOME_ENV) or os.path.join(os.getcwd(), ".fund")
         os.makedirs(config_dir, exist_ok=True)
+        self.config_dir = config_dir
         self.config_path = os.path.join(config_dir, "config.json")
+        self.lock_path = self.config_path + ".lock"
+        self._stamp = None
         self._config_data = self._load_config()
         self._initialized = True
-    
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.config_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
     def _load_config(self):
         """載入配置檔案"""
-        if os.path.exists(self.config_path):
+        self._stamp = self._file_stamp()
+        if self._stamp is not None:
             try:
                 with open(self.config_path, "r", encoding="utf-8") as f:
                     return json.load(f)
             except (json.JSONDecodeError, FileNotFoundError):
                 return {}
         return {}
-    
+
+    def _revalidate(self):
+        """配置檔 mtime/大小改變時才重新載入"""
+        if self._file_stamp() != self._stamp:
+            self._config_data = self._load_config()
+
     def _save_config(self):
-        """保存配置到 JSON 檔案"""
+        """保存配置到 JSON 檔案 (先寫入暫存檔再取代)"""
         # 移除空值
         config_data = {k: v for k, v in self._config_data.items() if v is not None}
-        
-        with open(self.config_path, "w", encoding="utf-8") as f:
+
+        tmp_path = f"{self.config_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
             json.dump(config_data, f, indent=2, ensure_ascii=False)
-    
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.config_path)
+        self._stamp = self._file_stamp()
+
+    @contextmanager
+    def _mutate(self):
+        """鎖定後以磁碟上的最新內容為基礎修改並寫回，避免覆蓋其他行程的變更"""
+        with _file_lock(self.lock_path):
+            self._config_data = self._load_config()
+            yield self._config_data
+            self._save_config()
+
     def reload(self):
         """重新載入配置"""
         self._config_data = self._load_config()
-    
+
+    def env_override(self, key):
+        """取得環境變數覆寫值 (未設定時回傳 None)"""
+        value = os.environ.get(ENV_PREFIX + key.upper())
+        if value is not None and value[:1] in ('[', '{'):
+            try:
+                return json.loads(value)
+            except json.JSONDecodeError:
+                pass
+        return value
+
     def get(self, key, default=None):
-        """取得配置值"""
+        """取得配置值 (環境變數優先)"""
+        value = self.env_override(key)
+        if value is not None:
+            return value
+        self._revalidate()
         return self._config_data.get(key, default)
-    
+
     def set(self, key, value):
         """設定配置值"""
-        self._config_data[key] = value
-        self._save_config()
-    
+        with self._mutate() as data:
+            data[key] = value
+
     def update(self, **kwargs):
         """批量更新配置"""
-        for key, value in kwargs.items():
-            if value is not None:
-                self._config_data[key] = value
-        self._save_config()
-    
+        with self._mutate() as data:
+            for key, value in kwargs.items():
+                if value is not None:
+                    data[key] = value
+
     def delete(self, key):
         """刪除配置項"""
-        if key in self._config_data:
-            del self._config_data[key]
-            self._save_config()
-    
+        with self._mutate() as data:
+            data.pop(key, None)
+
     def clear_prefix(self, prefix):
         """清除特定前綴的配置項"""
-        keys_to_delete = [k for k in self._config_data.keys() if k.startswith(prefix)]
-        for key in keys_to_delete:
-            del self._config_data[key]
-        self._save_config()
\ No newline at end of file
+        with self._mutate() as data:
+            for key in [k for k in data if k.startswith(prefix)]:
+                del data[key]
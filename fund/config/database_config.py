@@ -31,9 +31,13 @@ class DatabaseConfig:
         """取得資料庫驅動程式"""
         return self._manager.get("db_driver", "ODBC Driver 17 for SQL Server")
 
+    @property
+    def equity_layout(self):
+        """取得股票資料表配置 (per_market: 每市場一表, unified: 共用 fundamental_data_equity)"""
+        return self._manager.get("db_equity_layout", "per_market")
+
     def get_connection_string(self):
         """取得資料庫連線字串"""
-        self._manager.reload()
         return (
             f"DRIVER={{{self.driver}}};"
             f"SERVER={self.server};"
@@ -44,7 +48,6 @@ class DatabaseConfig:
 
     def get_master_connection_string(self):
         """取得連接到 master 資料庫的連線字串"""
-        self._manager.reload()
         return (
             f"DRIVER={{{self.driver}}};"
             f"SERVER={self.server};"
@@ -53,7 +56,8 @@ class DatabaseConfig:
             f"PWD={self.password}"
         )
 
-    def update_database(self, server=None, database=None, username=None, password=None, driver=None):
+    def update_database(self, server=None, database=None, username=None, password=None, driver=None,
+                        equity_layout=None):
         """更新資料庫配置"""
         updates = {}
         if server is not None:
@@ -66,6 +70,8 @@ class DatabaseConfig:
             updates["db_password"] = password
         if driver is not None:
             updates["db_driver"] = driver
+        if equity_layout is not None:
+            updates["db_equity_layout"] = equity_layout
         
         self._manager.update(**updates)
 
@@ -0,0 +1,29 @@
+from fund.config.config_manage import ConfigManager
+
+class FieldConfig:
+    """欄位投影配置類 - 管理 --fields 可使用的欄位組合 (profile)"""
+
+    def __init__(self):
+        self._manager = ConfigManager()
+
+    @property
+    def profiles(self):
+        """取得所有欄位組合"""
+        return dict(self._manager.get("field_profiles", {}))
+
+    def get_profile(self, name):
+        """取得欄位組合 (不存在時回傳 None)"""
+        return self.profiles.get(name)
+
+    def set_profile(self, name, fields):
+        """新增或更新欄位組合"""
+        profiles = self.profiles
+        profiles[name] = list(fields)
+        self._manager.set("field_profiles", profiles)
+
+    def delete_profile(self, name):
+        """刪除欄位組合"""
+        profiles = self.profiles
+        if name in profiles:
+            del profiles[name]
+            self._manager.set("field_profiles", profiles)
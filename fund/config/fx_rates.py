@@ -0,0 +1,52 @@
+import os
+import json
+from fund.config.config_manage import ConfigManager, _file_lock
+
+class FxRateCache:
+    """匯率快取 - 記錄各幣別兌美元匯率、報價日與下載日 (.fund/fx_rates.json)
+
+    寫入時持有鎖定檔，以磁碟上的最新內容合併後整檔取代，不會覆蓋其他行程同時寫入的幣別。
+    """
+
+    def __init__(self, path=None):
+        config_dir = os.path.dirname(ConfigManager().config_path)
+        self.path = path or os.path.join(config_dir, "fx_rates.json")
+        self.lock_path = self.path + ".lock"
+        self._data = self._load()
+
+    def _load(self):
+        """載入快取檔案"""
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                return {}
+        return {}
+
+    def _save(self):
+        """寫入快取檔案 (先寫暫存檔再取代，避免寫到一半的檔案)"""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def get(self, currency):
+        """取得快取項目 {'rate', 'date', 'fetched'} (不存在時回傳 None)"""
+        return self._data.get(currency)
+
+    def update(self, entries):
+        """寫入多個幣別 {幣別: {'rate', 'date', 'fetched'}}"""
+        if entries:
+            with _file_lock(self.lock_path):
+                self._data = self._load()
+                self._data.update(entries)
+                self._save()
+
+    def items(self):
+        return sorted(self._data.items())
+
+    def clear(self):
+        with _file_lock(self.lock_path):
+            self._data = {}
+            self._save()
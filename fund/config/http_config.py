@@ -0,0 +1,30 @@
+from fund.config.config_manage import ConfigManager
+
+class HttpConfig:
+    """HTTP 連線配置類 - 上游 (Yahoo / FRED) 共用 session 的連線池設定"""
+
+    def __init__(self):
+        self._manager = ConfigManager()
+
+    @property
+    def pool_size(self):
+        """取得每個上游的連線池大小"""
+        return int(self._manager.get("http_pool_size", 10))
+
+    @property
+    def timeout(self):
+        """取得請求逾時秒數"""
+        return float(self._manager.get("http_timeout", 30))
+
+    @property
+    def retries(self):
+        """取得連線失敗或 429/5xx 時的重試次數"""
+        return int(self._manager.get("http_retries", 3))
+
+    def update_http(self, pool_size=None, timeout=None, retries=None):
+        """更新 HTTP 連線配置"""
+        self._manager.update(http_pool_size=pool_size, http_timeout=timeout, http_retries=retries)
+
+    def clear_http_config(self):
+        """清除 HTTP 連線配置 (恢復預設值)"""
+        self._manager.clear_prefix("http_")
@@ -0,0 +1,84 @@
+import os
+import json
+import time
+from fund.config.config_manage import ConfigManager, _file_lock
+
+class SymbolIndex:
+    """股票代號解析索引 - 記錄代號對應的市場與 yfinance ticker，以及查無代號的負向快取
+
+    解析結果先暫存於記憶體，flush() 時持有鎖定檔，以磁碟上的最新內容合併後整檔取代，
+    整批執行只寫一次檔案，也不會覆蓋其他行程同時寫入的代號。
+    """
+
+    def __init__(self):
+        config_dir = os.path.dirname(ConfigManager().config_path)
+        self.index_path = os.path.join(config_dir, "symbols.json")
+        self.lock_path = self.index_path + ".lock"
+        self._data = self._load()
+        self._pending = {}
+
+    def _load(self):
+        """載入索引檔案"""
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                return {}
+        return {}
+
+    def _save(self):
+        """寫入索引檔案 (先寫暫存檔再取代，避免寫到一半的檔案)"""
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    def get(self, symbol):
+        """取得索引項目 (不存在時回傳 None)"""
+        return self._data.get(symbol)
+
+    def set_resolved(self, symbol, market, ticker):
+        """記錄解析成功的代號"""
+        self._set(symbol, {'market': market, 'ticker': ticker, 'checked': time.time()})
+
+    def set_missing(self, symbol):
+        """記錄查無此代號 (負向快取)"""
+        self._set(symbol, {'missing': True, 'checked': time.time()})
+
+    def _set(self, symbol, entry):
+        self._data[symbol] = entry
+        self._pending[symbol] = entry
+
+    def flush(self):
+        """將尚未寫入的項目合併至磁碟上的最新索引後寫回"""
+        if not self._pending:
+            return
+        with _file_lock(self.lock_path):
+            self._data = self._load()
+            self._data.update(self._pending)
+            self._save()
+        self._pending = {}
+
+    def is_missing(self, symbol, ttl_seconds):
+        """負向快取是否仍在有效期內"""
+        entry = self._data.get(symbol)
+        return bool(entry and entry.get('missing') and time.time() - entry.get('checked', 0) < ttl_seconds)
+
+    def items(self):
+        return sorted(self._data.items())
+
+    def delete(self, symbols=None):
+        """刪除指定代號，未指定時清空索引 (立即寫回)"""
+        with _file_lock(self.lock_path):
+            self._data = self._load()
+            if symbols:
+                for symbol in symbols:
+                    self._data.pop(symbol, None)
+                    self._pending.pop(symbol, None)
+            else:
+                self._data = {}
+                self._pending = {}
+            self._data.update(self._pending)
+            self._save()
+        self._pending = {}
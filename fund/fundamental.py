@@ -1,8 +1,36 @@
 import argparse
+import asyncio
+import os
+import sys
+import time
+from contextlib import nullcontext
+from fund.api_server import create_server
 from fund.services.config_service import ConfigService
 from fund.services.database_service import DatabaseService
 from fund.services.fundamental_data_service import FundamentalDataService
+from fund.services.sharded_ingest_service import ShardedIngestService
+from fund.services.pipeline_service import PipelineService
+from fund.services.statement_service import StatementService
+from fund.services.valuation_service import ValuationService
+from fund.services.quote_stream_service import QuoteStreamService
+from fund.providers.quote_stream import YAHOO_STREAM_URL, MockQuoteServer, QuoteStreamProvider
+from fund.providers.records import QUOTE_COLUMNS
+from fund.services.job_queue_service import JobQueueService
+from fund.services.incremental_series_service import IncrementalSeriesService, SERIES_SPECS
+from fund.services.vintage_service import VintageService
+from fund.services.fx_service import FxService
+from fund.services.backfill_service import BackfillService
+from fund.services.symbol_resolver_service import SymbolResolverService
+from fund.services.change_feed_service import ChangeFeedService
+from fund.providers.replay_provider import create_provider
+from fund.providers.fundamental_data_provider import FIELD_NAMES
+from fund.repositories.fundamental_data_repository import FundamentalDataRepository, EQUITY_MARKETS
+from fund.repositories.series_store import SeriesStore
+from fund.services.query_service import SERIES_ALIASES
 from fund.utils.colors import Colors, colorize
+from fund.utils.metrics import metrics
+from fund.utils.output import OUTPUT_MODES, OutputWriter
+from fund.utils.profiling import profile_run
 
 def format_number(value, format_type='general'):
     """格式化數字顯示"""
@@ -25,65 +53,440 @@ def format_number(value, format_type='general'):
     else:
         return str(value) if value else 'N/A'
 
+# 基本面顯示區塊: (標題, [(標籤, 欄位, 格式)])
+DISPLAY_SECTIONS = (
+    ("基本資訊", (
+        ("產業", 'industry', None),
+        ("板塊", 'sector', None),
+        ("國家", 'country', None),
+        ("交易所", 'exchange', None),
+        ("貨幣", 'currency', None),
+        ("財報貨幣", 'financialCurrency', None),
+    )),
+    ("估值指標", (
+        ("市值", 'marketCap', 'currency'),
+        ("本益比 (P/E)", 'trailingPE', 'ratio'),
+        ("預估本益比", 'forwardPE', 'ratio'),
+        ("股價淨值比 (P/B)", 'priceToBook', 'ratio'),
+        ("股價營收比 (P/S)", 'priceToSales', 'ratio'),
+        ("PEG比率", 'pegRatio', 'ratio'),
+    )),
+    ("財務健康度", (
+        ("負債權益比", 'debtToEquity', 'ratio'),
+        ("流動比率", 'currentRatio', 'ratio'),
+        ("速動比率", 'quickRatio', 'ratio'),
+        ("總現金", 'totalCash', 'currency'),
+        ("總負債", 'totalDebt', 'currency'),
+    )),
+    ("獲利能力", (
+        ("股東權益報酬率 (ROE)", 'returnOnEquity', 'percentage'),
+        ("資產報酬率 (ROA)", 'returnOnAssets', 'percentage'),
+        ("淨利率", 'profitMargins', 'percentage'),
+        ("營業利益率", 'operatingMargins', 'percentage'),
+        ("毛利率", 'grossMargins', 'percentage'),
+    )),
+    ("成長性", (
+        ("營收成長率", 'revenueGrowth', 'percentage'),
+        ("盈餘成長率", 'earningsGrowth', 'percentage'),
+        ("總營收", 'totalRevenue', 'currency'),
+    )),
+    ("股利資訊", (
+        ("股利率", 'dividendYield', 'percentage'),
+        ("股利金額", 'dividendRate', 'ratio'),
+        ("配息率", 'payoutRatio', 'percentage'),
+        ("除息日", 'exDividendDate', None),
+    )),
+    ("股票資訊", (
+        ("Beta值", 'beta', 'ratio'),
+        ("每股淨值", 'bookValue', 'ratio'),
+        ("股價", 'currentPrice', 'ratio'),
+        ("52週最高", 'fiftyTwoWeekHigh', 'ratio'),
+        ("52週最低", 'fiftyTwoWeekLow', 'ratio'),
+        ("平均成交量", 'averageVolume', 'general'),
+    )),
+)
+
 def display_fundamental_data(symbol, data):
-    """顯示基本面資料"""
+    """顯示基本面資料 (只顯示 data 中存在的欄位)"""
+    lines = [
+        f"\n{'='*60}",
+        f"  {symbol} - {data.get('shortName', 'N/A')} 基本面分析",
+        f"{'='*60}",
+    ]
+    for title, items in DISPLAY_SECTIONS:
+        section = []
+        for label, key, format_type in items:
+            if key not in data:
+                continue
+            if format_type is None:
+                section.append(f"  {label}: {data.get(key, 'N/A')}")
+            else:
+                section.append(f"  {label}: {format_number(data.get(key), format_type)}")
+        if section:
+            lines.append(f"\n {title}:")
+            lines.extend(section)
+    print('\n'.join(lines))
+
+def get_market(args):
+    """由市場選項取得市場類型，未指定時回傳 None"""
+    for market in ('tw', 'us', 'two', 'etf', 'index', 'crypto', 'forex', 'futures'):
+        if getattr(args, market):
+            return market
+    return None
+
+def currency_converter(args, provider=None):
+    """--currency 指定時回傳將資料列換算為報告幣別的函式 (整批 list 或單筆)，否則原樣回傳"""
+    if not args.currency:
+        return lambda data: data
+    fx = FxService(provider)
+
+    def convert(data):
+        if isinstance(data, list):
+            return fx.convert(data, args.currency)
+        return fx.convert([data], args.currency)[0]
+    return convert
+
+def run_sharded_add(args, market, provider_options, fields, out):
+    """以多行程分片處理股票代號，並輸出彙整報告"""
+    out.info(f"正在以 {args.workers} 個行程處理 {len(args.symbols)} 檔股票 ({market})...")
+    sharded = ShardedIngestService(args.workers, provider_options)
+    results = sharded.fetch_and_store_many(args.symbols, market, fields)
+
+    succeeded = [(symbol, data) for symbol, ok, data in results if ok]
+    failed = [(symbol, error) for symbol, ok, error in results if not ok]
+    if not out.text:
+        out.records(currency_converter(args, create_provider(**provider_options))([data for _, data in succeeded]))
+        for symbol, error in failed:
+            out.error(f"✗ {symbol} 處理失敗: {error}")
+        return
     print(f"\n{'='*60}")
-    print(f"  {symbol} - {data.get('shortName', 'N/A')} 基本面分析")
+    print(f"  處理結果: 成功 {len(succeeded)} / 失敗 {len(failed)} / 共 {len(results)}")
     print(f"{'='*60}")
+    for symbol, data in succeeded:
+        print(f"  ✓ {symbol:<12} {data.get('shortName') or 'N/A'}")
+    for symbol, error in failed:
+        print(f"  ✗ {symbol:<12} {error}")
+
+def run_pipeline_add(args, service, market, fields, out):
+    """以非同步管線處理股票代號，每檔完成寫入時立即輸出"""
+    out.info(f"正在以管線處理 {len(args.symbols)} 檔股票 ({market}, 並行 {args.concurrency})...")
+    convert = currency_converter(args, service.provider)
+
+    def report(symbol, ok, payload):
+        if not ok:
+            out.error(f"✗ {symbol} 處理失敗: {payload}")
+        elif out.text:
+            print(f"✓ {symbol} 基本面資料已成功儲存")
+            display_fundamental_data(symbol, convert(payload))
+        else:
+            out.record(convert(payload))
+
+    pipeline = PipelineService(service, args.concurrency, args.queue_size)
+    pipeline.run_sync(args.symbols, market, fields, on_result=report)
+    out.flush()
+
+async def stream_quotes(service, args, on_flush, on_error=None):
+    """訂閱即時報價並寫入資料庫 (--mock 時改連本機模擬伺服器)"""
+    if args.mock:
+        async with MockQuoteServer() as server:
+            service.provider.url = server.url
+            await service.run(args.symbols, args.duration, on_flush, on_error)
+    else:
+        await service.run(args.symbols, args.duration, on_flush, on_error)
+
+def handle_stream(args):
+    """處理 stream 子命令 - 即時報價寫入"""
+    out = OutputWriter(args.output)
+
+    def report(rows, ticks):
+        if out.text:
+            print(f"✓ 寫入 {len(rows)} 檔報價 (合併 {ticks} 筆 tick)")
+        else:
+            out.records(dict(zip(QUOTE_COLUMNS, row)) for row in rows)
+
+    def report_error(rows, ticks, error):
+        out.error(f"✗ {len(rows)} 檔報價寫入失敗，待下次重試: {str(error)}")
+
+    try:
+        service = QuoteStreamService(QuoteStreamProvider(args.url), batch_size=args.batch_size,
+                                     flush_seconds=args.flush_seconds)
+    except Exception as e:
+        out.error(f"✗ 即時報價串流失敗: {str(e)}")
+        return
+    out.info(f"正在訂閱 {len(args.symbols)} 檔即時報價 (每 {args.flush_seconds} 秒或 {args.batch_size} 檔寫入一次)...")
+    try:
+        asyncio.run(stream_quotes(service, args, report, report_error))
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        out.error(f"✗ 即時報價串流失敗: {str(e)}")
+    stats = service.stats
+    out.info(f"✓ 串流結束: 收到 {stats['ticks']} 筆 tick，寫入 {stats['rows']} 筆 / {stats['flushes']} 批")
+    if stats['failures']:
+        pending = len(service.coalescer.latest)
+        out.error(f"✗ 寫入失敗 {stats['failures']} 次{f'，{pending} 檔報價未能寫入' if pending else ''}")
+
+def emit_rows(out, rows, title, line):
+    """輸出期間資料: text 模式逐列顯示，其他模式每個日期一筆資料"""
+    if out.text:
+        print('\n'.join(([title] if title else []) + [line(row) for row in rows]))
+    else:
+        out.records(rows)
+
+def emit_row(out, row, text):
+    """輸出單筆最新資料"""
+    if out.text:
+        print(text)
+    else:
+        out.records([row])
+
+def handle_add(args, out):
+    """處理 add 子命令 - 基本面資料查詢"""
+    provider_options = {
+        'record_dir': args.record,
+        'replay_dir': args.replay,
+        'replay_latency': args.replay_latency,
+    }
+    service = FundamentalDataService(provider=create_provider(**provider_options), series_store=SeriesStore())
     
-    # 基本資訊
-    print("\n 基本資訊:")
-    print(f"  產業: {data.get('industry', 'N/A')}")
-    print(f"  板塊: {data.get('sector', 'N/A')}")
-    print(f"  國家: {data.get('country', 'N/A')}")
-    print(f"  交易所: {data.get('exchange', 'N/A')}")
-    print(f"  貨幣: {data.get('currency', 'N/A')}")
-    
-    # 估值指標
-    print("\n 估值指標:")
-    print(f"  市值: {format_number(data.get('marketCap'), 'currency')}")
-    print(f"  本益比 (P/E): {format_number(data.get('trailingPE'), 'ratio')}")
-    print(f"  預估本益比: {format_number(data.get('forwardPE'), 'ratio')}")
-    print(f"  股價淨值比 (P/B): {format_number(data.get('priceToBook'), 'ratio')}")
-    print(f"  股價營收比 (P/S): {format_number(data.get('priceToSales'), 'ratio')}")
-    print(f"  PEG比率: {format_number(data.get('pegRatio'), 'ratio')}")
-    
-    # 財務健康度
-    print("\n 財務健康度:")
-    print(f"  負債權益比: {format_number(data.get('debtToEquity'), 'ratio')}")
-    print(f"  流動比率: {format_number(data.get('currentRatio'), 'ratio')}")
-    print(f"  速動比率: {format_number(data.get('quickRatio'), 'ratio')}")
-    print(f"  總現金: {format_number(data.get('totalCash'), 'currency')}")
-    print(f"  總負債: {format_number(data.get('totalDebt'), 'currency')}")
-    
-    # 獲利能力
-    print("\n 獲利能力:")
-    print(f"  股東權益報酬率 (ROE): {format_number(data.get('returnOnEquity'), 'percentage')}")
-    print(f"  資產報酬率 (ROA): {format_number(data.get('returnOnAssets'), 'percentage')}")
-    print(f"  淨利率: {format_number(data.get('profitMargins'), 'percentage')}")
-    print(f"  營業利益率: {format_number(data.get('operatingMargins'), 'percentage')}")
-    print(f"  毛利率: {format_number(data.get('grossMargins'), 'percentage')}")
-    
-    # 成長性
-    print("\n 成長性:")
-    print(f"  營收成長率: {format_number(data.get('revenueGrowth'), 'percentage')}")
-    print(f"  盈餘成長率: {format_number(data.get('earningsGrowth'), 'percentage')}")
-    print(f"  總營收: {format_number(data.get('totalRevenue'), 'currency')}")
-    
-    # 股利資訊
-    print("\n 股利資訊:")
-    print(f"  股利率: {format_number(data.get('dividendYield'), 'percentage')}")
-    print(f"  股利金額: {format_number(data.get('dividendRate'), 'ratio')}")
-    print(f"  配息率: {format_number(data.get('payoutRatio'), 'percentage')}")
-    print(f"  除息日: {data.get('exDividendDate', 'N/A')}")
+    # CPI/NFP 發布版本 (含歷次修正)
+    if args.vintages and (args.cpi or args.nfp):
+        vintages = VintageService(service.provider, service.repository)
+        for market, enabled, label in (('cpi_us', args.cpi, '美國CPI'), ('nfp_us', args.nfp, '美國NFP')):
+            if not enabled:
+                continue
+            try:
+                out.info(f"正在更新{label}發布版本...")
+                rows, revisions = vintages.refresh(market)
+                emit_rows(out, [{'date': d, 'vintage': v, 'value': value} for d, v, value in rows],
+                          f"✓ {label}發布版本更新完成: 寫入={len(rows)} 其中修正={revisions}",
+                          lambda row: f"  日期={row['date']} 版本={row['vintage']} 數值={row['value']}")
+            except Exception as e:
+                out.error(f"✗ {label}發布版本更新失敗: {str(e)}")
+        return
+
+    # CPI/NFP 增量更新
+    if args.incremental and (args.cpi or args.nfp):
+        incremental = IncrementalSeriesService(service.provider, service.repository, series_store=service.series_store)
+        for market, enabled, label in (('cpi_us', args.cpi, '美國CPI'), ('nfp_us', args.nfp, '美國NFP')):
+            if not enabled:
+                continue
+            try:
+                out.info(f"正在增量更新{label}...")
+                window_start, inserts, updates = incremental.refresh(market, args.since)
+                emit_rows(out, inserts + updates,
+                          f"✓ {label}增量更新完成: 起日={window_start or '全部'} 新增={len(inserts)} 更新={len(updates)}",
+                          lambda row: f"  日期={row['date']} 數值={row['value']}")
+            except Exception as e:
+                out.error(f"✗ {label}增量更新失敗: {str(e)}")
+        return
+
+    # CPI/NFP/OIL/GOLD 查詢
+    if args.cpi:
+        try:
+            if args.start and args.end:
+                out.info(f"正在獲取美國CPI期間資料: {args.start} ~ {args.end}")
+                cpi_list = service.fetch_and_store_cpi_us_range(args.start, args.end)
+                emit_rows(out, cpi_list, "✓ 美國CPI期間資料:",
+                          lambda row: f"  日期={row['date']} 數值={row['value']}（指數）")
+                out.info("CPI期間資料已成功儲存")
+            else:
+                out.info("正在獲取美國CPI...")
+                cpi_data = service.fetch_and_store_cpi_us()
+                emit_row(out, cpi_data, f"✓ 美國CPI最新資料: 日期={cpi_data['date']} 數值={cpi_data['value']}（指數）")
+                out.info("CPI已成功儲存")
+        except Exception as e:
+            out.error(f"✗ 美國CPI獲取失敗: {str(e)}")
+        return
+
+    if args.nfp:
+        try:
+            if args.start and args.end:
+                out.info(f"正在獲取美國NFP期間資料: {args.start} ~ {args.end}")
+                nfp_list = service.fetch_and_store_nfp_us_range(args.start, args.end)
+                emit_rows(out, nfp_list, "✓ 美國NFP期間資料:",
+                          lambda row: f"  日期={row['date']} 數值={row['value']}（千人）")
+                out.info("NFP期間資料已成功儲存")
+            else:
+                out.info("正在獲取美國NFP...")
+                nfp_data = service.fetch_and_store_nfp_us()
+                emit_row(out, nfp_data, f"✓ 美國NFP最新資料: 日期={nfp_data['date']} 數值={nfp_data['value']}（千人）")
+                out.info("NFP已成功儲存")
+        except Exception as e:
+            out.error(f"✗ 美國NFP獲取失敗: {str(e)}")
+        return
+
+    if args.oil:
+        try:
+            if args.start and args.end:
+                out.info(f"正在獲取WTI原油價格期間資料: {args.start} ~ {args.end}")
+                oil_list = service.fetch_and_store_oil_price_range(args.start, args.end)
+                emit_rows(out, oil_list, "✓ WTI原油價格期間資料:",
+                          lambda row: f"  日期={row['date']} 價格={row['value']} (USD)")
+                out.info("WTI原油價格期間資料已成功儲存")
+            else:
+                out.info("正在獲取WTI原油最新價格...")
+                oil_data = service.fetch_and_store_oil_price()
+                emit_row(out, oil_data, f"✓ WTI原油最新價格: 日期={oil_data['date']} 價格={oil_data['value']} (USD)")
+                out.info("WTI原油價格已成功儲存")
+        except Exception as e:
+            out.error(f"✗ WTI原油價格獲取失敗: {str(e)}")
+        return
+
+    if args.gold:
+        try:
+            if args.start and args.end:
+                out.info(f"正在獲取黃金期貨價格期間資料: {args.start} ~ {args.end}")
+                gold_list = service.fetch_and_store_gold_price_range(args.start, args.end)
+                emit_rows(out, gold_list, "✓ 黃金期貨價格期間資料:",
+                          lambda row: f"  日期={row['date']} 價格={row['value']} (USD)")
+                out.info("黃金期貨價格期間資料已成功儲存")
+            else:
+                out.info("正在獲取黃金期貨最新價格...")
+                gold_data = service.fetch_and_store_gold_price()
+                emit_row(out, gold_data, f"✓ 黃金期貨最新價格: 日期={gold_data['date']} 價格={gold_data['value']} (USD)")
+                out.info("黃金期貨價格已成功儲存")
+        except Exception as e:
+            out.error(f"✗ 黃金期貨價格獲取失敗: {str(e)}")
+        return
+
+    # 股票基本面查詢
+    if not args.symbols:
+        print("請提供至少一個股票代號或指定查詢類型")
+        print("範例: fund add 2330 --tw")
+        print("      fund add AAPL --us")
+        print("      fund add --cpi")
+        return
     
-    # 股票資訊
-    print("\n 股票資訊:")
-    print(f"  Beta值: {format_number(data.get('beta'), 'ratio')}")
-    print(f"  每股淨值: {format_number(data.get('bookValue'), 'ratio')}")
-    print(f"  52週最高: {format_number(data.get('fiftyTwoWeekHigh'), 'ratio')}")
-    print(f"  52週最低: {format_number(data.get('fiftyTwoWeekLow'), 'ratio')}")
-    print(f"  平均成交量: {format_number(data.get('averageVolume'))}")
+    # 確定市場類型
+    market = get_market(args)
+    if market is None and not args.auto:
+        out.error("請指定市場類型 (例: --tw, --us, --crypto) 或使用 --auto 自動判斷")
+        return
+
+    fields = None
+    if args.fields:
+        try:
+            fields = ConfigService().resolve_fields(args.fields)
+        except ValueError as e:
+            out.error(f"✗ {str(e)}")
+            return
+        # 換算報告幣別需要交易幣別與財報幣別
+        if args.currency:
+            fields = list(fields) + [c for c in ('currency', 'financialCurrency') if c not in fields]
+    convert = currency_converter(args, service.provider)
+
+    if market is None:
+        if args.history or args.statements or args.workers > 1 or args.pipeline:
+            out.error("--auto 不支援 --history/--statements/--workers/--pipeline，請指定市場類型")
+            return
+        try:
+            for symbol in args.symbols:
+                try:
+                    out.info(f"正在處理 {symbol} (自動判斷市場)...")
+                    market, result = service.fetch_and_store_auto(symbol, fields)
+                    out.info(f"✓ {symbol} 基本面資料已成功儲存 ({market})")
+
+                    if out.text:
+                        display_fundamental_data(symbol, convert(result))
+                    else:
+                        out.record(dict(convert(result), market=market))
+
+                except Exception as e:
+                    out.error(f"✗ {symbol} 處理失敗: {str(e)}")
+        finally:
+            # 解析結果整批寫入一次
+            service.resolver.flush()
+        out.flush()
+        return
+
+    if args.history:
+        try:
+            out.info(f"正在批次下載 {len(args.symbols)} 檔股票日線價格 ({market})...")
+            counts = service.fetch_and_store_history(args.symbols, market, args.start, args.end, args.batch_size)
+            emit_rows(out, [{'symbol': symbol, 'rows': count} for symbol, count in counts.items()], None,
+                      lambda row: f"  ✓ {row['symbol']:<12} 新增/更新 {row['rows']} 筆")
+            out.info("日線價格已成功儲存")
+        except Exception as e:
+            out.error(f"✗ 日線價格下載失敗: {str(e)}")
+        return
+
+    if args.statements:
+        out.info(f"正在下載 {len(args.symbols)} 檔股票季報/年報 ({market}, 並行 {args.concurrency})...")
+
+        def report(symbol, ok, payload):
+            if not ok:
+                out.error(f"✗ {symbol} 財務報表下載失敗: {payload}")
+            elif out.text:
+                print(f"  ✓ {symbol:<12} 新增 {payload} 筆")
+            else:
+                out.record({'symbol': symbol, 'rows': payload})
+
+        try:
+            StatementService(service, args.concurrency).fetch_and_store_many(args.symbols, market, on_result=report)
+            out.flush()
+            out.info("財務報表已成功儲存")
+        except Exception as e:
+            out.error(f"✗ 財務報表寫入失敗: {str(e)}")
+        return
+
+    if args.workers and args.workers > 1:
+        run_sharded_add(args, market, provider_options, fields, out)
+        return
+
+    if args.pipeline:
+        run_pipeline_add(args, service, market, fields, out)
+        return
+
+    for symbol in args.symbols:
+        try:
+            out.info(f"正在處理 {symbol} ({market})...")
+            result = service.fetch_and_store(symbol, market, fields)
+            out.info(f"✓ {symbol} 基本面資料已成功儲存")
+            
+            if out.text:
+                display_fundamental_data(symbol, convert(result))
+            else:
+                out.record(convert(result))
+            
+        except Exception as e:
+            out.error(f"✗ {symbol} 處理失敗: {str(e)}")
+    out.flush()
+
+def write_changes(changes, path=None):
+    """以 NDJSON 輸出變動紀錄 (未指定檔案時輸出至 stdout)"""
+    if path:
+        with open(path, 'a', encoding='utf-8') as f:
+            OutputWriter('ndjson', stream=f).records(changes)
+        print(f"✓ 已寫入 {len(changes)} 筆變動紀錄至 {path}", file=sys.stderr)
+    else:
+        OutputWriter('ndjson').records(changes)
+
+def run_add(args):
+    """執行 add 子命令，並依參數輸出各階段統計與效能剖析"""
+    profiler = profile_run(args.profile) if args.profile else nullcontext()
+    out = OutputWriter(args.output)
+    # 子行程繼承環境變數，整次執行的變動紀錄共用同一個 run id
+    run_id = os.environ.setdefault('FUND_RUN_ID', args.run_id or f"{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}")
+    try:
+        with profiler:
+            handle_add(args, out)
+    finally:
+        out.flush()
+        if args.changes_file:
+            try:
+                write_changes(ChangeFeedService().run_changes(run_id), args.changes_file)
+            except Exception as e:
+                print(f"✗ 變動紀錄輸出失敗: {str(e)}", file=sys.stderr)
+        if args.metrics:
+            report = metrics.render(args.metrics)
+            if args.metrics_file:
+                with open(args.metrics_file, 'w', encoding='utf-8') as f:
+                    f.write(report + ('' if report.endswith('\n') else '\n'))
+            else:
+                print(report, file=sys.stderr)
+        if args.profile:
+            print(f"效能剖析結果已寫入 {args.profile}", file=sys.stderr)
 
 def main():
     parser = argparse.ArgumentParser(description='基本面資料查詢工具',add_help=False)
@@ -107,6 +510,7 @@ def main():
     add_parser.add_argument('--crypto', action='store_true', help='加密貨幣')
     add_parser.add_argument('--forex', action='store_true', help='外匯')
     add_parser.add_argument('--futures', action='store_true', help='期貨')
+    add_parser.add_argument('--auto', action='store_true', help='自動判斷市場 (結果快取於 .fund/symbols.json)')
 
     # 經濟指標選項
     add_parser.add_argument('--cpi', action='store_true', help='查詢美國CPI')
@@ -118,6 +522,46 @@ def main():
     add_parser.add_argument('--start', type=str, help='查詢起始日期 (yyyy-mm-dd)')
     add_parser.add_argument('--end', type=str, help='查詢結束日期 (yyyy-mm-dd)')
 
+    # 日線價格選項
+    add_parser.add_argument('--history', action='store_true', help='批次下載日線 OHLCV 價格')
+    add_parser.add_argument('--batch-size', type=int, default=50, help='每次 yf.download 的股票數量')
+
+    # 財務報表選項
+    add_parser.add_argument('--statements', action='store_true', help='下載季報/年報 (損益表、資產負債表、現金流量表)')
+
+    # 增量更新選項
+    add_parser.add_argument('--incremental', action='store_true', help='CPI/NFP 只重算並寫入變動區間')
+    add_parser.add_argument('--since', type=str, help='增量更新起始日期 (預設為最新日期往前 3 個月)')
+    add_parser.add_argument('--vintages', action='store_true', help='CPI/NFP 保存每次公布與修正的版本 (只存有變動的值)')
+
+    # 輸出格式選項
+    add_parser.add_argument('--output', choices=OUTPUT_MODES, default='text',
+                            help='輸出格式 (ndjson/csv 每筆一行，quiet 不輸出資料)')
+
+    # 效能統計選項
+    add_parser.add_argument('--metrics', choices=['table', 'jsonl', 'prom'], help='輸出各階段耗時統計')
+    add_parser.add_argument('--metrics-file', type=str, help='統計輸出檔案 (預設輸出至 stderr)')
+    add_parser.add_argument('--profile', type=str, metavar='DIR', help='以 cProfile/tracemalloc 剖析並輸出至目錄')
+
+    # 欄位投影選項
+    add_parser.add_argument('--fields', type=str, help='只取得並寫入指定欄位 (逗號分隔或欄位組合名稱)')
+    add_parser.add_argument('--currency', type=str, help='顯示/輸出時將市值、現金、負債、營收換算為此幣別 (例: USD, TWD)')
+
+    # 平行處理選項
+    add_parser.add_argument('--workers', type=int, default=1, help='以多個行程分片處理股票代號')
+    add_parser.add_argument('--pipeline', action='store_true', help='以非同步管線同時抓取、轉換與寫入')
+    add_parser.add_argument('--concurrency', type=int, default=8, help='管線同時抓取的股票數量')
+    add_parser.add_argument('--queue-size', type=int, default=32, help='管線各階段之間的佇列容量')
+
+    # 變動紀錄選項
+    add_parser.add_argument('--run-id', type=str, help='變動紀錄的執行識別碼 (預設為時間與行程編號)')
+    add_parser.add_argument('--changes-file', type=str, help='執行後將本次變動紀錄附加至 NDJSON 檔案')
+
+    # 錄製/重播選項
+    add_parser.add_argument('--record', type=str, metavar='DIR', help='錄製所有上游回應至目錄')
+    add_parser.add_argument('--replay', type=str, metavar='DIR', help='由錄製目錄重播上游回應 (不連網)')
+    add_parser.add_argument('--replay-latency', type=str, metavar='MS|recorded', help='重播時模擬延遲 (毫秒或 recorded)')
+
     # db 子命令 - 資料庫管理
     db_parser = subparsers.add_parser('db', help='資料庫配置與管理')
     db_parser.add_argument('--host', type=str, help='設定資料庫位址')
@@ -129,12 +573,101 @@ def main():
     db_parser.add_argument('--config', action='store_true', help='顯示資料庫配置')
     db_parser.add_argument('--check', action='store_true', help='檢查資料庫連線')
     db_parser.add_argument('--tables',action='store_true',help='列出當前資料庫的資料表')
+    db_parser.add_argument('--stats', action='store_true', help='搭配 --tables 顯示筆數、空間與最後寫入時間')
+    db_parser.add_argument('--layout', choices=['per_market', 'unified'], help='股票資料表配置 (每市場一表或統一資料表)')
+    db_parser.add_argument('--migrate-unified', action='store_true', help='將各市場資料表搬移至統一資料表')
     
     # fred 子命令 - FRED API 管理
     fred_parser = subparsers.add_parser('fred', help='FRED API 配置')
     fred_parser.add_argument('--fred', type=str, help='設定 FRED API Key')
     fred_parser.add_argument('--clear', action='store_true', help='清除 FRED API Key')
 
+    # series 子命令 - 本機時間序列檔案庫
+    series_parser = subparsers.add_parser('series', help='由本機檔案庫讀取總經/大宗商品序列 (不連網、不查資料庫)')
+    series_parser.add_argument('name', choices=sorted(SERIES_ALIASES), help='序列名稱')
+    series_parser.add_argument('--start', type=str, help='起始日期 (yyyy-mm-dd)')
+    series_parser.add_argument('--end', type=str, help='結束日期 (yyyy-mm-dd)')
+    series_parser.add_argument('--output', choices=OUTPUT_MODES, default='text', help='輸出格式')
+    series_parser.add_argument('--rebuild', action='store_true', help='由資料庫重建本機序列')
+    series_parser.add_argument('--as-of', type=str, help='讀取該日當時已知的 CPI/NFP (由資料庫的發布版本重建)')
+
+    # stream 子命令 - 即時報價
+    stream_parser = subparsers.add_parser('stream', help='訂閱即時報價並以小批次寫入報價資料表')
+    stream_parser.add_argument('symbols', nargs='+', help='Yahoo 代號 (例: AAPL 2330.TW BTC-USD EURUSD=X GC=F)')
+    stream_parser.add_argument('--batch-size', type=int, default=500, help='累積多少檔股票的報價即寫入')
+    stream_parser.add_argument('--flush-seconds', type=float, default=1.0, help='最長寫入間隔秒數')
+    stream_parser.add_argument('--duration', type=float, help='執行秒數 (預設持續執行至 Ctrl+C)')
+    stream_parser.add_argument('--url', type=str, default=YAHOO_STREAM_URL, help='串流伺服器位址')
+    stream_parser.add_argument('--mock', action='store_true', help='改連本機模擬報價伺服器 (測試用)')
+    stream_parser.add_argument('--output', choices=OUTPUT_MODES, default='text', help='輸出格式')
+
+    # valuation 子命令 - 估值重算
+    valuation_parser = subparsers.add_parser('valuation', help='以最新價格重算市值、本益比、股價淨值比與股價營收比')
+    valuation_parser.add_argument('market', choices=EQUITY_MARKETS, help='市場')
+    valuation_parser.add_argument('--refresh', action='store_true', help='重算前先下載最近一週日線價格')
+    valuation_parser.add_argument('--dry-run', action='store_true', help='只計算不寫回資料庫')
+    valuation_parser.add_argument('--output', choices=OUTPUT_MODES, default='text', help='輸出格式')
+
+    # http 子命令 - 上游連線池配置
+    http_parser = subparsers.add_parser('http', help='上游 HTTP 連線池配置')
+    http_parser.add_argument('--pool-size', type=int, help='每個上游的連線池大小')
+    http_parser.add_argument('--timeout', type=float, help='請求逾時秒數')
+    http_parser.add_argument('--retries', type=int, help='FRED 請求重試次數')
+    http_parser.add_argument('--clear', action='store_true', help='恢復預設值')
+
+    # backfill 子命令 - 時間序列缺漏回補
+    backfill_parser = subparsers.add_parser('backfill', help='偵測並回補時間序列缺漏日期')
+    backfill_parser.add_argument('--cpi', action='store_true', help='回補美國CPI (每月)')
+    backfill_parser.add_argument('--nfp', action='store_true', help='回補美國NFP (每月)')
+    backfill_parser.add_argument('--oil', action='store_true', help='回補WTI原油價格 (工作日)')
+    backfill_parser.add_argument('--gold', action='store_true', help='回補黃金期貨價格 (工作日)')
+    backfill_parser.add_argument('--start', type=str, help='檢查起始日期 (預設為已儲存的最早日期)')
+    backfill_parser.add_argument('--end', type=str, help='檢查結束日期 (預設為前一期，不含尚未結束的本期)')
+    backfill_parser.add_argument('--workers', type=int, default=4, help='同時下載的區間數')
+    backfill_parser.add_argument('--max-gap', type=int, default=0, help='合併區間時可跨越的已存在期數')
+    backfill_parser.add_argument('--dry-run', action='store_true', help='只列出缺漏區間，不下載')
+
+    # fields 子命令 - 欄位組合管理
+    fields_parser = subparsers.add_parser('fields', help='欄位組合 (--fields profile) 管理')
+    fields_parser.add_argument('--profile', type=str, help='欄位組合名稱')
+    fields_parser.add_argument('--set', type=str, help='設定欄位組合 (逗號分隔欄位)')
+    fields_parser.add_argument('--delete', action='store_true', help='刪除欄位組合')
+
+    # queue 子命令 - 多主機共用的資料庫工作佇列
+    queue_parser = subparsers.add_parser('queue', help='資料庫工作佇列 (多主機分散處理)')
+    queue_parser.add_argument('symbols', nargs='*', help='要加入佇列的股票代號')
+    queue_parser.add_argument('--run', type=str, required=True, help='批次執行識別碼')
+    queue_parser.add_argument('--enqueue', action='store_true', help='將股票代號加入佇列')
+    queue_parser.add_argument('--work', action='store_true', help='領取並處理佇列中的工作')
+    queue_parser.add_argument('--status', action='store_true', help='顯示佇列狀態')
+    queue_parser.add_argument('--batch', type=int, default=20, help='每次領取的工作數')
+    queue_parser.add_argument('--lease', type=int, default=300, help='租約秒數')
+    queue_parser.add_argument('--max-attempts', type=int, default=3, help='最大嘗試次數')
+    queue_parser.add_argument('--wait', action='store_true', help='等待其他主機的工作完成後才結束')
+    for market in ('tw', 'us', 'two', 'etf', 'index', 'crypto', 'forex', 'futures'):
+        queue_parser.add_argument(f'--{market}', action='store_true', help=f'{market} 市場')
+
+    # symbols 子命令 - 代號解析索引管理
+    symbols_parser = subparsers.add_parser('symbols', help='檢視或清除 --auto 代號解析索引')
+    symbols_parser.add_argument('symbols', nargs='*', help='要清除的股票代號 (未指定時清除全部)')
+    symbols_parser.add_argument('--clear', action='store_true', help='清除索引項目 (含查無代號的快取)')
+
+    # changes 子命令 - 基本面變動紀錄
+    changes_parser = subparsers.add_parser('changes', help='讀取基本面變動紀錄 (change feed)')
+    changes_parser.add_argument('--consumer', type=str, help='消費者名稱 (讀取位置記錄於資料庫)')
+    changes_parser.add_argument('--run', type=str, help='只列出指定執行的變動紀錄')
+    changes_parser.add_argument('--limit', type=int, default=1000, help='每次讀取筆數')
+    changes_parser.add_argument('--peek', action='store_true', help='只讀取，不推進讀取位置')
+    changes_parser.add_argument('--reset', type=int, nargs='?', const=0, metavar='ID', help='重設讀取位置 (預設為 0)')
+    changes_parser.add_argument('--file', type=str, help='附加至 NDJSON 檔案 (預設輸出至 stdout)')
+
+    # serve 子命令 - 本機唯讀 HTTP/JSON API
+    serve_parser = subparsers.add_parser('serve', help='啟動本機唯讀 HTTP API')
+    serve_parser.add_argument('--host', type=str, default='127.0.0.1', help='監聽位址')
+    serve_parser.add_argument('--port', type=int, default=8000, help='監聽埠號')
+    serve_parser.add_argument('--cache-size', type=int, default=1024, help='LRU 快取項目數')
+    serve_parser.add_argument('--revalidate', type=float, default=1.0, help='lastUpdate 重新檢查間隔 (秒)')
+
     args = parser.parse_args()
     
     # 顯示幫助訊息
@@ -144,129 +677,15 @@ def main():
     
     # 處理 add 子命令 - 基本面資料查詢
     if args.command == 'add':
-        service = FundamentalDataService()
-        
-        # CPI/NFP/OIL/GOLD 查詢
-        if args.cpi:
-            try:
-                if args.start and args.end:
-                    print(f"正在獲取美國CPI期間資料: {args.start} ~ {args.end}")
-                    cpi_list = service.fetch_and_store_cpi_us_range(args.start, args.end)
-                    print("✓ 美國CPI期間資料:")
-                    for cpi_data in cpi_list:
-                        print(f"  日期={cpi_data['date']} 數值={cpi_data['value']}（指數）")
-                    print("CPI期間資料已成功儲存")
-                else:
-                    print("正在獲取美國CPI...")
-                    cpi_data = service.fetch_and_store_cpi_us()
-                    print(f"✓ 美國CPI最新資料: 日期={cpi_data['date']} 數值={cpi_data['value']}（指數）")
-                    print("CPI已成功儲存")
-            except Exception as e:
-                print(f"✗ 美國CPI獲取失敗: {str(e)}")
-            return
-
-        if args.nfp:
-            try:
-                if args.start and args.end:
-                    print(f"正在獲取美國NFP期間資料: {args.start} ~ {args.end}")
-                    nfp_list = service.fetch_and_store_nfp_us_range(args.start, args.end)
-                    print("✓ 美國NFP期間資料:")
-                    for nfp_data in nfp_list:
-                        print(f"  日期={nfp_data['date']} 數值={nfp_data['value']}（千人）")
-                    print("NFP期間資料已成功儲存")
-                else:
-                    print("正在獲取美國NFP...")
-                    nfp_data = service.fetch_and_store_nfp_us()
-                    print(f"✓ 美國NFP最新資料: 日期={nfp_data['date']} 數值={nfp_data['value']}（千人）")
-                    print("NFP已成功儲存")
-            except Exception as e:
-                print(f"✗ 美國NFP獲取失敗: {str(e)}")
-            return
-
-        if args.oil:
-            try:
-                if args.start and args.end:
-                    print(f"正在獲取WTI原油價格期間資料: {args.start} ~ {args.end}")
-                    oil_list = service.fetch_and_store_oil_price_range(args.start, args.end)
-                    print("✓ WTI原油價格期間資料:")
-                    for oil_data in oil_list:
-                        print(f"  日期={oil_data['date']} 價格={oil_data['value']} (USD)")
-                    print("WTI原油價格期間資料已成功儲存")
-                else:
-                    print("正在獲取WTI原油最新價格...")
-                    oil_data = service.fetch_and_store_oil_price()
-                    print(f"✓ WTI原油最新價格: 日期={oil_data['date']} 價格={oil_data['value']} (USD)")
-                    print("WTI原油價格已成功儲存")
-            except Exception as e:
-                print(f"✗ WTI原油價格獲取失敗: {str(e)}")
-            return
+        run_add(args)
 
-        if args.gold:
-            try:
-                if args.start and args.end:
-                    print(f"正在獲取黃金期貨價格期間資料: {args.start} ~ {args.end}")
-                    gold_list = service.fetch_and_store_gold_price_range(args.start, args.end)
-                    print("✓ 黃金期貨價格期間資料:")
-                    for gold_data in gold_list:
-                        print(f"  日期={gold_data['date']} 價格={gold_data['value']} (USD)")
-                    print("黃金期貨價格期間資料已成功儲存")
-                else:
-                    print("正在獲取黃金期貨最新價格...")
-                    gold_data = service.fetch_and_store_gold_price()
-                    print(f"✓ 黃金期貨最新價格: 日期={gold_data['date']} 價格={gold_data['value']} (USD)")
-                    print("黃金期貨價格已成功儲存")
-            except Exception as e:
-                print(f"✗ 黃金期貨價格獲取失敗: {str(e)}")
-            return
-
-        # 股票基本面查詢
-        if not args.symbols:
-            print("請提供至少一個股票代號或指定查詢類型")
-            print("範例: fund add 2330 --tw")
-            print("      fund add AAPL --us")
-            print("      fund add --cpi")
-            return
-        
-        # 確定市場類型
-        market = None
-        if args.tw:
-            market = 'tw'
-        elif args.us:
-            market = 'us'
-        elif args.two:
-            market = 'two'
-        elif args.etf:
-            market = 'etf'
-        elif args.index:
-            market = 'index'
-        elif args.crypto:
-            market = 'crypto'
-        elif args.forex:
-            market = 'forex'
-        elif args.futures:
-            market = 'futures'
-        else:
-            print("請指定市場類型 (例: --tw, --us, --crypto)")
-            return
-        
-        for symbol in args.symbols:
-            try:
-                print(f"正在處理 {symbol} ({market})...")
-                result = service.fetch_and_store(symbol, market)
-                print(f"✓ {symbol} 基本面資料已成功儲存")
-                
-                display_fundamental_data(symbol, result)
-                
-            except Exception as e:
-                print(f"✗ {symbol} 處理失敗: {str(e)}")
-    
     # 處理 db 子命令 - 資料庫配置與管理
     elif args.command == 'db':
         config_service = ConfigService()
         db_service = DatabaseService()
         
         has_args = any([args.clear, args.host, args.database, args.user, args.password, 
-                       args.driver, args.config, args.check, args.tables])
+                       args.driver, args.config, args.check, args.tables, args.layout, args.migrate_unified])
         
         if args.clear:
             confirm = input("Confirm to clear all database settings? (y/n): ")
@@ -295,6 +714,21 @@ def main():
             print(f"  {if_db_exists_message}")
             print(f"✓ {db_update_message}")
         
+        if args.layout:
+            config_service.update_db_config(equity_layout=args.layout)
+            print(f"✓ equity table layout: {args.layout}")
+
+        if args.migrate_unified:
+            success, moved = db_service.migrate_to_unified()
+            if success:
+                for market, count in moved.items():
+                    print(f"  ✓ fundamental_data_{market} -> fundamental_data_equity ({count} rows)")
+                print("✓ migration completed (old tables renamed to *_legacy, compatibility views created)")
+                if config_service.show_db_config()['equity_layout'] != 'unified':
+                    print("  run 'fund db --layout unified' to write to the unified table")
+            else:
+                print(f"✗ migration failed: {moved}")
+
         if args.config:
             config = config_service.show_db_config()
             for key, value in config.items():
@@ -304,7 +738,18 @@ def main():
             success, test_connect_message = db_service.test_connection()
             print(f"  {test_connect_message}")
 
-        if args.tables:
+        if args.tables and args.stats:
+            success, stats = db_service.get_table_stats()
+            if success and stats:
+                print(f"  {'table':<36} {'rows':>12} {'size (KB)':>12}  last update")
+                for item in stats:
+                    last_update = item['last_update'].strftime('%Y-%m-%d %H:%M:%S') if item['last_update'] else 'N/A'
+                    print(f"  {item['table']:<36} {item['rows']:>12,} {item['reserved_kb']:>12,}  {last_update}")
+            elif success:
+                print("not available tables.")
+            else:
+                print(f"✗ {stats}")
+        elif args.tables:
             success, tables = db_service.list_tables()
             if success and tables:
                 for i, table in enumerate(tables, 1):
@@ -361,6 +806,215 @@ def main():
         for key, value in config.items():
             print(f"  {key}: {value}")
 
+    # 處理 series 子命令 - 本機時間序列檔案庫
+    elif args.command == 'series':
+        market = SERIES_ALIASES[args.name]
+        store = SeriesStore()
+        if args.rebuild:
+            try:
+                rows = [{k: v for k, v in row.items() if k != 'lastUpdate'}
+                        for row in FundamentalDataRepository().get_series_range(market)]
+                store.rebuild(market, rows)
+                print(f"✓ {market} 已由資料庫重建 ({len(rows)} 筆)")
+            except Exception as e:
+                print(f"✗ {market} 重建失敗: {str(e)}")
+            return
+        out = OutputWriter(args.output)
+        if args.as_of:
+            if market not in SERIES_SPECS:
+                out.error(f"✗ {market} 沒有發布版本資料 (僅支援 cpi、nfp)")
+                return
+            try:
+                rows = VintageService(repository=FundamentalDataRepository()).as_of(
+                    market, args.as_of, args.start, args.end).to_rows()
+            except Exception as e:
+                out.error(f"✗ {market} 版本查詢失敗: {str(e)}")
+                return
+            if not rows:
+                out.error(f"資料庫尚無 {market} 於 {args.as_of} 已知的版本 (執行 fund add --{args.name} --vintages)")
+                return
+            emit_rows(out, rows, f"✓ {market} 截至 {args.as_of} 已知 ({len(rows)} 筆):",
+                      lambda row: '  ' + ' '.join(f"{k}={v}" for k, v in row.items()))
+            return
+        rows = store.read_rows(market, args.start, args.end)
+        if not rows:
+            out.error(f"本機尚無 {market} 資料 (執行 fund add --{args.name} 或 fund series {args.name} --rebuild)")
+            return
+        emit_rows(out, rows, f"✓ {market} ({len(rows)} 筆):",
+                  lambda row: '  ' + ' '.join(f"{k}={v}" for k, v in row.items()))
+
+    # 處理 stream 子命令 - 即時報價
+    elif args.command == 'stream':
+        handle_stream(args)
+
+    # 處理 valuation 子命令 - 估值重算
+    elif args.command == 'valuation':
+        out = OutputWriter(args.output)
+        try:
+            repository = FundamentalDataRepository()
+            valuation_service = ValuationService(repository, FundamentalDataService(repository=repository))
+            if args.refresh:
+                out.info(f"正在下載 {args.market} 最新日線價格...")
+                valuation_service.refresh_prices(args.market)
+            result, missing = valuation_service.recompute(args.market, args.dry_run)
+        except Exception as e:
+            out.error(f"✗ 估值重算失敗: {str(e)}")
+            return
+        if not out.text:
+            out.records(dict(symbol=symbol, **{k: (None if v != v else v) for k, v in row.items()})
+                        for symbol, row in zip(result.index, result.to_dict('records')))
+        action = "已計算" if args.dry_run else "已更新"
+        out.info(f"✓ {args.market} {action} {len(result)} 檔股票估值 (缺少價格/已存價格/市值或價格單位不一致 {len(missing)} 檔)")
+        if missing and out.text:
+            print(f"  缺少: {', '.join(missing[:20])}{' ...' if len(missing) > 20 else ''}")
+
+    # 處理 http 子命令 - 上游連線池配置
+    elif args.command == 'http':
+        config_service = ConfigService()
+        if args.clear:
+            print(f"✓ {config_service.clear_http_config()}")
+        elif args.pool_size is not None or args.timeout is not None or args.retries is not None:
+            try:
+                print(f"✓ {config_service.update_http_config(args.pool_size, args.timeout, args.retries)}")
+            except ValueError as e:
+                print(f"✗ {str(e)}")
+                return
+        for key, value in config_service.show_http_config().items():
+            print(f"  {key}: {value}")
+
+    # 處理 backfill 子命令 - 時間序列缺漏回補
+    elif args.command == 'backfill':
+        targets = [(market, label) for market, enabled, label in (
+            ('cpi_us', args.cpi, '美國CPI'),
+            ('nfp_us', args.nfp, '美國NFP'),
+            ('oil', args.oil, 'WTI原油價格'),
+            ('gold', args.gold, '黃金期貨價格'),
+        ) if enabled]
+        if not targets:
+            print("請指定回補項目 (例: fund backfill --oil --gold)")
+            return
+
+        backfill_service = BackfillService(series_store=SeriesStore())
+        for market, label in targets:
+            try:
+                if args.dry_run:
+                    ranges = backfill_service.plan(market, args.start, args.end, args.max_gap)
+                    print(f"{label}: {len(ranges)} 個缺漏區間")
+                    for start, end in ranges:
+                        print(f"  {start} ~ {end}")
+                    continue
+
+                def report(start, end, result):
+                    if isinstance(result, int):
+                        print(f"  ✓ {start} ~ {end}: {result} 筆")
+                    else:
+                        print(f"  ✗ {start} ~ {end}: {result}")
+
+                print(f"正在回補{label}...")
+                results = backfill_service.backfill(market, args.start, args.end, args.workers, args.max_gap, report)
+                print(f"✓ {label}回補完成: {len(results)} 個區間")
+            except Exception as e:
+                print(f"✗ {label}回補失敗: {str(e)}")
+
+    # 處理 fields 子命令 - 欄位組合管理
+    elif args.command == 'fields':
+        config_service = ConfigService()
+
+        if args.profile and args.set:
+            try:
+                print(f"✓ {config_service.update_field_profile(args.profile, args.set)}")
+            except ValueError as e:
+                print(f"✗ {str(e)}")
+                return
+        elif args.profile and args.delete:
+            print(f"✓ {config_service.delete_field_profile(args.profile)}")
+
+        for name, profile_fields in config_service.show_field_profiles().items():
+            print(f"  {name}: {','.join(profile_fields)}")
+        print(f"\n  available: {','.join(FIELD_NAMES)}")
+
+    # 處理 queue 子命令 - 資料庫工作佇列
+    elif args.command == 'queue':
+        queue_service = JobQueueService()
+
+        if args.enqueue:
+            market = get_market(args)
+            if market is None or not args.symbols:
+                print("請提供股票代號與市場類型 (例: fund queue 2330 2317 --tw --enqueue --run nightly)")
+                return
+            added = queue_service.enqueue(args.run, args.symbols, market)
+            print(f"✓ 已加入 {added} 筆工作至 {args.run}")
+
+        if args.work:
+            # 佇列的 run 同時作為變動紀錄的 run id
+            os.environ.setdefault('FUND_RUN_ID', args.run)
+
+            def report(symbol, market, ok, payload):
+                if ok:
+                    print(f"✓ {symbol} ({market}) 基本面資料已成功儲存")
+                else:
+                    print(f"✗ {symbol} ({market}) 處理失敗: {payload}")
+
+            print(f"正在處理佇列 {args.run} (worker: {queue_service.worker_id})...")
+            done, failed = queue_service.work(args.run, args.batch, args.lease, args.max_attempts,
+                                              wait=args.wait, on_result=report)
+            print(f"✓ 本機完成 {done} 筆，失敗 {failed} 筆")
+
+        if args.status or not (args.enqueue or args.work):
+            status, failures = queue_service.status(args.run)
+            for key in ('pending', 'running', 'expired', 'done', 'failed'):
+                print(f"  {key}: {status.get(key, 0)}")
+            for symbol, market, attempts, error in failures:
+                print(f"  ✗ {symbol} ({market}) attempts={attempts}: {error}")
+
+    # 處理 symbols 子命令 - 代號解析索引
+    elif args.command == 'symbols':
+        resolver = SymbolResolverService()
+        if args.clear:
+            resolver.forget(args.symbols)
+            print(f"✓ 已清除 {', '.join(args.symbols) if args.symbols else '全部'} 代號解析快取")
+            return
+        entries = resolver.entries()
+        if not entries:
+            print("尚無代號解析紀錄 (使用 fund add <symbol> --auto 建立)")
+            return
+        for symbol, entry in entries:
+            if entry.get('missing'):
+                print(f"  ✗ {symbol:<12} 查無此代號")
+            else:
+                print(f"  ✓ {symbol:<12} {entry['ticker']:<14} ({entry['market']})")
+
+    # 處理 changes 子命令 - 基本面變動紀錄
+    elif args.command == 'changes':
+        change_service = ChangeFeedService()
+        if args.run:
+            write_changes(change_service.run_changes(args.run), args.file)
+            return
+        if not args.consumer:
+            print("請指定 --consumer 或 --run (例: fund changes --consumer screener)")
+            return
+        if args.reset is not None:
+            change_service.reset(args.consumer, args.reset)
+            print(f"✓ {args.consumer} 讀取位置已重設為 {args.reset}")
+            return
+        try:
+            # 輸出完成後才推進讀取位置
+            change_service.consume(args.consumer, args.limit, commit=not args.peek,
+                                   handler=lambda changes: write_changes(changes, args.file))
+        except Exception as e:
+            print(f"✗ 變動紀錄輸出失敗，讀取位置未推進: {str(e)}", file=sys.stderr)
+
+    # 處理 serve 子命令 - 本機唯讀 HTTP API
+    elif args.command == 'serve':
+        server = create_server(args.host, args.port, args.cache_size, args.revalidate)
+        print(f"✓ API server listening on http://{args.host}:{args.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("Server stopped")
+        finally:
+            server.server_close()
+
 def show_help():
     """幫助訊息"""
     help_text = f"""
@@ -373,6 +1027,16 @@ def show_help():
   {colorize('fund add', Colors.GREEN)}                             Query and store fundamental data
   {colorize('fund db', Colors.GREEN)}                              Database configuration and management
   {colorize('fund fred', Colors.GREEN)}                            FRED API configuration
+  {colorize('fund http', Colors.GREEN)}                            Shared upstream HTTP session pool settings
+  {colorize('fund series', Colors.GREEN)}                          Read macro/commodity series from the local memory-mapped store
+  {colorize('fund stream', Colors.GREEN)}                          Stream live quotes into the quotes table in micro-batches
+  {colorize('fund valuation', Colors.GREEN)}                       Recompute valuation ratios from stored fundamentals and prices
+  {colorize('fund backfill', Colors.GREEN)}                        Detect and fill gaps in stored daily/monthly series
+  {colorize('fund fields', Colors.GREEN)}                          Field projection profiles
+  {colorize('fund queue', Colors.GREEN)}                           Shared database work queue for multi-host ingestion
+  {colorize('fund symbols', Colors.GREEN)}                         Symbol resolution index used by --auto
+  {colorize('fund changes', Colors.GREEN)}                         Read the feed of fundamentals that actually changed
+  {colorize('fund serve', Colors.GREEN)}                           Start local read-only HTTP/JSON API
 
 {colorize('Fundamental Data Query:', Colors.BOLD + Colors.YELLOW)}
   {colorize('fund add', Colors.GREEN)} {colorize('<stock_symbol>', Colors.BLUE)} {colorize('--<market>', Colors.MAGENTA)}   Query stock fundamental data
@@ -387,10 +1051,51 @@ def show_help():
   {colorize('--us', Colors.MAGENTA)}        US Stock Market
   {colorize('--forex', Colors.MAGENTA)}     Foreign Exchange
   {colorize('--crypto', Colors.MAGENTA)}    Cryptocurrency
+  {colorize('--auto', Colors.MAGENTA)}      Detect the market (.TW/.TWO or US/crypto) once and cache it in .fund/symbols.json
   
 {colorize('Date Range Options:', Colors.BOLD + Colors.YELLOW)}
   {colorize('--start', Colors.MAGENTA)} {colorize('<date>', Colors.BLUE)}       Start date (YYYY-MM-DD format)
   {colorize('--end', Colors.MAGENTA)} {colorize('<date>', Colors.BLUE)}         End date (YYYY-MM-DD format)
+
+{colorize('Price History Options:', Colors.BOLD + Colors.YELLOW)}
+  {colorize('fund add', Colors.GREEN)} {colorize('<symbols>', Colors.BLUE)} {colorize('--<market> --history', Colors.MAGENTA)}   Bulk download daily OHLCV (only missing tail on later runs)
+  {colorize('--batch-size', Colors.MAGENTA)} {colorize('<n>', Colors.BLUE)}               Tickers per yf.download request (default 50)
+
+{colorize('Financial Statements:', Colors.BOLD + Colors.YELLOW)}
+  {colorize('fund add', Colors.GREEN)} {colorize('<symbols>', Colors.BLUE)} {colorize('--<market> --statements', Colors.MAGENTA)}   Quarterly/annual income, balance sheet and cash flow in long format
+  {colorize('--concurrency', Colors.MAGENTA)} {colorize('<N>', Colors.BLUE)}              Symbols downloaded at once; only newly reported periods are written
+
+{colorize('Incremental Options:', Colors.BOLD + Colors.YELLOW)}
+  {colorize('fund add --cpi --incremental', Colors.GREEN)}         Recompute YoY/MoM only for the changed tail
+  {colorize('--since', Colors.MAGENTA)} {colorize('<date>', Colors.BLUE)}                   Start of the changed window (default: latest stored date - 3 months)
+  {colorize('fund add --cpi --vintages', Colors.GREEN)}            Store every FRED release/revision (only values that changed)
+
+{colorize('Field Projection:', Colors.BOLD + Colors.YELLOW)}
+  {colorize('--fields', Colors.MAGENTA)} {colorize('<a,b,c|profile>', Colors.BLUE)}       Fetch, store and display only these fields
+  {colorize('fund fields --profile', Colors.GREEN)} {colorize('<name>', Colors.BLUE)} {colorize('--set', Colors.MAGENTA)} {colorize('<a,b,c>', Colors.BLUE)}   Save a field profile
+  {colorize('fund fields --profile', Colors.GREEN)} {colorize('<name>', Colors.BLUE)} {colorize('--delete', Colors.MAGENTA)}         Delete a field profile
+
+{colorize('Currency Options:', Colors.BOLD + Colors.YELLOW)}
+  {colorize('--currency', Colors.MAGENTA)} {colorize('<USD|TWD|...>', Colors.BLUE)}        Show market cap, cash, debt, revenue, price and 52-week range in one reporting currency
+                                 FX rates come from the forex market (=X), cached daily in .fund/fx_rates.json
+
+{colorize('Parallel Options:', Colors.BOLD + Colors.YELLOW)}
+  {colorize('--workers', Colors.MAGENTA)} {colorize('<N>', Colors.BLUE)}                  Shard symbols across N processes with one combined report
+  {colorize('--pipeline', Colors.MAGENTA)}                     Overlap fetch, transform and DB writes with bounded queues
+  {colorize('--concurrency', Colors.MAGENTA)} {colorize('<N>', Colors.BLUE)} {colorize('--queue-size', Colors.MAGENTA)} {colorize('<N>', Colors.BLUE)}  Concurrent fetches and per-stage queue capacity
+
+{colorize('Output Options:', Colors.BOLD + Colors.YELLOW)}
+  {colorize('--output', Colors.MAGENTA)} {colorize('<text|ndjson|csv|quiet>', Colors.BLUE)}  One compact record per symbol/date on stdout, status on stderr
+
+{colorize('Instrumentation Options:', Colors.BOLD + Colors.YELLOW)}
+  {colorize('--metrics', Colors.MAGENTA)} {colorize('<table|jsonl|prom>', Colors.BLUE)}   Report per-stage counts, latency and rows/bytes
+  {colorize('--metrics-file', Colors.MAGENTA)} {colorize('<path>', Colors.BLUE)}          Write the report to a file (e.g. Prometheus textfile)
+  {colorize('--profile', Colors.MAGENTA)} {colorize('<dir>', Colors.BLUE)}                Capture cProfile and tracemalloc output for the run
+
+{colorize('Record/Replay Options:', Colors.BOLD + Colors.YELLOW)}
+  {colorize('--record', Colors.MAGENTA)} {colorize('<dir>', Colors.BLUE)}                 Record every upstream response (gzip JSON)
+  {colorize('--replay', Colors.MAGENTA)} {colorize('<dir>', Colors.BLUE)}                 Serve upstream responses from a recording, no network
+  {colorize('--replay-latency', Colors.MAGENTA)} {colorize('<ms|recorded>', Colors.BLUE)} Simulate upstream latency while replaying
 {colorize('Database Configuration:', Colors.BOLD + Colors.YELLOW)}
   {colorize('fund db --host', Colors.GREEN)} {colorize('<address>', Colors.BLUE)}             Set database host
   {colorize('fund db --database', Colors.GREEN)} {colorize('<name>', Colors.BLUE)}            Set database name (if database does not exist, it will be created)
@@ -401,11 +1106,62 @@ def show_help():
   {colorize('fund db --config', Colors.GREEN)}                     Show database configuration
   {colorize('fund db --check', Colors.GREEN)}                      Check database connection
   {colorize('fund db --tables', Colors.GREEN)}                     Show database tables
+  {colorize('fund db --tables --stats', Colors.GREEN)}             Row count, size and last write per table from catalog views (no scans)
+  {colorize('fund db --layout', Colors.GREEN)} {colorize('<per_market|unified>', Colors.BLUE)}  Store all equity markets in one table keyed by (market, symbol)
+  {colorize('fund db --migrate-unified', Colors.GREEN)}            Move per-market tables into fundamental_data_equity (old names become views)
 
 {colorize('FRED API Configuration:', Colors.BOLD + Colors.YELLOW)}
   {colorize('fund fred --fred', Colors.GREEN)} {colorize('<API_Key>', Colors.BLUE)}           Set FRED API Key
   {colorize('fund fred --clear', Colors.GREEN)}                    Clear FRED API Key
 
+{colorize('Local Series Store:', Colors.BOLD + Colors.YELLOW)}
+  {colorize('fund series', Colors.GREEN)} {colorize('<cpi|nfp|oil|gold>', Colors.BLUE)} {colorize('[--start <date>] [--end <date>]', Colors.MAGENTA)}   Read memory-mapped local copy (no network, no DB)
+  {colorize('fund series', Colors.GREEN)} {colorize('<name>', Colors.BLUE)} {colorize('--rebuild', Colors.MAGENTA)}               Rebuild the local copy from the database
+  {colorize('fund series', Colors.GREEN)} {colorize('<cpi|nfp>', Colors.BLUE)} {colorize('--as-of', Colors.MAGENTA)} {colorize('<date>', Colors.BLUE)}        Series as it was known on that date (from stored vintages)
+
+{colorize('Valuation:', Colors.BOLD + Colors.YELLOW)}
+  {colorize('fund valuation', Colors.GREEN)} {colorize('<market>', Colors.BLUE)} {colorize('[--refresh] [--dry-run]', Colors.MAGENTA)}   Rescale market cap, P/E, P/B, P/S to stored prices in one pass
+
+{colorize('Live Quotes:', Colors.BOLD + Colors.YELLOW)}
+  {colorize('fund stream', Colors.GREEN)} {colorize('<symbols...>', Colors.BLUE)} {colorize('[--duration <sec>]', Colors.MAGENTA)}       Keep the latest tick per symbol, write on size/time trigger
+  {colorize('--batch-size', Colors.MAGENTA)} {colorize('<n>', Colors.BLUE)} {colorize('--flush-seconds', Colors.MAGENTA)} {colorize('<sec>', Colors.BLUE)}       Flush after n symbols or sec seconds, whichever comes first
+  {colorize('--mock', Colors.MAGENTA)}                               Connect to a local mock quote server instead of Yahoo
+
+{colorize('HTTP Session Configuration:', Colors.BOLD + Colors.YELLOW)}
+  {colorize('fund http --pool-size', Colors.GREEN)} {colorize('<n>', Colors.BLUE)}                Keep-alive connections per upstream (Yahoo, FRED)
+  {colorize('fund http --timeout', Colors.GREEN)} {colorize('<sec>', Colors.BLUE)} {colorize('--retries', Colors.MAGENTA)} {colorize('<n>', Colors.BLUE)}   Request timeout and FRED retries
+  {colorize('fund http --clear', Colors.GREEN)}                    Restore defaults
+
+{colorize('Gap Backfill:', Colors.BOLD + Colors.YELLOW)}
+  {colorize('fund backfill --oil --gold', Colors.GREEN)} {colorize('[--start <date>] [--end <date>]', Colors.MAGENTA)}   Fill missing business days
+  {colorize('fund backfill --cpi --nfp', Colors.GREEN)}                                        Fill missing months
+  {colorize('--workers', Colors.MAGENTA)} {colorize('<n>', Colors.BLUE)} {colorize('--max-gap', Colors.MAGENTA)} {colorize('<n>', Colors.BLUE)} {colorize('--dry-run', Colors.MAGENTA)}
+
+{colorize('Work Queue:', Colors.BOLD + Colors.YELLOW)}
+  {colorize('fund queue', Colors.GREEN)} {colorize('<symbols>', Colors.BLUE)} {colorize('--<market> --enqueue --run', Colors.MAGENTA)} {colorize('<id>', Colors.BLUE)}   Enqueue symbols for a run
+  {colorize('fund queue --work --run', Colors.GREEN)} {colorize('<id>', Colors.BLUE)}                    Claim batches (lease + skip locked) and ingest
+  {colorize('fund queue --status --run', Colors.GREEN)} {colorize('<id>', Colors.BLUE)}                  Show pending/running/done/failed counts
+  {colorize('--batch', Colors.MAGENTA)} {colorize('<n>', Colors.BLUE)} {colorize('--lease', Colors.MAGENTA)} {colorize('<sec>', Colors.BLUE)} {colorize('--max-attempts', Colors.MAGENTA)} {colorize('<n>', Colors.BLUE)} {colorize('--wait', Colors.MAGENTA)}
+
+{colorize('Symbol Resolution:', Colors.BOLD + Colors.YELLOW)}
+  {colorize('fund add', Colors.GREEN)} {colorize('<symbols>', Colors.BLUE)} {colorize('--auto', Colors.MAGENTA)}                Probe candidate suffixes in parallel on first use only
+  {colorize('fund symbols', Colors.GREEN)}                         List resolved and unknown symbols
+  {colorize('fund symbols', Colors.GREEN)} {colorize('[symbols]', Colors.BLUE)} {colorize('--clear', Colors.MAGENTA)}       Forget cached resolutions (unknown symbols expire after 7 days)
+
+{colorize('Change Feed:', Colors.BOLD + Colors.YELLOW)}
+  {colorize('fund add', Colors.GREEN)} {colorize('<symbols>', Colors.BLUE)} {colorize('--<market> --changes-file', Colors.MAGENTA)} {colorize('<path>', Colors.BLUE)}   Append this run's changes as NDJSON
+  {colorize('fund changes --consumer', Colors.GREEN)} {colorize('<name>', Colors.BLUE)}                 Emit unread changes and advance the stored offset
+  {colorize('fund changes --run', Colors.GREEN)} {colorize('<id>', Colors.BLUE)}                        Emit the changes of one run
+  {colorize('--peek', Colors.MAGENTA)} {colorize('--reset', Colors.MAGENTA)} {colorize('[id]', Colors.BLUE)} {colorize('--limit', Colors.MAGENTA)} {colorize('<n>', Colors.BLUE)} {colorize('--file', Colors.MAGENTA)} {colorize('<path>', Colors.BLUE)}
+
+{colorize('HTTP API:', Colors.BOLD + Colors.YELLOW)}
+  {colorize('fund serve', Colors.GREEN)} {colorize('--host', Colors.MAGENTA)} {colorize('<address>', Colors.BLUE)} {colorize('--port', Colors.MAGENTA)} {colorize('<port>', Colors.BLUE)}   Serve cached read endpoints
+    GET /symbols/<market>                 List stored symbols
+    GET /symbols/<market>/<symbol>        Fundamental data of one symbol
+    GET /screen/<market>?trailingPE_max=15&order=-marketCap
+    GET /screen/all?marketCap_min=1e10&order=-marketCap&fx=USD   Filter/sort/return amounts in one currency
+    GET /macro/<cpi|nfp|oil|gold>?start=<date>&end=<date>
+
 {colorize('Usage Examples:', Colors.BOLD + Colors.YELLOW)}
   {colorize('# Configure database', Colors.GRAY)}
   {colorize('fund db --host localhost --database FundDB --user sa --password YourPassword', Colors.GREEN)}
@@ -1,206 +1,340 @@
+from itertools import repeat
+import numpy as np
 import yfinance as yf
-from fredapi import Fred
 import pandas as pd
 from fund.config.fred_config import FredConfig
+from fund.providers.http_session import PooledFred, yahoo_session
+from fund.providers.records import FIELD_MAP, FIELD_NAMES, FundamentalRecord, SeriesBatch
+from fund.utils.metrics import metrics
+
+
+# 財務報表 -> yfinance Ticker 方法，頻率 -> freq 參數
+STATEMENT_METHODS = {
+    'income': 'get_income_stmt',
+    'balance': 'get_balance_sheet',
+    'cashflow': 'get_cash_flow',
+}
+STATEMENT_FREQUENCIES = {
+    'quarterly': 'quarterly',
+    'annual': 'yearly',
+}
+
+def monthly(series):
+    """將月資料對齊為連續月份 (每月第一天)，缺少或未公布的月份保留為 NaN，不讓後續月份錯位"""
+    return series.resample('MS').last()
+
+def derive_cpi(series):
+    """由 CPI 指數序列計算年增率與月增率 (依日曆月份，前值缺漏時為空)，只輸出有數值的月份"""
+    series = monthly(series)
+    frame = pd.DataFrame({
+        'value': series,
+        'YoY(%)': series.pct_change(periods=12, fill_method=None) * 100,
+        'MoM(%)': series.pct_change(periods=1, fill_method=None) * 100,
+    })
+    return frame[frame['value'].notna()]
+
+def derive_nfp(series):
+    """由 NFP 序列計算月變化量與年變化量 (依日曆月份，前值缺漏時為空)，只輸出有數值的月份"""
+    series = monthly(series)
+    frame = pd.DataFrame({
+        'value': series,
+        'MoM_Change': series.diff(periods=1),
+        'YoY_Change': series.diff(periods=12),
+    })
+    return frame[frame['value'].notna()]
+
+def frame_to_rows(frame):
+    """將衍生指標 DataFrame 轉為資料列 (日期字串、NaN 轉 None)"""
+    columns = list(frame.columns)
+    rows = []
+    for date, values in zip(frame.index, frame.itertuples(index=False, name=None)):
+        row = {'date': date.strftime("%Y-%m-%d")}
+        for column, value in zip(columns, values):
+            row[column] = float(value) if pd.notnull(value) else None
+        rows.append(row)
+    return rows
 
 class FundamentalDataProvider:
     """基本面數據提供類 - 負責從外部 API 獲取數據"""
     def __init__(self):
         self.fred_config = FredConfig()
         fred_api_key = self.fred_config.api_key
-        self.fred = Fred(api_key=fred_api_key) if fred_api_key else None
+        self.fred = PooledFred(api_key=fred_api_key) if fred_api_key else None
 
     def _ensure_fred_available(self):
         if not self.fred_config.is_configured():
             raise Exception("FRED API Key 未設定")
 
-    def get_fundamental_data(self, ticker: str):
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        
-        # 基本資訊
-        data = {
-            'symbol': info.get('symbol', ticker),
-            'shortName': info.get('shortName'),
-            'sector': info.get('sector'),
-            'industry': info.get('industry'),
-            'country': info.get('country'),
-            'currency': info.get('currency'),
-            'exchange': info.get('exchange'),
-            
-            # 估值指標
-            'marketCap': info.get('marketCap'),
-            'trailingPE': info.get('trailingPE'),
-            'forwardPE': info.get('forwardPE'),
-            'priceToBook': info.get('priceToBook'),
-            'priceToSales': info.get('priceToSalesTrailing12Months'),
-            'enterpriseToRevenue': info.get('enterpriseToRevenue'),
-            'enterpriseToEbitda': info.get('enterpriseToEbitda'),
-            'pegRatio': info.get('pegRatio'),
-            
-            # 財務健康度
-            'debtToEquity': info.get('debtToEquity'),
-            'currentRatio': info.get('currentRatio'),
-            'quickRatio': info.get('quickRatio'),
-            'totalCash': info.get('totalCash'),
-            'totalDebt': info.get('totalDebt'),
-            
-            # 獲利能力
-            'returnOnEquity': info.get('returnOnEquity'),
-            'returnOnAssets': info.get('returnOnAssets'),
-            'profitMargins': info.get('profitMargins'),
-            'operatingMargins': info.get('operatingMargins'),
-            'grossMargins': info.get('grossMargins'),
-            
-            # 成長性
-            'revenueGrowth': info.get('revenueGrowth'),
-            'earningsGrowth': info.get('earningsGrowth'),
-            'totalRevenue': info.get('totalRevenue'),
-            'netIncomeToCommon': info.get('netIncomeToCommon'),
-            
-            # 股利資訊
-            'dividendYield': info.get('dividendYield'),
-            'dividendRate': info.get('dividendRate'),
-            'payoutRatio': info.get('payoutRatio'),
-            'exDividendDate': str(info.get('exDividendDate', '')),
-            
-            # 股票資訊
-            'beta': info.get('beta'),
-            'bookValue': info.get('bookValue'),
-            'sharesOutstanding': info.get('sharesOutstanding'),
-            'fiftyTwoWeekHigh': info.get('fiftyTwoWeekHigh'),
-            'fiftyTwoWeekLow': info.get('fiftyTwoWeekLow'),
-            'averageVolume': info.get('averageVolume'),
-        }
-        return data
+    # --- 上游呼叫 (所有對 Yahoo / FRED 的請求皆經由此處) ---
+    def _ticker_info(self, ticker: str):
+        """取得 yfinance Ticker.info"""
+        with metrics.timer('provider.yf_info') as sample:
+            info = yf.Ticker(ticker, session=yahoo_session()).info
+            sample.rows = len(info)
+        return info
+
+    def _fred_series(self, series_id: str, **kwargs):
+        """取得 FRED 時間序列"""
+        with metrics.timer('provider.fred_series') as sample:
+            series = self.fred.get_series(series_id, **kwargs)
+            sample.rows = len(series)
+            sample.bytes = int(series.memory_usage(index=True))
+        return series
+
+    def _fred_releases(self, series_id: str, **kwargs):
+        """取得 FRED (ALFRED) 序列的所有發布版本，欄位為 date、realtime_start、value"""
+        with metrics.timer('provider.fred_releases') as sample:
+            frame = self.fred.get_series_all_releases(series_id, **kwargs)
+            sample.rows = len(frame)
+            sample.bytes = int(frame.memory_usage(index=True).sum())
+        return frame
+
+    def _price_history(self, ticker: str, **kwargs):
+        """取得 yfinance 歷史價格"""
+        with metrics.timer('provider.yf_history') as sample:
+            hist = yf.Ticker(ticker, session=yahoo_session()).history(**kwargs)
+            sample.rows = len(hist)
+            sample.bytes = int(hist.memory_usage(index=True).sum())
+        return hist
+
+    def _download(self, tickers, **kwargs):
+        """以 yf.download 一次取得多檔股票的歷史價格"""
+        with metrics.timer('provider.yf_download') as sample:
+            frame = yf.download(tickers, group_by='ticker', auto_adjust=False, actions=False,
+                                progress=False, threads=True, session=yahoo_session(), **kwargs)
+            sample.rows = len(frame) * len(tickers)
+            sample.bytes = int(frame.memory_usage(index=True).sum())
+        return frame
+
+    def _statement(self, ticker: str, statement: str, frequency: str):
+        """取得 yfinance 財務報表 (列為會計科目、欄為期末日)"""
+        with metrics.timer('provider.yf_statement') as sample:
+            stock = yf.Ticker(ticker, session=yahoo_session())
+            frame = getattr(stock, STATEMENT_METHODS[statement])(freq=STATEMENT_FREQUENCIES[frequency])
+            sample.rows = frame.size
+        return frame
+
+    def get_statements(self, ticker: str, since=None):
+        """取得季報與年報並轉為長格式 (symbol, statement, frequency, period, lineItem, value)
+
+        since 為 {(statement, frequency): 'YYYY-MM-DD'}，只保留期末日較新的期別；缺值不輸出。
+        """
+        since = since or {}
+        rows = []
+        for statement in STATEMENT_METHODS:
+            for frequency in STATEMENT_FREQUENCIES:
+                frame = self._statement(ticker, statement, frequency)
+                with metrics.timer('transform.statements') as sample:
+                    if frame is None or frame.empty:
+                        continue
+                    periods = pd.DatetimeIndex(frame.columns).strftime("%Y-%m-%d")
+                    keep = periods > since[(statement, frequency)] if (statement, frequency) in since else \
+                        np.ones(len(periods), dtype=bool)
+                    values = frame.to_numpy(dtype='float64', na_value=np.nan)[:, keep]
+                    items, cols = np.nonzero(~np.isnan(values))
+                    rows.extend(zip(
+                        repeat(ticker), repeat(statement), repeat(frequency),
+                        periods[keep][cols].tolist(), frame.index.astype(str)[items].tolist(),
+                        values[items, cols].tolist(),
+                    ))
+                    sample.rows = len(items)
+        return rows
+
+    def get_fundamental_data(self, ticker: str, fields=None):
+        """取得基本面資料，fields 指定時只輸出 symbol 與指定欄位"""
+        info = self._ticker_info(ticker)
+        with metrics.timer('transform.fundamental', rows=1):
+            return self._map_info(info, ticker, fields)
+
+    def _map_info(self, info, ticker: str, fields=None):
+        """將 Ticker.info 轉為 FundamentalRecord"""
+        columns = FIELD_NAMES if fields is None else tuple(c for c in FIELD_NAMES if c in fields)
+        record = FundamentalRecord(info.get('symbol', ticker), columns)
+        get = info.get
+        for column, info_key in FIELD_MAP:
+            if columns is not FIELD_NAMES and column not in fields:
+                continue
+            if column == 'exDividendDate':
+                record.exDividendDate = str(get(info_key, ''))
+            elif column == 'currentPrice':
+                # 抓取當下的價格 (估值重算以此為基準)；加密貨幣等沒有 currentPrice 時取 regularMarketPrice
+                price = get(info_key)
+                record.currentPrice = price if price is not None else get('regularMarketPrice')
+            else:
+                setattr(record, column, get(info_key))
+        return record
 
     def get_cpi_us(self):
         """取得美國CPI資料，並計算年增率與月增率"""
         self._ensure_fred_available()
-        cpi_series = self.fred.get_series('CPIAUCSL')
-        yoy_series = cpi_series.pct_change(periods=12) * 100
-        mom_series = cpi_series.pct_change(periods=1) * 100
-        latest_date = cpi_series.index[-1]
-        latest_value = cpi_series.iloc[-1]
-        yoy = yoy_series.iloc[-1]
-        mom = mom_series.iloc[-1]
-        return {
-            'date': latest_date.strftime("%Y-%m-%d"),
-            'value': float(latest_value),
-            'YoY(%)': float(yoy) if pd.notnull(yoy) else None,
-            'MoM(%)': float(mom) if pd.notnull(mom) else None
-        }
+        cpi_series = self._fred_series('CPIAUCSL')
+        with metrics.timer('transform.cpi_us', rows=1):
+            yoy_series = cpi_series.pct_change(periods=12) * 100
+            mom_series = cpi_series.pct_change(periods=1) * 100
+            latest_date = cpi_series.index[-1]
+            latest_value = cpi_series.iloc[-1]
+            yoy = yoy_series.iloc[-1]
+            mom = mom_series.iloc[-1]
+            return {
+                'date': latest_date.strftime("%Y-%m-%d"),
+                'value': float(latest_value),
+                'YoY(%)': float(yoy) if pd.notnull(yoy) else None,
+                'MoM(%)': float(mom) if pd.notnull(mom) else None
+            }
 
     def get_nfp_us(self):
         """取得美國NFP資料，並計算月變化量與年變化量"""
         self._ensure_fred_available()
-        nfp_series = self.fred.get_series('PAYEMS')
-        mom_change_series = nfp_series.diff(periods=1)
-        yoy_change_series = nfp_series.diff(periods=12)
-        latest_date = nfp_series.index[-1]
-        latest_value = nfp_series.iloc[-1]
-        mom_change = mom_change_series.iloc[-1]
-        yoy_change = yoy_change_series.iloc[-1]
-        return {
-            'date': latest_date.strftime("%Y-%m-%d"),
-            'value': float(latest_value),
-            'MoM_Change': float(mom_change) if pd.notnull(mom_change) else None,
-            'YoY_Change': float(yoy_change) if pd.notnull(yoy_change) else None
-        }
+        nfp_series = self._fred_series('PAYEMS')
+        with metrics.timer('transform.nfp_us', rows=1):
+            mom_change_series = nfp_series.diff(periods=1)
+            yoy_change_series = nfp_series.diff(periods=12)
+            latest_date = nfp_series.index[-1]
+            latest_value = nfp_series.iloc[-1]
+            mom_change = mom_change_series.iloc[-1]
+            yoy_change = yoy_change_series.iloc[-1]
+            return {
+                'date': latest_date.strftime("%Y-%m-%d"),
+                'value': float(latest_value),
+                'MoM_Change': float(mom_change) if pd.notnull(mom_change) else None,
+                'YoY_Change': float(yoy_change) if pd.notnull(yoy_change) else None
+            }
+
+    def _lookback_window(self, start_date, end_date, months=13):
+        """期間查詢只下載所需範圍，並往前多取 13 個月供 YoY 計算"""
+        start = (pd.Timestamp(start_date) - pd.DateOffset(months=months)).strftime("%Y-%m-%d")
+        return {'observation_start': start, 'observation_end': end_date}
 
     def get_cpi_us_range(self, start_date, end_date):
         """取得美國CPI指定期間資料，並計算年增率與月增率"""
         self._ensure_fred_available()
-        cpi_series = self.fred.get_series('CPIAUCSL')
-        yoy_series = cpi_series.pct_change(periods=12) * 100
-        mom_series = cpi_series.pct_change(periods=1) * 100
-        filtered = cpi_series[(cpi_series.index >= start_date) & (cpi_series.index <= end_date)]
-        result = []
-        for date, value in filtered.items():
-            yoy = yoy_series.get(date, None)
-            mom = mom_series.get(date, None)
-            result.append({
-                'date': date.strftime("%Y-%m-%d"),
-                'value': float(value),
-                'YoY(%)': float(yoy) if pd.notnull(yoy) else None,
-                'MoM(%)': float(mom) if pd.notnull(mom) else None
-            })
+        cpi_series = self._fred_series('CPIAUCSL', **self._lookback_window(start_date, end_date))
+        with metrics.timer('transform.cpi_us') as sample:
+            derived = derive_cpi(cpi_series)
+            result = SeriesBatch.from_frame(derived[(derived.index >= start_date) & (derived.index <= end_date)])
+            sample.rows = len(result)
         return result
 
     def get_nfp_us_range(self, start_date, end_date):
         """取得美國NFP指定期間資料，並計算月變化量與年變化量"""
         self._ensure_fred_available()
-        nfp_series = self.fred.get_series('PAYEMS')
-        mom_change_series = nfp_series.diff(periods=1)
-        yoy_change_series = nfp_series.diff(periods=12)
-        filtered = nfp_series[(nfp_series.index >= start_date) & (nfp_series.index <= end_date)]
-        result = []
-        for date, value in filtered.items():
-            mom_change = mom_change_series.get(date, None)
-            yoy_change = yoy_change_series.get(date, None)
-            result.append({
-                'date': date.strftime("%Y-%m-%d"),
-                'value': float(value),
-                'MoM_Change': float(mom_change) if pd.notnull(mom_change) else None,
-                'YoY_Change': float(yoy_change) if pd.notnull(yoy_change) else None
-            })
+        nfp_series = self._fred_series('PAYEMS', **self._lookback_window(start_date, end_date))
+        with metrics.timer('transform.nfp_us') as sample:
+            derived = derive_nfp(nfp_series)
+            result = SeriesBatch.from_frame(derived[(derived.index >= start_date) & (derived.index <= end_date)])
+            sample.rows = len(result)
+        return result
+
+    def get_price_history_batch(self, tickers, start_date=None, end_date=None):
+        """批次取得多檔股票日線 OHLCV，回傳長格式資料列 (symbol, date, ...)"""
+        kwargs = {}
+        if start_date:
+            kwargs['start'] = start_date
+        if end_date:
+            kwargs['end'] = end_date
+        if not kwargs:
+            kwargs['period'] = 'max'
+        frame = self._download(list(tickers), **kwargs)
+        with metrics.timer('transform.price_history') as sample:
+            rows = []
+            if frame is None or frame.empty:
+                return rows
+            multi = isinstance(frame.columns, pd.MultiIndex)
+            for ticker in tickers:
+                if multi:
+                    if ticker not in frame.columns.get_level_values(0):
+                        continue
+                    sub = frame[ticker]
+                else:
+                    sub = frame
+                sub = sub.dropna(subset=['Close'])
+                for date, o, h, l, c, adj, v in zip(
+                    sub.index, sub['Open'], sub['High'], sub['Low'], sub['Close'],
+                    sub['Adj Close'] if 'Adj Close' in sub else sub['Close'], sub['Volume']
+                ):
+                    rows.append((
+                        ticker, date.strftime("%Y-%m-%d"),
+                        float(o) if pd.notnull(o) else None,
+                        float(h) if pd.notnull(h) else None,
+                        float(l) if pd.notnull(l) else None,
+                        float(c),
+                        float(adj) if pd.notnull(adj) else None,
+                        int(v) if pd.notnull(v) else None,
+                    ))
+            sample.rows = len(rows)
+        return rows
+
+    def get_fred_series_since(self, series_id: str, start_date=None):
+        """取得 FRED 序列 (僅下載 start_date 之後的觀測值)"""
+        self._ensure_fred_available()
+        if start_date is None:
+            return self._fred_series(series_id)
+        return self._fred_series(series_id, observation_start=start_date)
+
+    def get_fred_vintages(self, series_id: str, since=None):
+        """取得 FRED 序列各觀測日的所有發布版本，回傳依 (date, vintage) 排序的 DataFrame (date, vintage, value)
+
+        since 指定時只下載該日之後仍有效或新發布的版本 (realtime_start=since)。
+        """
+        self._ensure_fred_available()
+        kwargs = {'realtime_start': since} if since else {}
+        frame = self._fred_releases(series_id, **kwargs)
+        with metrics.timer('transform.fred_vintages') as sample:
+            result = pd.DataFrame({
+                'date': pd.to_datetime(frame['date']).to_numpy(dtype='datetime64[D]'),
+                'vintage': pd.to_datetime(frame['realtime_start']).to_numpy(dtype='datetime64[D]'),
+                'value': pd.to_numeric(frame['value'], errors='coerce').to_numpy(dtype='float64'),
+            }).sort_values(['date', 'vintage'], kind='stable', ignore_index=True)
+            sample.rows = len(result)
         return result
 
     def get_oil_price(self):
         """取得最新WTI原油價格 (DCOILWTICO)"""
         self._ensure_fred_available()
-        oil_series = self.fred.get_series('DCOILWTICO')
-        # 過濾掉缺失值
-        oil_series = oil_series.dropna()
-        latest_date = oil_series.index[-1]
-        latest_value = oil_series.iloc[-1]
-        return {
-            'date': latest_date.strftime("%Y-%m-%d"),
-            'symbol': 'DCOILWTICO',
-            'value': float(latest_value)
-        }
+        oil_series = self._fred_series('DCOILWTICO')
+        with metrics.timer('transform.oil', rows=1):
+            # 過濾掉缺失值
+            oil_series = oil_series.dropna()
+            latest_date = oil_series.index[-1]
+            latest_value = oil_series.iloc[-1]
+            return {
+                'date': latest_date.strftime("%Y-%m-%d"),
+                'symbol': 'DCOILWTICO',
+                'value': float(latest_value)
+            }
 
     def get_oil_price_range(self, start_date, end_date):
         """取得WTI原油價格指定期間資料 (DCOILWTICO)"""
         self._ensure_fred_available()
-        oil_series = self.fred.get_series('DCOILWTICO')
-        oil_series = oil_series.dropna()
-        filtered = oil_series[(oil_series.index >= start_date) & (oil_series.index <= end_date)]
-        result = []
-        for date, value in filtered.items():
-            result.append({
-                'date': date.strftime("%Y-%m-%d"),
-                'symbol': 'DCOILWTICO',
-                'value': float(value)
-            })
+        oil_series = self._fred_series('DCOILWTICO', observation_start=start_date, observation_end=end_date)
+        with metrics.timer('transform.oil') as sample:
+            oil_series = oil_series.dropna()
+            filtered = oil_series[(oil_series.index >= start_date) & (oil_series.index <= end_date)]
+            result = SeriesBatch.from_series(filtered, constants={'symbol': 'DCOILWTICO'})
+            sample.rows = len(result)
         return result
 
     def get_gold_price(self):
         """取得最新黃金期貨價格 (GC=F)"""
         self._ensure_fred_available()
-        ticker = yf.Ticker("GC=F")
-        hist = ticker.history(period="max")
-        hist = hist.dropna(subset=["Close"])
-        latest_row = hist.iloc[-1]
-        latest_date = hist.index[-1]
-        latest_value = latest_row["Close"]
-        return {
-            'date': latest_date.strftime("%Y-%m-%d"),
-            'symbol': 'GC=F',
-            'value': float(latest_value)
-        }
+        hist = self._price_history("GC=F", period="max")
+        with metrics.timer('transform.gold', rows=1):
+            hist = hist.dropna(subset=["Close"])
+            latest_row = hist.iloc[-1]
+            latest_date = hist.index[-1]
+            latest_value = latest_row["Close"]
+            return {
+                'date': latest_date.strftime("%Y-%m-%d"),
+                'symbol': 'GC=F',
+                'value': float(latest_value)
+            }
 
     def get_gold_price_range(self, start_date, end_date):
         """取得黃金期貨指定期間價格 (GC=F)"""
         self._ensure_fred_available()
-        ticker = yf.Ticker("GC=F")
-        hist = ticker.history(start=start_date, end=end_date)
-        hist = hist.dropna(subset=["Close"])
-        result = []
-        for date, row in hist.iterrows():
-            result.append({
-                'date': date.strftime("%Y-%m-%d"),
-                'symbol': 'GC=F',
-                'value': float(row["Close"])
-            })
+        hist = self._price_history("GC=F", start=start_date, end=end_date)
+        with metrics.timer('transform.gold') as sample:
+            hist = hist.dropna(subset=["Close"])
+            result = SeriesBatch.from_series(hist["Close"], constants={'symbol': 'GC=F'})
+            sample.rows = len(result)
         return result
\ No newline at end of file
@@ -0,0 +1,66 @@
+import os
+import threading
+import xml.etree.ElementTree as ET
+import requests
+from curl_cffi import CurlOpt
+from curl_cffi import requests as curl_requests
+from fredapi import Fred
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from fund.config.http_config import HttpConfig
+
+# 每個行程、每個上游各一個 session (fork 後的子行程會建立自己的 session)
+_sessions = {}
+_lock = threading.Lock()
+
+def _shared(name, factory):
+    key = (name, os.getpid())
+    session = _sessions.get(key)
+    if session is None:
+        with _lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = _sessions[key] = factory(HttpConfig())
+    return session
+
+def _create_yahoo_session(config):
+    # yfinance 需要 curl_cffi 的瀏覽器指紋；每個執行緒各自持有 curl handle，MAXCONNECTS 為其連線快取大小
+    return curl_requests.Session(
+        impersonate="chrome",
+        timeout=config.timeout,
+        curl_options={CurlOpt.MAXCONNECTS: config.pool_size},
+    )
+
+def _create_fred_session(config):
+    session = requests.Session()
+    retry = Retry(total=config.retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=("GET",))
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.headers["Accept-Encoding"] = "gzip, deflate"
+    session.request_timeout = config.timeout
+    return session
+
+def yahoo_session():
+    """Yahoo 共用 keep-alive session (含 cookie/crumb，整次執行只協商一次)"""
+    return _shared('yahoo', _create_yahoo_session)
+
+def fred_session():
+    """FRED 共用 keep-alive session (連線池 + gzip + 重試)"""
+    return _shared('fred', _create_fred_session)
+
+class PooledFred(Fred):
+    """以共用 requests session 取代 fredapi 每次請求新建的 urlopen 連線"""
+
+    def __init__(self, api_key, session=None):
+        super().__init__(api_key=api_key)
+        self.session = session or fred_session()
+
+    def _Fred__fetch_data(self, url):
+        # 覆寫 fredapi 的私有方法 Fred.__fetch_data
+        response = self.session.get(url + '&api_key=' + self.api_key,
+                                    timeout=getattr(self.session, 'request_timeout', None))
+        root = ET.fromstring(response.content)
+        if response.status_code >= 400:
+            raise ValueError(root.get('message'))
+        return root
@@ -0,0 +1,120 @@
+import asyncio
+import base64
+import json
+import random
+import time
+from datetime import datetime, timezone
+import yfinance as yf
+from yfinance.pricing_pb2 import PricingData
+from websockets.asyncio.server import serve
+
+YAHOO_STREAM_URL = "wss://streamer.finance.yahoo.com/?version=2"
+
+def _float(value):
+    return float(value) if value is not None else None
+
+def parse_tick(message):
+    """將解碼後的報價訊息轉為資料列 tuple (依 QUOTE_COLUMNS 順序)，無法辨識時回傳 None
+
+    protobuf 的 int64 欄位 (time、day_volume) 經 MessageToDict 後為字串。
+    """
+    symbol = message.get('id')
+    price = message.get('price')
+    if not symbol or price is None:
+        return None
+    millis = message.get('time')
+    quote_time = (datetime.fromtimestamp(int(millis) / 1000, tz=timezone.utc).replace(tzinfo=None)
+                  if millis else datetime.now(timezone.utc).replace(tzinfo=None))
+    volume = message.get('day_volume')
+    return (
+        symbol,
+        float(price),
+        _float(message.get('change')),
+        _float(message.get('change_percent')),
+        int(volume) if volume is not None else None,
+        _float(message.get('day_high')),
+        _float(message.get('day_low')),
+        quote_time,
+    )
+
+class QuoteStreamProvider:
+    """即時報價串流 - 以 yfinance AsyncWebSocket 訂閱代號，逐筆回呼解碼後的報價訊息"""
+
+    def __init__(self, url=YAHOO_STREAM_URL):
+        self.url = url
+
+    async def listen(self, symbols, on_message):
+        """訂閱並持續接收報價，連線結束時返回"""
+        ws = yf.AsyncWebSocket(url=self.url, verbose=False)
+        try:
+            await ws.subscribe(list(symbols))
+            await ws.listen(on_message)
+        finally:
+            await ws.close()
+
+def encode_tick(symbol, price, change=None, change_percent=None, day_volume=None, millis=None):
+    """以 Yahoo 串流相同的格式 (base64 protobuf 包在 JSON 中) 編碼一筆報價"""
+    data = PricingData(id=symbol, price=price, time=millis if millis is not None else int(time.time() * 1000))
+    if change is not None:
+        data.change = change
+    if change_percent is not None:
+        data.change_percent = change_percent
+    if day_volume is not None:
+        data.day_volume = day_volume
+    return json.dumps({'type': 'pricing', 'message': base64.b64encode(data.SerializeToString()).decode('ascii')})
+
+class MockQuoteServer:
+    """本機模擬報價伺服器 - 對已訂閱的代號推送隨機漫步報價 (測試與離線使用)
+
+    async with MockQuoteServer() as server: 後以 server.url 建立 QuoteStreamProvider。
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, ticks_per_second=200, seed=0):
+        self.host = host
+        self.port = port
+        self.interval = 1 / ticks_per_second
+        self.random = random.Random(seed)
+        self.url = None
+        self._server = None
+
+    async def _handler(self, connection):
+        subscriptions = []
+        prices = {}
+
+        async def receive():
+            async for message in connection:
+                request = json.loads(message)
+                for symbol in request.get('subscribe', []):
+                    if symbol not in subscriptions:
+                        subscriptions.append(symbol)
+                for symbol in request.get('unsubscribe', []):
+                    if symbol in subscriptions:
+                        subscriptions.remove(symbol)
+
+        receiver = asyncio.create_task(receive())
+        volume = 0
+        try:
+            while not receiver.done():
+                await asyncio.sleep(self.interval)
+                if not subscriptions:
+                    continue
+                symbol = self.random.choice(subscriptions)
+                open_price = 100.0
+                price = prices[symbol] = max(0.01, prices.get(symbol, open_price) * (1 + self.random.gauss(0, 0.001)))
+                change = price - open_price
+                volume += self.random.randint(1, 1000)
+                await connection.send(encode_tick(symbol, price, change, change / open_price * 100, volume))
+        except Exception:
+            pass
+        finally:
+            receiver.cancel()
+
+    async def __aenter__(self):
+        self._server = await serve(self._handler, self.host, self.port)
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f"ws://{self.host}:{port}"
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self._server.close()
+        await self._server.wait_closed()
@@ -0,0 +1,211 @@
+from collections.abc import Mapping
+from itertools import repeat
+from operator import attrgetter
+import numpy as np
+import pandas as pd
+
+# 資料表欄位 -> Ticker.info 鍵值 (symbol 固定輸出，不列於此)
+FIELD_MAP = (
+    # 基本資訊
+    ('shortName', 'shortName'),
+    ('sector', 'sector'),
+    ('industry', 'industry'),
+    ('country', 'country'),
+    ('currency', 'currency'),
+    ('financialCurrency', 'financialCurrency'),
+    ('exchange', 'exchange'),
+
+    # 估值指標
+    ('marketCap', 'marketCap'),
+    ('trailingPE', 'trailingPE'),
+    ('forwardPE', 'forwardPE'),
+    ('priceToBook', 'priceToBook'),
+    ('priceToSales', 'priceToSalesTrailing12Months'),
+    ('enterpriseToRevenue', 'enterpriseToRevenue'),
+    ('enterpriseToEbitda', 'enterpriseToEbitda'),
+    ('pegRatio', 'pegRatio'),
+
+    # 財務健康度
+    ('debtToEquity', 'debtToEquity'),
+    ('currentRatio', 'currentRatio'),
+    ('quickRatio', 'quickRatio'),
+    ('totalCash', 'totalCash'),
+    ('totalDebt', 'totalDebt'),
+
+    # 獲利能力
+    ('returnOnEquity', 'returnOnEquity'),
+    ('returnOnAssets', 'returnOnAssets'),
+    ('profitMargins', 'profitMargins'),
+    ('operatingMargins', 'operatingMargins'),
+    ('grossMargins', 'grossMargins'),
+
+    # 成長性
+    ('revenueGrowth', 'revenueGrowth'),
+    ('earningsGrowth', 'earningsGrowth'),
+    ('totalRevenue', 'totalRevenue'),
+    ('netIncomeToCommon', 'netIncomeToCommon'),
+
+    # 股利資訊
+    ('dividendYield', 'dividendYield'),
+    ('dividendRate', 'dividendRate'),
+    ('payoutRatio', 'payoutRatio'),
+    ('exDividendDate', 'exDividendDate'),
+
+    # 股票資訊
+    ('beta', 'beta'),
+    ('bookValue', 'bookValue'),
+    ('sharesOutstanding', 'sharesOutstanding'),
+    ('currentPrice', 'currentPrice'),
+    ('fiftyTwoWeekHigh', 'fiftyTwoWeekHigh'),
+    ('fiftyTwoWeekLow', 'fiftyTwoWeekLow'),
+    ('averageVolume', 'averageVolume'),
+)
+
+FIELD_NAMES = tuple(column for column, _ in FIELD_MAP)
+
+# 即時報價欄位 (parse_tick 產生的 tuple 與 save_quotes 寫入順序)
+QUOTE_COLUMNS = ('symbol', 'price', 'change', 'changePercent', 'dayVolume', 'dayHigh', 'dayLow', 'quoteTime')
+
+_RECORD_KEYS = frozenset(('symbol',) + FIELD_NAMES)
+
+# 欄位組合 -> attrgetter (欄位投影的組合有限，重複使用)
+_GETTERS = {}
+
+def _getter(columns):
+    getter = _GETTERS.get(columns)
+    if getter is None:
+        if len(columns) == 1:
+            single = attrgetter(columns[0])
+            getter = lambda record: (single(record),)
+        else:
+            getter = attrgetter(*columns) if columns else (lambda record: ())
+        _GETTERS[columns] = getter
+    return getter
+
+def _days(index):
+    """DatetimeIndex 轉為 datetime64[D] (有時區時以當地日期為準)"""
+    if getattr(index, 'tz', None) is not None:
+        index = index.tz_localize(None)
+    return index.values.astype('datetime64[D]')
+
+class FundamentalRecord(Mapping):
+    """單檔股票基本面資料 - 以 __slots__ 儲存欄位，並提供與 dict 相同的唯讀介面
+
+    columns 為實際輸出的欄位 (symbol 以外，依 FIELD_MAP 順序)，--fields 投影時未列出的欄位不存在。
+    """
+
+    __slots__ = ('symbol', 'columns') + FIELD_NAMES
+
+    def __init__(self, symbol, columns=FIELD_NAMES, values=()):
+        self.symbol = symbol
+        self.columns = columns
+        for column, value in zip(columns, values):
+            setattr(self, column, value)
+
+    def values_tuple(self):
+        """依 columns 順序取得欄位值 (寫入資料庫用)"""
+        return _getter(self.columns)(self)
+
+    def __getitem__(self, key):
+        if key not in _RECORD_KEYS:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __iter__(self):
+        yield 'symbol'
+        yield from self.columns
+
+    def __len__(self):
+        return len(self.columns) + 1
+
+    def __repr__(self):
+        return f"FundamentalRecord({dict(self)!r})"
+
+    def __reduce__(self):
+        return (FundamentalRecord, (self.symbol, self.columns, self.values_tuple()))
+
+class SeriesBatch:
+    """多筆時間序列資料 - 日期與數值各為一個連續陣列，逐筆存取時才組成資料列
+
+    dates 為 datetime64[D] 陣列，values 為 (筆數, 欄位數) 的 float64 陣列 (缺值為 NaN)，
+    constants 為每筆相同的字串欄位 (例如 symbol)。迭代時產生與原本相同格式的 dict。
+    """
+
+    __slots__ = ('dates', 'columns', 'values', 'constants')
+
+    def __init__(self, dates, columns, values, constants=None):
+        self.dates = np.asarray(dates, dtype='datetime64[D]')
+        self.columns = tuple(columns)
+        self.values = np.asarray(values, dtype='float64').reshape(len(self.dates), len(self.columns))
+        self.constants = constants or {}
+
+    @classmethod
+    def from_frame(cls, frame, constants=None):
+        """由以日期為索引的 DataFrame 建立"""
+        return cls(_days(frame.index), frame.columns,
+                   frame.to_numpy(dtype='float64', na_value=np.nan), constants)
+
+    @classmethod
+    def from_series(cls, series, column='value', constants=None):
+        """由以日期為索引的 Series 建立"""
+        return cls(_days(series.index), (column,),
+                   series.to_numpy(dtype='float64', na_value=np.nan).reshape(-1, 1), constants)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def column(self, name):
+        """取得單一欄位的陣列 (view)"""
+        return self.values[:, self.columns.index(name)]
+
+    def rows(self, columns):
+        """逐筆產生 (日期字串, 欄位值...) tuple，NaN 轉為 None"""
+        dates = np.datetime_as_string(self.dates, unit='D').tolist()
+        lists = []
+        for name in columns:
+            if name in self.constants:
+                lists.append(repeat(self.constants[name], len(dates)))
+            elif name in self.columns:
+                column = self.column(name)
+                lists.append(np.where(np.isnan(column), None, column).tolist())
+            else:
+                lists.append(repeat(None, len(dates)))
+        return zip(dates, *lists)
+
+    def __iter__(self):
+        keys = ('date',) + tuple(self.constants) + self.columns
+        for row in self.rows(keys[1:]):
+            yield dict(zip(keys, row))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return SeriesBatch(self.dates[index], self.columns, self.values[index], self.constants)
+        index = range(len(self))[index]
+        return next(iter(self[index:index + 1]))
+
+    def to_rows(self):
+        """轉為資料列 list"""
+        return list(self)
+
+    def to_frame(self):
+        """轉為 DataFrame (索引為日期)"""
+        return pd.DataFrame(self.values, index=pd.DatetimeIndex(self.dates, name='date'),
+                            columns=list(self.columns), copy=False)
+
+def series_rows(data, columns):
+    """以 (日期, 欄位值...) tuple 逐筆取得時間序列資料，data 可為 SeriesBatch、資料列 list 或單筆 dict"""
+    if isinstance(data, SeriesBatch):
+        return data.rows(columns)
+    if isinstance(data, dict):
+        data = [data]
+    return ((item['date'], *(item.get(column) for column in columns)) for item in data)
+
+def record_values(data):
+    """取得 symbol 以外的 (欄位, 欄位值)，data 可為 FundamentalRecord 或 dict"""
+    if isinstance(data, FundamentalRecord):
+        return data.columns, data.values_tuple()
+    columns = tuple(col for col in data if col != 'symbol')
+    return columns, tuple(data[col] for col in columns)
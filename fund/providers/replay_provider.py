@@ -0,0 +1,190 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+from urllib.parse import quote
+import pandas as pd
+from fund.providers.fundamental_data_provider import FundamentalDataProvider
+from fund.utils.metrics import metrics
+
+class ResponseStore:
+    """上游回應的錄製檔案庫 - 每筆回應以 gzip 壓縮的 JSON 存於 {root}/{kind}/{key}.json.gz"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, kind, name, params):
+        key = name
+        if params:
+            key += '__' + '&'.join(f"{k}={params[k]}" for k in sorted(params))
+        filename = quote(key, safe='')
+        if len(filename) > 150:
+            # 多檔代號合併下載時鍵值過長，改用雜湊避免超過檔名長度限制
+            filename = filename[:80] + '-' + hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.root, kind, filename + '.json.gz')
+
+    def save(self, kind, name, params, payload):
+        path = self._path(kind, name, params)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(',', ':'), default=str)
+        os.replace(tmp_path, path)
+
+    def load(self, kind, name, params):
+        path = self._path(kind, name, params)
+        if not os.path.exists(path):
+            raise Exception(f"找不到錄製資料: {kind}/{name} {params or ''}".rstrip())
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+
+def _series_to_payload(series):
+    return {
+        'index': [ts.isoformat() for ts in series.index],
+        'values': [None if pd.isnull(v) else float(v) for v in series.values],
+    }
+
+def _payload_to_series(payload):
+    return pd.Series(payload['values'], index=pd.DatetimeIndex(pd.to_datetime(payload['index'])), dtype='float64')
+
+def _frame_to_payload(frame):
+    tz = str(frame.index.tz) if getattr(frame.index, 'tz', None) is not None else None
+    return {
+        'tz': tz,
+        'index': [ts.isoformat() for ts in frame.index],
+        'columns': [list(c) if isinstance(c, tuple) else str(c) for c in frame.columns],
+        'data': frame.astype('float64').where(frame.notnull(), None).values.tolist(),
+    }
+
+def _payload_to_frame(payload):
+    if payload['tz']:
+        index = pd.to_datetime(payload['index'], utc=True).tz_convert(payload['tz'])
+    else:
+        index = pd.to_datetime(payload['index'])
+    columns = payload['columns']
+    if columns and isinstance(columns[0], list):
+        columns = pd.MultiIndex.from_tuples([tuple(c) for c in columns])
+    return pd.DataFrame(payload['data'], index=index, columns=columns, dtype='float64')
+
+def _releases_to_payload(frame):
+    return {
+        'date': [pd.Timestamp(d).strftime("%Y-%m-%d") for d in frame['date']],
+        'realtime_start': [pd.Timestamp(d).strftime("%Y-%m-%d") for d in frame['realtime_start']],
+        'value': [None if pd.isnull(v) else float(v) for v in frame['value']],
+    }
+
+def _payload_to_releases(payload):
+    return pd.DataFrame({
+        'date': pd.to_datetime(payload['date']),
+        'realtime_start': pd.to_datetime(payload['realtime_start']),
+        'value': pd.Series(payload['value'], dtype='float64'),
+    })
+
+class RecordingFundamentalDataProvider(FundamentalDataProvider):
+    """錄製模式 - 正常呼叫上游，並將每筆回應 (含錯誤與耗時) 寫入錄製目錄"""
+
+    def __init__(self, record_dir):
+        super().__init__()
+        self.store = ResponseStore(record_dir)
+
+    def _record(self, kind, name, params, fetch, encode):
+        start = time.perf_counter()
+        try:
+            result = fetch()
+        except Exception as e:
+            self.store.save(kind, name, params, {'error': str(e), 'elapsed': time.perf_counter() - start})
+            raise
+        self.store.save(kind, name, params, {'data': encode(result), 'elapsed': time.perf_counter() - start})
+        return result
+
+    def _ticker_info(self, ticker: str):
+        return self._record('info', ticker, None,
+                            lambda: super(RecordingFundamentalDataProvider, self)._ticker_info(ticker),
+                            lambda info: info)
+
+    def _fred_series(self, series_id: str, **kwargs):
+        return self._record('fred', series_id, kwargs,
+                            lambda: super(RecordingFundamentalDataProvider, self)._fred_series(series_id, **kwargs),
+                            _series_to_payload)
+
+    def _fred_releases(self, series_id: str, **kwargs):
+        return self._record('fred_releases', series_id, kwargs,
+                            lambda: super(RecordingFundamentalDataProvider, self)._fred_releases(series_id, **kwargs),
+                            _releases_to_payload)
+
+    def _price_history(self, ticker: str, **kwargs):
+        return self._record('history', ticker, kwargs,
+                            lambda: super(RecordingFundamentalDataProvider, self)._price_history(ticker, **kwargs),
+                            _frame_to_payload)
+
+    def _statement(self, ticker: str, statement: str, frequency: str):
+        # 報表以期末日為列轉置後存檔，與價格資料共用格式
+        return self._record('statements', ticker, {'statement': statement, 'frequency': frequency},
+                            lambda: super(RecordingFundamentalDataProvider, self)._statement(ticker, statement, frequency),
+                            lambda frame: _frame_to_payload(frame.T))
+
+    def _download(self, tickers, **kwargs):
+        return self._record('download', ','.join(tickers), kwargs,
+                            lambda: super(RecordingFundamentalDataProvider, self)._download(tickers, **kwargs),
+                            _frame_to_payload)
+
+class ReplayFundamentalDataProvider(FundamentalDataProvider):
+    """重播模式 - 由錄製目錄回應所有上游呼叫，不連網也不需 FRED API Key
+
+    latency 可為 None (不延遲)、'recorded' (重現錄製時的耗時) 或秒數。
+    """
+
+    def __init__(self, replay_dir, latency=None):
+        self.store = ResponseStore(replay_dir)
+        self.latency = latency
+        self.fred = None
+
+    def _ensure_fred_available(self):
+        pass
+
+    def _replay(self, kind, name, params, decode):
+        with metrics.timer(f'provider.replay_{kind}'):
+            payload = self.store.load(kind, name, params)
+            if self.latency == 'recorded':
+                time.sleep(payload.get('elapsed', 0))
+            elif self.latency:
+                time.sleep(self.latency)
+            if 'error' in payload:
+                raise Exception(payload['error'])
+            return decode(payload['data'])
+
+    def _ticker_info(self, ticker: str):
+        return self._replay('info', ticker, None, lambda info: info)
+
+    def _fred_series(self, series_id: str, **kwargs):
+        return self._replay('fred', series_id, kwargs, _payload_to_series)
+
+    def _fred_releases(self, series_id: str, **kwargs):
+        return self._replay('fred_releases', series_id, kwargs, _payload_to_releases)
+
+    def _price_history(self, ticker: str, **kwargs):
+        return self._replay('history', ticker, kwargs, _payload_to_frame)
+
+    def _statement(self, ticker: str, statement: str, frequency: str):
+        return self._replay('statements', ticker, {'statement': statement, 'frequency': frequency},
+                            lambda payload: _payload_to_frame(payload).T)
+
+    def _download(self, tickers, **kwargs):
+        return self._replay('download', ','.join(tickers), kwargs, _payload_to_frame)
+
+def create_provider(record_dir=None, replay_dir=None, replay_latency=None):
+    """依錄製/重播設定建立資料提供者 (皆未指定時回傳 None 使用預設)
+
+    replay_latency 可為毫秒數字串或 'recorded'。
+    """
+    if record_dir and replay_dir:
+        raise ValueError("--record 與 --replay 不可同時使用")
+    if record_dir:
+        return RecordingFundamentalDataProvider(record_dir)
+    if replay_dir:
+        latency = replay_latency
+        if latency is not None and latency != 'recorded':
+            latency = float(latency) / 1000
+        return ReplayFundamentalDataProvider(replay_dir, latency)
+    return None
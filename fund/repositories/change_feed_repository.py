@@ -0,0 +1,116 @@
+import json
+import pyodbc
+from fund.config.database_config import DatabaseConfig
+from fund.repositories.fundamental_data_repository import CHANGES_TABLE, ensure_change_version
+
+class ChangeFeedRepository:
+    """變動紀錄讀取儲存庫 - 依 rowversion 遞增讀取 fundamental_data_changes，並記錄各消費者的讀取位置
+
+    IDENTITY 在寫入時配發而非提交時，多個寫入者並行時較小的 id 可能較晚提交；
+    因此只讀取 version 小於 MIN_ACTIVE_ROWVERSION() (之前的紀錄皆已提交) 的紀錄，讀取位置記錄為 version。
+    """
+
+    OFFSETS_TABLE = 'fundamental_data_change_offsets'
+
+    def __init__(self):
+        config = DatabaseConfig()
+        self.conn_str = config.get_connection_string()
+        self.conn = pyodbc.connect(self.conn_str)
+        self._ensure_table()
+
+    def _ensure_table(self):
+        with self.conn:
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+                IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='{self.OFFSETS_TABLE}' AND xtype='U')
+                CREATE TABLE {self.OFFSETS_TABLE} (
+                    consumer NVARCHAR(100) PRIMARY KEY,
+                    last_id BIGINT NOT NULL,
+                    lastUpdate DATETIME DEFAULT GETDATE()
+                )
+            """)
+            # 舊版只記錄 last_id，last_version 為 NULL 時於讀取時換算
+            cursor.execute(f"""
+                IF COL_LENGTH(N'{self.OFFSETS_TABLE}', 'last_version') IS NULL
+                    ALTER TABLE {self.OFFSETS_TABLE} ADD last_version BIGINT NULL
+            """)
+            if self._changes_exist():
+                ensure_change_version(cursor)
+            self.conn.commit()
+
+    def _changes_exist(self):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT OBJECT_ID(?, 'U')", CHANGES_TABLE)
+        return cursor.fetchone()[0] is not None
+
+    def _to_dict(self, row):
+        return {
+            'id': row[0],
+            'run_id': row[1],
+            'market': row[2],
+            'symbol': row[3],
+            'operation': row[4],
+            'changes': json.loads(row[5]),
+            'changedAt': row[6],
+            'version': row[7],
+        }
+
+    def read_after(self, last_version: int, limit: int = 1000):
+        """讀取 version 大於 last_version 且已提交的變動紀錄 (依 version 排序)"""
+        if not self._changes_exist():
+            return []
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT TOP ({int(limit)}) id, run_id, market, symbol, operation, changes, changedAt,
+                   CAST(version AS BIGINT)
+            FROM {CHANGES_TABLE}
+            WHERE version > CAST(CAST(? AS BIGINT) AS BINARY(8)) AND version < MIN_ACTIVE_ROWVERSION()
+            ORDER BY version
+        """, last_version)
+        return [self._to_dict(row) for row in cursor.fetchall()]
+
+    def read_run(self, run_id: str):
+        """讀取單次執行的所有變動紀錄"""
+        if not self._changes_exist():
+            return []
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT id, run_id, market, symbol, operation, changes, changedAt, CAST(version AS BIGINT)
+            FROM {CHANGES_TABLE} WHERE run_id = ? ORDER BY id
+        """, run_id)
+        return [self._to_dict(row) for row in cursor.fetchall()]
+
+    def _version_at(self, cursor, last_id: int):
+        """id 不大於 last_id 的紀錄中最大的 version (換算舊版以 id 記錄的讀取位置)"""
+        if last_id <= 0 or not self._changes_exist():
+            return 0
+        cursor.execute(f"SELECT ISNULL(MAX(CAST(version AS BIGINT)), 0) FROM {CHANGES_TABLE} WHERE id <= ?", last_id)
+        return cursor.fetchone()[0]
+
+    def get_offset(self, consumer: str):
+        """取得消費者已處理的最後 version (尚未讀取過時為 0)"""
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT last_id, last_version FROM {self.OFFSETS_TABLE} WHERE consumer=?", consumer)
+        row = cursor.fetchone()
+        if not row:
+            return 0
+        last_id, last_version = row
+        return last_version if last_version is not None else self._version_at(cursor, last_id)
+
+    def commit_offset(self, consumer: str, last_id: int, last_version: int):
+        """更新消費者讀取位置 (最後處理的 id 僅供檢視，讀取以 version 為準)"""
+        with self.conn:
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+                MERGE {self.OFFSETS_TABLE} WITH (HOLDLOCK) AS dst
+                USING (SELECT ? AS consumer, ? AS last_id, ? AS last_version) AS src ON dst.consumer = src.consumer
+                WHEN MATCHED THEN
+                    UPDATE SET last_id = src.last_id, last_version = src.last_version, lastUpdate = GETDATE()
+                WHEN NOT MATCHED THEN
+                    INSERT (consumer, last_id, last_version) VALUES (src.consumer, src.last_id, src.last_version);
+            """, consumer, last_id, last_version)
+            self.conn.commit()
+
+    def reset_offset(self, consumer: str, last_id: int):
+        """將消費者讀取位置重設至 id 為 last_id 的紀錄之後"""
+        self.commit_offset(consumer, last_id, self._version_at(self.conn.cursor(), last_id))
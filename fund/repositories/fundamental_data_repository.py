@@ -1,5 +1,131 @@
+import json
+import os
+import time
 import pyodbc
+import pandas as pd
 from fund.config.database_config import DatabaseConfig
+from fund.providers.records import QUOTE_COLUMNS, SeriesBatch, record_values, series_rows
+from fund.utils.metrics import metrics
+
+# 股票類市場 (共用 40 欄位基本面資料表)
+EQUITY_MARKETS = ('tw', 'us', 'two', 'etf', 'index', 'crypto', 'forex', 'futures')
+
+# 時間序列類資料 (以 date 為主鍵)
+SERIES_MARKETS = ('cpi_us', 'nfp_us', 'oil', 'gold')
+
+# 基本面資料表欄位 (與 _ensure_table 建表順序一致)
+FUNDAMENTAL_COLUMNS = (
+    'symbol', 'shortName', 'sector', 'industry', 'marketCap', 'trailingPE', 'forwardPE',
+    'priceToBook', 'dividendYield', 'beta', 'country', 'currency', 'exchange', 'priceToSales',
+    'enterpriseToRevenue', 'enterpriseToEbitda', 'pegRatio', 'debtToEquity', 'returnOnEquity',
+    'returnOnAssets', 'profitMargins', 'operatingMargins', 'grossMargins', 'revenueGrowth',
+    'earningsGrowth', 'currentRatio', 'quickRatio', 'totalCash', 'totalDebt', 'totalRevenue',
+    'netIncomeToCommon', 'bookValue', 'sharesOutstanding', 'fiftyTwoWeekHigh', 'fiftyTwoWeekLow',
+    'averageVolume', 'dividendRate', 'payoutRatio', 'exDividendDate', 'lastUpdate', 'financialCurrency',
+    'currentPrice',
+)
+
+# 建表後才新增的欄位 (舊資料表以 ALTER TABLE 補上，附加於最後)
+ADDED_COLUMNS = (
+    ('financialCurrency', 'NVARCHAR(10)'),
+    ('currentPrice', 'FLOAT'),
+)
+
+# 匯率換算對象: 市值以交易幣別 (currency) 的主幣計價，財報金額以 financialCurrency 計價，
+# 價格欄位以交易幣別的報價單位計價 (可能為 GBp 等輔幣)
+MARKET_AMOUNT_COLUMNS = ('marketCap',)
+FINANCIAL_AMOUNT_COLUMNS = ('totalCash', 'totalDebt', 'totalRevenue', 'netIncomeToCommon')
+PRICE_COLUMNS = ('currentPrice', 'fiftyTwoWeekHigh', 'fiftyTwoWeekLow')
+MONETARY_COLUMNS = MARKET_AMOUNT_COLUMNS + FINANCIAL_AMOUNT_COLUMNS + PRICE_COLUMNS
+
+# 基本面欄位定義 (symbol 以外，分市場資料表與統一資料表共用)
+FUNDAMENTAL_COLUMN_DDL = """
+    shortName NVARCHAR(255),
+    sector NVARCHAR(255),
+    industry NVARCHAR(255),
+    marketCap BIGINT,
+    trailingPE FLOAT,
+    forwardPE FLOAT,
+    priceToBook FLOAT,
+    dividendYield FLOAT,
+    beta FLOAT,
+    country NVARCHAR(50),
+    currency NVARCHAR(10),
+    exchange NVARCHAR(50),
+    priceToSales FLOAT,
+    enterpriseToRevenue FLOAT,
+    enterpriseToEbitda FLOAT,
+    pegRatio FLOAT,
+    debtToEquity FLOAT,
+    returnOnEquity FLOAT,
+    returnOnAssets FLOAT,
+    profitMargins FLOAT,
+    operatingMargins FLOAT,
+    grossMargins FLOAT,
+    revenueGrowth FLOAT,
+    earningsGrowth FLOAT,
+    currentRatio FLOAT,
+    quickRatio FLOAT,
+    totalCash BIGINT,
+    totalDebt BIGINT,
+    totalRevenue BIGINT,
+    netIncomeToCommon BIGINT,
+    bookValue FLOAT,
+    sharesOutstanding BIGINT,
+    fiftyTwoWeekHigh FLOAT,
+    fiftyTwoWeekLow FLOAT,
+    averageVolume BIGINT,
+    dividendRate FLOAT,
+    payoutRatio FLOAT,
+    exDividendDate NVARCHAR(20),
+    lastUpdate DATETIME DEFAULT GETDATE(),
+    financialCurrency NVARCHAR(10),
+    currentPrice FLOAT
+""".strip()
+
+# 統一股票資料表 (equity_layout = unified 時所有股票類市場共用，以 (market, symbol) 為主鍵)
+EQUITY_TABLE = 'fundamental_data_equity'
+
+# 跨市場查詢使用的市場名稱 (僅 unified 配置)
+ALL_MARKETS = 'all'
+
+# 基本面變動紀錄 (change feed)
+CHANGES_TABLE = 'fundamental_data_changes'
+
+# 回補已下載過的日期區間 (上游本來就沒有資料的假日不再視為缺漏)
+COVERAGE_TABLE = 'fundamental_data_coverage'
+
+# 日線價格資料表欄位
+PRICE_HISTORY_COLUMNS = ('symbol', 'date', '[open]', 'high', 'low', '[close]', 'adjClose', 'volume')
+
+# 估值重算後寫回的欄位 (currentPrice 為估值所依據的價格，與其他欄位一同更新) 與所需的基本面欄位
+VALUATION_COLUMNS = ('currentPrice', 'marketCap', 'trailingPE', 'forwardPE', 'priceToBook', 'priceToSales')
+VALUATION_INPUTS = ('symbol',) + VALUATION_COLUMNS
+
+# 財務報表長格式欄位
+STATEMENT_COLUMNS = ('symbol', 'statement', 'frequency', 'period', 'lineItem', 'value')
+
+# 總經序列發布版本 (只存與前一版本不同的修正值)
+VINTAGE_COLUMNS = ('market', 'date', 'vintage', 'value')
+
+# 時間序列資料表欄位
+SERIES_COLUMNS = {
+    'cpi_us': ('date', 'value', '[YoY(%)]', '[MoM(%)]', 'lastUpdate'),
+    'nfp_us': ('date', 'value', 'MoM_Change', 'YoY_Change', 'lastUpdate'),
+    'oil': ('date', 'symbol', 'value', 'lastUpdate'),
+    'gold': ('date', 'symbol', 'value', 'lastUpdate'),
+}
+
+def ensure_change_version(cursor):
+    """舊版變動紀錄資料表補上 rowversion 欄位與索引 (消費者依此讀取已提交的紀錄)"""
+    cursor.execute(f"""
+        IF COL_LENGTH(N'{CHANGES_TABLE}', 'version') IS NULL
+            ALTER TABLE {CHANGES_TABLE} ADD version ROWVERSION
+    """)
+    cursor.execute(f"""
+        IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_{CHANGES_TABLE}_version')
+            CREATE INDEX IX_{CHANGES_TABLE}_version ON {CHANGES_TABLE} (version)
+    """)
 
 class FundamentalDataRepository:
     """基本面數據儲存庫類"""
@@ -7,12 +133,116 @@ class FundamentalDataRepository:
         config = DatabaseConfig()
         self.conn_str = config.get_connection_string()
         self.conn = pyodbc.connect(self.conn_str)
+        # unified: 股票類市場共用 fundamental_data_equity，舊資料表名稱改為相容 view
+        self.unified = config.equity_layout == 'unified'
+        self._ensured_markets = set()
+        # 同一次執行 (含 --workers 子行程) 共用 FUND_RUN_ID，變動紀錄以此分組
+        self.run_id = os.environ.get('FUND_RUN_ID') or f"{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}"
+        self._changes_ready = False
+        self._coverage_ready = False
+        self._quotes_ready = False
+        self._statements_ready = False
+        self._vintages_ready = False
 
     def _get_table_name(self, market: str):
         return f'fundamental_data_{market}'
 
+    def _source(self, market: str):
+        """查詢來源 (資料表, WHERE 條件, 參數)；unified 配置下股票類市場改查統一資料表"""
+        if self.unified and market == ALL_MARKETS:
+            return EQUITY_TABLE, '1=1', []
+        if self.unified and market in EQUITY_MARKETS:
+            # 市場代碼以常值帶入 (已限定於 EQUITY_MARKETS)，參數化的條件無法使用篩選索引
+            return EQUITY_TABLE, f"market=N'{market}'", []
+        if market == ALL_MARKETS:
+            raise ValueError("跨市場查詢需要 unified 資料表配置 (fund db --layout unified)")
+        return self._get_table_name(market), '1=1', []
+
+    def _ensure_equity_table(self):
+        """建立統一股票資料表與跨市場索引"""
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            IF OBJECT_ID(N'{EQUITY_TABLE}', 'U') IS NULL
+            BEGIN
+                CREATE TABLE {EQUITY_TABLE} (
+                    market NVARCHAR(10) NOT NULL,
+                    symbol NVARCHAR(50) NOT NULL,
+                    {FUNDAMENTAL_COLUMN_DDL},
+                    CONSTRAINT PK_{EQUITY_TABLE} PRIMARY KEY CLUSTERED (market, symbol)
+                );
+                CREATE INDEX IX_{EQUITY_TABLE}_symbol ON {EQUITY_TABLE} (symbol);
+                CREATE INDEX IX_{EQUITY_TABLE}_marketCap ON {EQUITY_TABLE} (marketCap DESC)
+                    INCLUDE (market, trailingPE, priceToBook, dividendYield);
+            END
+        """)
+        self._ensure_added_columns(cursor, EQUITY_TABLE)
+
+    def _ensure_added_columns(self, cursor, table):
+        """舊版資料表補上後來新增的欄位"""
+        for column, ddl in ADDED_COLUMNS:
+            cursor.execute(f"IF COL_LENGTH(N'{table}', '{column}') IS NULL ALTER TABLE {table} ADD {column} {ddl}")
+
+    def _ensure_equity_market(self, market: str):
+        """建立市場的篩選索引與相容 view (舊資料表仍存在時保留原表，待 migrate 後才建立 view)"""
+        view = self._get_table_name(market)
+        index = f"IX_{EQUITY_TABLE}_{market}_marketCap"
+        select = f"SELECT {','.join(FUNDAMENTAL_COLUMNS)} FROM {EQUITY_TABLE} WHERE market = N''{market}''"
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = '{index}')
+                CREATE INDEX {index} ON {EQUITY_TABLE} (marketCap DESC)
+                    INCLUDE (trailingPE, priceToBook, dividendYield)
+                    WHERE market = N'{market}';
+            IF OBJECT_ID(N'{view}') IS NULL
+                EXEC('CREATE VIEW {view} AS {select}');
+        """)
+
+    def _ensure_changes_table(self):
+        """建立變動紀錄資料表 (每個連線只檢查一次)"""
+        if self._changes_ready:
+            return
+        with self.conn:
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+                IF OBJECT_ID(N'{CHANGES_TABLE}', 'U') IS NULL
+                BEGIN
+                    CREATE TABLE {CHANGES_TABLE} (
+                        id BIGINT IDENTITY(1,1) PRIMARY KEY,
+                        run_id NVARCHAR(64) NOT NULL,
+                        market NVARCHAR(10) NOT NULL,
+                        symbol NVARCHAR(50) NOT NULL,
+                        operation NVARCHAR(10) NOT NULL,
+                        changes NVARCHAR(MAX) NOT NULL,
+                        changedAt DATETIME DEFAULT GETDATE(),
+                        version ROWVERSION
+                    );
+                    CREATE INDEX IX_{CHANGES_TABLE}_run ON {CHANGES_TABLE} (run_id);
+                END
+            """)
+            ensure_change_version(cursor)
+            self.conn.commit()
+        self._changes_ready = True
+
+    def _record_change(self, cursor, market: str, symbol: str, operation: str, changes):
+        """於同一交易寫入變動紀錄，changes 為 {欄位: [舊值, 新值]}"""
+        cursor.execute(
+            f"INSERT INTO {CHANGES_TABLE} (run_id, market, symbol, operation, changes) VALUES (?, ?, ?, ?, ?)",
+            self.run_id, market, symbol, operation, json.dumps(changes, ensure_ascii=False, default=str)
+        )
+
     def _ensure_table(self, market: str):
         table = self._get_table_name(market)
+        if market in EQUITY_MARKETS:
+            self._ensure_changes_table()
+        if self.unified and market in EQUITY_MARKETS:
+            # 統一資料表只需在每個連線第一次寫入該市場時檢查
+            if market not in self._ensured_markets:
+                with self.conn:
+                    self._ensure_equity_table()
+                    self._ensure_equity_market(market)
+                    self.conn.commit()
+                self._ensured_markets.add(market)
+            return
         # CPI/NFP 資料表
         if market == 'cpi_us':
             with self.conn:
@@ -79,175 +309,765 @@ class FundamentalDataRepository:
                 IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='{table}' AND xtype='U')
                 CREATE TABLE {table} (
                     symbol NVARCHAR(50) PRIMARY KEY,
-                    shortName NVARCHAR(255),
-                    sector NVARCHAR(255),
-                    industry NVARCHAR(255),
-                    marketCap BIGINT,
-                    trailingPE FLOAT,
-                    forwardPE FLOAT,
-                    priceToBook FLOAT,
-                    dividendYield FLOAT,
-                    beta FLOAT,
-                    country NVARCHAR(50),
-                    currency NVARCHAR(10),
-                    exchange NVARCHAR(50),
-                    priceToSales FLOAT,
-                    enterpriseToRevenue FLOAT,
-                    enterpriseToEbitda FLOAT,
-                    pegRatio FLOAT,
-                    debtToEquity FLOAT,
-                    returnOnEquity FLOAT,
-                    returnOnAssets FLOAT,
-                    profitMargins FLOAT,
-                    operatingMargins FLOAT,
-                    grossMargins FLOAT,
-                    revenueGrowth FLOAT,
-                    earningsGrowth FLOAT,
-                    currentRatio FLOAT,
-                    quickRatio FLOAT,
-                    totalCash BIGINT,
-                    totalDebt BIGINT,
-                    totalRevenue BIGINT,
-                    netIncomeToCommon BIGINT,
-                    bookValue FLOAT,
-                    sharesOutstanding BIGINT,
-                    fiftyTwoWeekHigh FLOAT,
-                    fiftyTwoWeekLow FLOAT,
-                    averageVolume BIGINT,
-                    dividendRate FLOAT,
-                    payoutRatio FLOAT,
-                    exDividendDate NVARCHAR(20),
-                    lastUpdate DATETIME DEFAULT GETDATE()
+                    {FUNDAMENTAL_COLUMN_DDL}
                 )
             """)
+            self._ensure_added_columns(cursor, table)
+            self.conn.commit()
+
+    def _commit(self):
+        with metrics.timer('db.commit'):
             self.conn.commit()
 
     def save_fundamental_data(self, market: str, data):
-        self._ensure_table(market)
+        with metrics.timer('db.ensure_table'):
+            self._ensure_table(market)
+        with metrics.timer(f'db.write.{market}') as sample:
+            sample.rows = len(data) if isinstance(data, (list, SeriesBatch)) else 1
+            self._save(market, data)
+
+    def _save(self, market: str, data):
         table = self._get_table_name(market)
         with self.conn:
             cursor = self.conn.cursor()
             # --- CPI/NFP/OIL/GOLD更新區塊 ---
             if market == 'cpi_us':
-                data_list = data if isinstance(data, list) else [data]
-                for item in data_list:
-                    cursor.execute(f"SELECT value, [YoY(%)], [MoM(%)] FROM {table} WHERE date=?", item['date'])
+                for date, value, yoy, mom in series_rows(data, ('value', 'YoY(%)', 'MoM(%)')):
+                    cursor.execute(f"SELECT value, [YoY(%)], [MoM(%)] FROM {table} WHERE date=?", date)
                     row = cursor.fetchone()
+                    new_values = (
+                        float(value),
+                        float(yoy) if yoy is not None else None,
+                        float(mom) if mom is not None else None
+                    )
                     if row:
                         # 若有任一欄位不同則更新
-                        db_values = [row[0], row[1], row[2]]
-                        new_values = [
-                            float(item['value']),
-                            float(item['YoY(%)']) if item.get('YoY(%)') is not None else None,
-                            float(item['MoM(%)']) if item.get('MoM(%)') is not None else None
-                        ]
-                        if db_values != new_values:
+                        if tuple(row) != new_values:
                             cursor.execute(
                                 f"UPDATE {table} SET value=?, [YoY(%)]=?, [MoM(%)]=?, lastUpdate=GETDATE() WHERE date=?",
-                                *new_values, item['date']
+                                *new_values, date
                             )
-                            self.conn.commit()
+                            self._commit()
                         continue
                     cursor.execute(
                         f"INSERT INTO {table} (date, value, [YoY(%)], [MoM(%)]) VALUES (?, ?, ?, ?)",
-                        item['date'],
-                        float(item['value']),
-                        float(item['YoY(%)']) if item.get('YoY(%)') is not None else None,
-                        float(item['MoM(%)']) if item.get('MoM(%)') is not None else None
+                        date, *new_values
                     )
-                    self.conn.commit()
+                    self._commit()
                 return
             if market == 'nfp_us':
-                data_list = data if isinstance(data, list) else [data]
-                for item in data_list:
-                    cursor.execute(f"SELECT value, MoM_Change, YoY_Change FROM {table} WHERE date=?", item['date'])
+                for date, value, mom_change, yoy_change in series_rows(data, ('value', 'MoM_Change', 'YoY_Change')):
+                    cursor.execute(f"SELECT value, MoM_Change, YoY_Change FROM {table} WHERE date=?", date)
                     row = cursor.fetchone()
+                    new_values = (
+                        float(value),
+                        float(mom_change) if mom_change is not None else None,
+                        float(yoy_change) if yoy_change is not None else None
+                    )
                     if row:
-                        db_values = [row[0], row[1], row[2]]
-                        new_values = [
-                            float(item['value']),
-                            float(item['MoM_Change']) if item.get('MoM_Change') is not None else None,
-                            float(item['YoY_Change']) if item.get('YoY_Change') is not None else None
-                        ]
-                        if db_values != new_values:
+                        if tuple(row) != new_values:
                             cursor.execute(
                                 f"UPDATE {table} SET value=?, MoM_Change=?, YoY_Change=?, lastUpdate=GETDATE() WHERE date=?",
-                                *new_values, item['date']
+                                *new_values, date
                             )
-                            self.conn.commit()
+                            self._commit()
                         continue
                     cursor.execute(
                         f"INSERT INTO {table} (date, value, MoM_Change, YoY_Change) VALUES (?, ?, ?, ?)",
-                        item['date'],
-                        float(item['value']),
-                        float(item['MoM_Change']) if item.get('MoM_Change') is not None else None,
-                        float(item['YoY_Change']) if item.get('YoY_Change') is not None else None
-                    )
-                    self.conn.commit()
-                return
-            if market == 'oil':
-                data_list = data if isinstance(data, list) else [data]
-                for item in data_list:
-                    cursor.execute(f"SELECT value FROM {table} WHERE date=?", item['date'])
-                    row = cursor.fetchone()
-                    if row:
-                        if float(row[0]) != float(item['value']):
-                            cursor.execute(
-                                f"UPDATE {table} SET value=?, symbol=?, lastUpdate=GETDATE() WHERE date=?",
-                                item['value'], item['symbol'], item['date']
-                            )
-                            self.conn.commit()
-                        continue
-                    cursor.execute(
-                        f"INSERT INTO {table} (date, symbol, value) VALUES (?, ?, ?)",
-                        item['date'], item['symbol'], item['value']
+                        date, *new_values
                     )
-                    self.conn.commit()
+                    self._commit()
                 return
-            if market == 'gold':
-                data_list = data if isinstance(data, list) else [data]
-                for item in data_list:
-                    cursor.execute(f"SELECT value FROM {table} WHERE date=?", item['date'])
+            if market in ('oil', 'gold'):
+                for date, symbol, value in series_rows(data, ('symbol', 'value')):
+                    cursor.execute(f"SELECT value FROM {table} WHERE date=?", date)
                     row = cursor.fetchone()
                     if row:
-                        if float(row[0]) != float(item['value']):
+                        if float(row[0]) != float(value):
                             cursor.execute(
                                 f"UPDATE {table} SET value=?, symbol=?, lastUpdate=GETDATE() WHERE date=?",
-                                item['value'], item['symbol'], item['date']
+                                value, symbol, date
                             )
-                            self.conn.commit()
+                            self._commit()
                         continue
                     cursor.execute(
                         f"INSERT INTO {table} (date, symbol, value) VALUES (?, ?, ?)",
-                        item['date'], item['symbol'], item['value']
+                        date, symbol, value
                     )
-                    self.conn.commit()
+                    self._commit()
                 return
             # --- 股票更新區塊 ---
-            symbol = data['symbol']
-            cursor.execute(f"SELECT * FROM {table} WHERE symbol=?", symbol)
+            # 只讀寫 data 中出現的欄位 (支援 --fields 欄位投影)
+            table, where, key = self._source(market)
+            key = key + [data['symbol']]
+            key_columns = ['market', 'symbol'] if self.unified else ['symbol']
+            columns, new_values = record_values(data)
+            cursor.execute(f"SELECT {','.join(columns)} FROM {table} WHERE {where} AND symbol=?", *key)
             row = cursor.fetchone()
             if row:
-                # 檢查是否有變動（只比對主要財務欄位）
-                columns = list(data.keys())
-                db_values = [row[i] for i in range(len(columns))]
-                new_values = [data[k] for k in columns]
-                if db_values != new_values:
+                # 檢查是否有變動
+                if tuple(row) != new_values:
                     # 有變動則更新
                     set_clause = ','.join([f"{col}=?" for col in columns])
                     cursor.execute(
-                        f"UPDATE {table} SET {set_clause}, lastUpdate=GETDATE() WHERE symbol=?",
-                        *new_values, symbol
+                        f"UPDATE {table} SET {set_clause}, lastUpdate=GETDATE() WHERE {where} AND symbol=?",
+                        *new_values, *key
                     )
-                    self.conn.commit()
+                    changes = {col: [old, new] for col, old, new in zip(columns, row, new_values) if old != new}
+                    self._record_change(cursor, market, data['symbol'], 'update', changes)
+                    self._commit()
                 return
             else:
                 # INSERT
-                columns = ','.join(data.keys())
-                placeholders = ','.join(['?' for _ in data])
-                values = list(data.values())
+                placeholders = ','.join(['?' for _ in range(len(key_columns) + len(columns))])
+                # unified 配置下 WHERE 以常值篩選 market，新增時需另外繫結 market
                 cursor.execute(
-                    f"INSERT INTO {table} ({columns}) VALUES ({placeholders})",
-                    *values
+                    f"INSERT INTO {table} ({','.join([*key_columns, *columns])}) VALUES ({placeholders})",
+                    *([market] if self.unified else []), data['symbol'], *new_values
+                )
+                changes = {col: [None, new] for col, new in zip(columns, new_values) if new is not None}
+                self._record_change(cursor, market, data['symbol'], 'insert', changes)
+            self._commit()
+
+    # --- 查詢區塊 ---
+    def _table_exists(self, table: str):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT OBJECT_ID(?, 'U')", table)
+        return cursor.fetchone()[0] is not None
+
+    def migrate_to_unified(self):
+        """將各市場資料表搬移至統一資料表，舊表更名為 *_legacy 並以同名 view 取代，回傳 {市場: 搬移筆數}"""
+        columns = ','.join(FUNDAMENTAL_COLUMNS)
+        moved = {}
+        for market in EQUITY_MARKETS:
+            table = self._get_table_name(market)
+            if not self._table_exists(table):
+                continue
+            with self.conn:
+                self._ensure_equity_table()
+                cursor = self.conn.cursor()
+                self._ensure_added_columns(cursor, table)
+                cursor.execute(f"""
+                    INSERT INTO {EQUITY_TABLE} (market,{columns})
+                    SELECT ?,{columns} FROM {table} AS src
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM {EQUITY_TABLE} AS dst WHERE dst.market=? AND dst.symbol=src.symbol
+                    )
+                """, market, market)
+                moved[market] = cursor.rowcount
+                cursor.execute("EXEC sp_rename ?, ?", table, f"{table}_legacy")
+                self._ensure_equity_market(market)
+                self._commit()
+        return moved
+
+    def _fetch_dicts(self, cursor):
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def get_last_update(self, market: str):
+        """取得資料表最後更新時間 (資料表不存在時回傳 None)"""
+        table, where, params = self._source(market)
+        if not self._table_exists(table):
+            return None
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT MAX(lastUpdate) FROM {table} WHERE {where}", *params)
+        return cursor.fetchone()[0]
+
+    def list_symbols(self, market: str):
+        """列出市場內所有股票代號"""
+        table, where, params = self._source(market)
+        if not self._table_exists(table):
+            return []
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT symbol FROM {table} WHERE {where} ORDER BY symbol", *params)
+        return [row[0] for row in cursor.fetchall()]
+
+    def list_currencies(self, market: str):
+        """列出市場內出現的交易幣別與財報幣別"""
+        table, where, params = self._source(market)
+        if not self._table_exists(table):
+            return []
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT currency FROM {table} WHERE {where} AND currency IS NOT NULL
+            UNION SELECT financialCurrency FROM {table} WHERE {where} AND financialCurrency IS NOT NULL
+        """, *params, *params)
+        return [row[0] for row in cursor.fetchall()]
+
+    def get_fundamental_data(self, market: str, symbol: str):
+        """取得單一股票的基本面資料"""
+        table, where, params = self._source(market)
+        if not self._table_exists(table):
+            return None
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT {','.join(FUNDAMENTAL_COLUMNS)} FROM {table} WHERE {where} AND symbol=?",
+                       *params, symbol)
+        rows = self._fetch_dicts(cursor)
+        return rows[0] if rows else None
+
+    def screen(self, market: str, filters, order_by=None, descending=False, limit=100, fx=None):
+        """依條件篩選股票
+
+        filters 為 (欄位, 運算子, 值) 的序列，欄位需屬於 FUNDAMENTAL_COLUMNS，
+        運算子限定為 =, <, <=, >, >=。unified 配置下 market 可為 'all' 跨市場篩選。
+        fx 為 {'amount': {幣別: 倍數}, 'price': {幣別: 倍數}} (FxService.factors) 時，金額與價格欄位的篩選與排序
+        以換算後的值比較 (財報金額依 financialCurrency，無匯率的幣別視為 NULL)，回傳的資料列仍為原幣別。
+        """
+        table, where, params = self._source(market)
+        if not self._table_exists(table):
+            return []
+
+        def expression(column):
+            if not fx or column not in MONETARY_COLUMNS:
+                return column, []
+            factors = fx['price'] if column in PRICE_COLUMNS else fx['amount']
+            source = 'COALESCE(financialCurrency, currency)' if column in FINANCIAL_AMOUNT_COLUMNS else 'currency'
+            # 區分大小寫比對幣別 (Yahoo 以 GBp 表示便士)
+            cases = ' '.join('WHEN ? THEN ?' for _ in factors)
+            return (f"({column} * CASE {source} COLLATE Latin1_General_CS_AS {cases} END)",
+                    [item for pair in factors.items() for item in pair])
+
+        clauses = [where]
+        for column, op, value in filters:
+            if column not in FUNDAMENTAL_COLUMNS or op not in ('=', '<', '<=', '>', '>='):
+                raise ValueError(f"不支援的篩選條件: {column} {op}")
+            expr, expr_params = expression(column)
+            clauses.append(f"{expr} {op} ?")
+            params.extend(expr_params)
+            params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}"
+        columns = (('market',) if market == ALL_MARKETS else ()) + FUNDAMENTAL_COLUMNS
+        if order_by is not None and order_by not in FUNDAMENTAL_COLUMNS:
+            raise ValueError(f"不支援的排序欄位: {order_by}")
+        expr, expr_params = expression(order_by or 'symbol')
+        params.extend(expr_params)
+        order = f"ORDER BY {expr} {'DESC' if descending else 'ASC'}"
+        cursor = self.conn.cursor()
+        cursor.execute(
+            f"SELECT TOP ({int(limit)}) {','.join(columns)} FROM {table} {where} {order}",
+            *params
+        )
+        return self._fetch_dicts(cursor)
+
+    def get_series_range(self, market: str, start_date=None, end_date=None):
+        """取得時間序列資料 (CPI/NFP/OIL/GOLD) 指定期間內容"""
+        table = self._get_table_name(market)
+        if not self._table_exists(table):
+            return []
+        clauses = []
+        params = []
+        if start_date:
+            clauses.append("date >= ?")
+            params.append(start_date)
+        if end_date:
+            clauses.append("date <= ?")
+            params.append(end_date)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        cursor = self.conn.cursor()
+        cursor.execute(
+            f"SELECT {','.join(SERIES_COLUMNS[market])} FROM {table} {where} ORDER BY date",
+            *params
+        )
+        return self._fetch_dicts(cursor)
+
+    # --- 增量更新區塊 ---
+    def get_latest_date(self, market: str):
+        """取得時間序列最新日期 (無資料時回傳 None)"""
+        table = self._get_table_name(market)
+        if not self._table_exists(table):
+            return None
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT MAX(date) FROM {table}")
+        return cursor.fetchone()[0]
+
+    def get_series_values_before(self, market: str, before_date: str, limit: int):
+        """取得指定日期之前最近 limit 筆 (date, value)，依日期遞增排序"""
+        table = self._get_table_name(market)
+        if not self._table_exists(table):
+            return []
+        cursor = self.conn.cursor()
+        cursor.execute(
+            f"SELECT TOP ({int(limit)}) date, value FROM {table} WHERE date < ? ORDER BY date DESC",
+            before_date
+        )
+        return [(row[0], row[1]) for row in reversed(cursor.fetchall())]
+
+    def upsert_series_rows(self, market: str, inserts, updates):
+        """批次寫入已比對過的時間序列資料列 (inserts 為新日期，updates 為數值有變動的既有日期)"""
+        with metrics.timer('db.ensure_table'):
+            self._ensure_table(market)
+        table = self._get_table_name(market)
+        columns = [c for c in SERIES_COLUMNS[market] if c not in ('date', 'lastUpdate')]
+        keys = [c.strip('[]') for c in columns]
+        with metrics.timer(f'db.write.{market}', rows=len(inserts) + len(updates)):
+            with self.conn:
+                cursor = self.conn.cursor()
+                cursor.fast_executemany = True
+                if updates:
+                    set_clause = ','.join(f"{c}=?" for c in columns)
+                    cursor.executemany(
+                        f"UPDATE {table} SET {set_clause}, lastUpdate=GETDATE() WHERE date=?",
+                        [[row.get(k) for k in keys] + [row['date']] for row in updates]
+                    )
+                if inserts:
+                    placeholders = ','.join('?' for _ in range(len(columns) + 1))
+                    cursor.executemany(
+                        f"INSERT INTO {table} (date, {','.join(columns)}) VALUES ({placeholders})",
+                        [[row['date']] + [row.get(k) for k in keys] for row in inserts]
+                    )
+                self._commit()
+
+    # --- 日線價格區塊 ---
+    def _ensure_price_history_table(self):
+        table = self._get_table_name('price_history')
+        with self.conn:
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+                IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='{table}' AND xtype='U')
+                CREATE TABLE {table} (
+                    symbol NVARCHAR(50) NOT NULL,
+                    date DATE NOT NULL,
+                    [open] FLOAT,
+                    high FLOAT,
+                    low FLOAT,
+                    [close] FLOAT,
+                    adjClose FLOAT,
+                    volume BIGINT,
+                    lastUpdate DATETIME DEFAULT GETDATE(),
+                    CONSTRAINT PK_{table} PRIMARY KEY CLUSTERED (symbol, date)
+                )
+            """)
+            self.conn.commit()
+
+    def get_latest_price_dates(self, symbols):
+        """取得各股票已儲存的最新日期 {symbol: 'YYYY-MM-DD'}"""
+        table = self._get_table_name('price_history')
+        if not symbols or not self._table_exists(table):
+            return {}
+        result = {}
+        cursor = self.conn.cursor()
+        # SQL Server 單一語句參數上限為 2100
+        for i in range(0, len(symbols), 1000):
+            chunk = symbols[i:i + 1000]
+            placeholders = ','.join('?' for _ in chunk)
+            cursor.execute(
+                f"SELECT symbol, MAX(date) FROM {table} WHERE symbol IN ({placeholders}) GROUP BY symbol",
+                *chunk
+            )
+            for symbol, latest in cursor.fetchall():
+                result[symbol] = latest.strftime("%Y-%m-%d") if hasattr(latest, 'strftime') else str(latest)
+        return result
+
+    def save_price_history(self, rows):
+        """批次寫入日線價格: 先大量載入暫存表，再以單一 MERGE 併入主表"""
+        if not rows:
+            return
+        with metrics.timer('db.ensure_table'):
+            self._ensure_price_history_table()
+        table = self._get_table_name('price_history')
+        columns = ','.join(PRICE_HISTORY_COLUMNS)
+        with metrics.timer('db.write.price_history', rows=len(rows)):
+            with self.conn:
+                cursor = self.conn.cursor()
+                cursor.execute("""
+                    CREATE TABLE #price_stage (
+                        symbol NVARCHAR(50) NOT NULL,
+                        date DATE NOT NULL,
+                        [open] FLOAT, high FLOAT, low FLOAT, [close] FLOAT, adjClose FLOAT, volume BIGINT
+                    )
+                """)
+                cursor.fast_executemany = True
+                cursor.executemany(f"INSERT INTO #price_stage ({columns}) VALUES (?,?,?,?,?,?,?,?)", rows)
+                cursor.execute(f"""
+                    MERGE {table} WITH (HOLDLOCK) AS t
+                    USING #price_stage AS s ON t.symbol = s.symbol AND t.date = s.date
+                    WHEN MATCHED AND (
+                        EXISTS (SELECT t.[open], t.high, t.low, t.[close], t.adjClose, t.volume
+                                EXCEPT
+                                SELECT s.[open], s.high, s.low, s.[close], s.adjClose, s.volume)
+                    ) THEN UPDATE SET [open]=s.[open], high=s.high, low=s.low, [close]=s.[close],
+                                      adjClose=s.adjClose, volume=s.volume, lastUpdate=GETDATE()
+                    WHEN NOT MATCHED THEN INSERT ({columns}) VALUES (s.symbol, s.date, s.[open], s.high, s.low, s.[close], s.adjClose, s.volume);
+                """)
+                cursor.execute("DROP TABLE #price_stage")
+                self._commit()
+
+    # --- 財務報表區塊 ---
+    def _ensure_statements_table(self):
+        if self._statements_ready:
+            return
+        table = self._get_table_name('statements')
+        with self.conn:
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+                IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='{table}' AND xtype='U')
+                CREATE TABLE {table} (
+                    symbol NVARCHAR(50) NOT NULL,
+                    statement NVARCHAR(20) NOT NULL,
+                    frequency NVARCHAR(20) NOT NULL,
+                    period DATE NOT NULL,
+                    lineItem NVARCHAR(200) NOT NULL,
+                    value FLOAT NOT NULL,
+                    lastUpdate DATETIME DEFAULT GETDATE(),
+                    CONSTRAINT PK_{table} PRIMARY KEY CLUSTERED (symbol, statement, frequency, period, lineItem)
+                )
+            """)
+            self.conn.commit()
+        self._statements_ready = True
+
+    def get_latest_statement_periods(self, symbols):
+        """取得各股票各報表已儲存的最新期末日 {(symbol, statement, frequency): 'YYYY-MM-DD'}"""
+        table = self._get_table_name('statements')
+        if not symbols or not self._table_exists(table):
+            return {}
+        result = {}
+        cursor = self.conn.cursor()
+        # SQL Server 單一語句參數上限為 2100
+        for i in range(0, len(symbols), 1000):
+            chunk = symbols[i:i + 1000]
+            placeholders = ','.join('?' for _ in chunk)
+            cursor.execute(
+                f"SELECT symbol, statement, frequency, MAX(period) FROM {table} "
+                f"WHERE symbol IN ({placeholders}) GROUP BY symbol, statement, frequency",
+                *chunk
+            )
+            for symbol, statement, frequency, latest in cursor.fetchall():
+                result[(symbol, statement, frequency)] = (
+                    latest.strftime("%Y-%m-%d") if hasattr(latest, 'strftime') else str(latest))
+        return result
+
+    def save_statements(self, rows):
+        """批次寫入財務報表長格式資料列: 先大量載入暫存表，再以單一 MERGE 併入主表"""
+        if not rows:
+            return
+        with metrics.timer('db.ensure_table'):
+            self._ensure_statements_table()
+        table = self._get_table_name('statements')
+        columns = ','.join(STATEMENT_COLUMNS)
+        with metrics.timer('db.write.statements', rows=len(rows)):
+            with self.conn:
+                cursor = self.conn.cursor()
+                cursor.execute("""
+                    CREATE TABLE #statement_stage (
+                        symbol NVARCHAR(50) NOT NULL, statement NVARCHAR(20) NOT NULL, frequency NVARCHAR(20) NOT NULL,
+                        period DATE NOT NULL, lineItem NVARCHAR(200) NOT NULL, value FLOAT NOT NULL
+                    )
+                """)
+                cursor.fast_executemany = True
+                cursor.executemany(f"INSERT INTO #statement_stage ({columns}) VALUES (?,?,?,?,?,?)", rows)
+                cursor.execute(f"""
+                    MERGE {table} WITH (HOLDLOCK) AS t
+                    USING #statement_stage AS s
+                        ON t.symbol = s.symbol AND t.statement = s.statement AND t.frequency = s.frequency
+                       AND t.period = s.period AND t.lineItem = s.lineItem
+                    WHEN MATCHED AND t.value <> s.value THEN UPDATE SET value=s.value, lastUpdate=GETDATE()
+                    WHEN NOT MATCHED THEN INSERT ({columns})
+                        VALUES (s.symbol, s.statement, s.frequency, s.period, s.lineItem, s.value);
+                """)
+                cursor.execute("DROP TABLE #statement_stage")
+                self._commit()
+
+    # --- 發布版本區塊 ---
+    def _ensure_vintages_table(self):
+        if self._vintages_ready:
+            return
+        table = self._get_table_name('vintages')
+        with self.conn:
+            cursor = self.conn.cursor()
+            # 主鍵 (market, date, vintage) 同時作為「某日已知值」查詢的索引
+            cursor.execute(f"""
+                IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='{table}' AND xtype='U')
+                CREATE TABLE {table} (
+                    market NVARCHAR(20) NOT NULL,
+                    date DATE NOT NULL,
+                    vintage DATE NOT NULL,
+                    value FLOAT NULL,
+                    lastUpdate DATETIME DEFAULT GETDATE(),
+                    CONSTRAINT PK_{table} PRIMARY KEY CLUSTERED (market, date, vintage)
+                )
+            """)
+            self.conn.commit()
+        self._vintages_ready = True
+
+    def _vintage_frame(self, cursor):
+        frame = pd.DataFrame.from_records(cursor.fetchall(), columns=('date', 'vintage', 'value'), coerce_float=True)
+        return pd.DataFrame({
+            'date': pd.to_datetime(frame['date']).to_numpy(dtype='datetime64[D]'),
+            'vintage': pd.to_datetime(frame['vintage']).to_numpy(dtype='datetime64[D]'),
+            'value': frame['value'].astype('float64').to_numpy(),
+        })
+
+    def get_latest_vintages(self, market: str):
+        """取得各觀測日已儲存的最新版本 (DataFrame: date, vintage, value)"""
+        table = self._get_table_name('vintages')
+        if not self._table_exists(table):
+            return pd.DataFrame({'date': pd.Series(dtype='datetime64[s]'), 'vintage': pd.Series(dtype='datetime64[s]'),
+                                 'value': pd.Series(dtype='float64')})
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT date, vintage, value FROM (
+                SELECT date, vintage, value,
+                       ROW_NUMBER() OVER (PARTITION BY date ORDER BY vintage DESC) AS rn
+                FROM {table} WHERE market = ?
+            ) AS v WHERE rn = 1 ORDER BY date
+        """, market)
+        return self._vintage_frame(cursor)
+
+    def save_vintages(self, market: str, rows):
+        """批次寫入發布版本資料列 [(date, vintage, value)]，已存在的 (date, vintage) 不覆蓋"""
+        if not rows:
+            return
+        with metrics.timer('db.ensure_table'):
+            self._ensure_vintages_table()
+        table = self._get_table_name('vintages')
+        columns = ','.join(VINTAGE_COLUMNS)
+        with metrics.timer('db.write.vintages', rows=len(rows)):
+            with self.conn:
+                cursor = self.conn.cursor()
+                cursor.execute("""
+                    CREATE TABLE #vintage_stage (
+                        market NVARCHAR(20) NOT NULL, date DATE NOT NULL, vintage DATE NOT NULL, value FLOAT NULL
+                    )
+                """)
+                cursor.fast_executemany = True
+                cursor.executemany(f"INSERT INTO #vintage_stage ({columns}) VALUES (?,?,?,?)",
+                                   [(market, date, vintage, value) for date, vintage, value in rows])
+                cursor.execute(f"""
+                    MERGE {table} WITH (HOLDLOCK) AS t
+                    USING #vintage_stage AS s
+                        ON t.market = s.market AND t.date = s.date AND t.vintage = s.vintage
+                    WHEN NOT MATCHED THEN INSERT ({columns}) VALUES (s.market, s.date, s.vintage, s.value);
+                """)
+                cursor.execute("DROP TABLE #vintage_stage")
+                self._commit()
+
+    def get_series_as_of(self, market: str, as_of: str, start_date=None, end_date=None):
+        """取得 as_of 當日已知的序列值 (每個觀測日取 vintage <= as_of 的最新版本)，回傳以日期為索引的 Series"""
+        table = self._get_table_name('vintages')
+        if not self._table_exists(table):
+            return pd.Series(dtype='float64')
+        conditions, params = ["market = ?", "vintage <= ?"], [market, as_of]
+        if start_date:
+            conditions.append("date >= ?")
+            params.append(start_date)
+        if end_date:
+            conditions.append("date <= ?")
+            params.append(end_date)
+        cursor = self.conn.cursor()
+        # 主鍵依 (market, date, vintage) 排序，每個觀測日只需回溯到 as_of 前的第一個版本
+        cursor.execute(f"""
+            SELECT date, vintage, value FROM (
+                SELECT date, vintage, value,
+                       ROW_NUMBER() OVER (PARTITION BY date ORDER BY vintage DESC) AS rn
+                FROM {table} WHERE {' AND '.join(conditions)}
+            ) AS v WHERE rn = 1 ORDER BY date
+        """, *params)
+        frame = self._vintage_frame(cursor)
+        return pd.Series(frame['value'].to_numpy(), index=pd.DatetimeIndex(frame['date']), dtype='float64')
+
+    # --- 估值重算區塊 ---
+    def get_valuation_inputs(self, market: str):
+        """取得市場內所有股票的估值重算輸入 (DataFrame，以 symbol 為索引)"""
+        table, where, params = self._source(market)
+        if not self._table_exists(table):
+            return pd.DataFrame(columns=VALUATION_INPUTS[1:], dtype='float64')
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT {','.join(VALUATION_INPUTS)} FROM {table} WHERE {where}", *params)
+        frame = pd.DataFrame.from_records(cursor.fetchall(), columns=VALUATION_INPUTS, coerce_float=True)
+        return frame.set_index('symbol').astype('float64')
+
+    def get_latest_prices(self, market: str):
+        """取得市場內各股票最新價格 (DataFrame: price, asOf)，日線收盤與即時報價取較新者"""
+        table, where, params = self._source(market)
+        frames = []
+        cursor = self.conn.cursor()
+        history = self._get_table_name('price_history')
+        if self._table_exists(history):
+            # 以 (symbol, date) 主鍵取各股票最新一天，不掃描整段歷史
+            cursor.execute(f"""
+                SELECT p.symbol, p.[close], CAST(p.date AS DATETIME2)
+                FROM {history} AS p
+                JOIN (
+                    SELECT symbol, MAX(date) AS date FROM {history}
+                    WHERE symbol IN (SELECT symbol FROM {table} WHERE {where})
+                    GROUP BY symbol
+                ) AS m ON p.symbol = m.symbol AND p.date = m.date
+                WHERE p.[close] IS NOT NULL
+            """, *params)
+            frames.append(pd.DataFrame.from_records(cursor.fetchall(), columns=('symbol', 'price', 'asOf')))
+        quotes = self._get_table_name('quotes')
+        if self._table_exists(quotes):
+            cursor.execute(f"""
+                SELECT symbol, price, quoteTime FROM {quotes}
+                WHERE symbol IN (SELECT symbol FROM {table} WHERE {where})
+            """, *params)
+            frames.append(pd.DataFrame.from_records(cursor.fetchall(), columns=('symbol', 'price', 'asOf')))
+        if not frames:
+            return pd.DataFrame(columns=('price', 'asOf'))
+        prices = pd.concat(frames, ignore_index=True).sort_values('asOf', kind='stable')
+        return prices.drop_duplicates('symbol', keep='last').set_index('symbol')
+
+    def save_valuation(self, market: str, frame):
+        """以重算結果批次更新估值欄位: 先載入暫存表，再以單一 UPDATE ... JOIN 寫回"""
+        if frame.empty:
+            return
+        table, where, params = self._source(market)
+        values = frame[list(VALUATION_COLUMNS)].astype(object).where(frame[list(VALUATION_COLUMNS)].notna(), None)
+        rows = [(symbol, price, None if cap is None else int(cap), *rest)
+                for symbol, price, cap, *rest in values.itertuples(name=None)]
+        with metrics.timer(f'db.write.valuation.{market}', rows=len(rows)):
+            with self.conn:
+                cursor = self.conn.cursor()
+                cursor.execute("""
+                    CREATE TABLE #valuation_stage (
+                        symbol NVARCHAR(50) NOT NULL PRIMARY KEY, currentPrice FLOAT, marketCap BIGINT,
+                        trailingPE FLOAT, forwardPE FLOAT, priceToBook FLOAT, priceToSales FLOAT
+                    )
+                """)
+                cursor.fast_executemany = True
+                cursor.executemany(
+                    f"INSERT INTO #valuation_stage (symbol,{','.join(VALUATION_COLUMNS)}) "
+                    f"VALUES ({','.join('?' * (len(VALUATION_COLUMNS) + 1))})", rows
+                )
+                cursor.execute(f"""
+                    UPDATE t SET {', '.join(f't.{col}=s.{col}' for col in VALUATION_COLUMNS)}, lastUpdate=GETDATE()
+                    FROM {table} AS t JOIN #valuation_stage AS s ON t.symbol = s.symbol
+                    WHERE {where}
+                """, *params)
+                cursor.execute("DROP TABLE #valuation_stage")
+                self._commit()
+
+    # --- 即時報價區塊 ---
+    def _ensure_quotes_table(self):
+        table = self._get_table_name('quotes')
+        with self.conn:
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+                IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='{table}' AND xtype='U')
+                CREATE TABLE {table} (
+                    symbol NVARCHAR(50) PRIMARY KEY,
+                    price FLOAT NOT NULL,
+                    change FLOAT,
+                    changePercent FLOAT,
+                    dayVolume BIGINT,
+                    dayHigh FLOAT,
+                    dayLow FLOAT,
+                    quoteTime DATETIME2 NOT NULL,
+                    lastUpdate DATETIME DEFAULT GETDATE()
+                )
+            """)
+            self.conn.commit()
+
+    def save_quotes(self, rows):
+        """批次寫入最新報價 (每個代號一筆，依 QUOTE_COLUMNS)，只以較新的報價覆蓋"""
+        if not rows:
+            return
+        if not self._quotes_ready:
+            with metrics.timer('db.ensure_table'):
+                self._ensure_quotes_table()
+            self._quotes_ready = True
+        table = self._get_table_name('quotes')
+        columns = ','.join(QUOTE_COLUMNS)
+        with metrics.timer('db.write.quotes', rows=len(rows)):
+            with self.conn:
+                cursor = self.conn.cursor()
+                cursor.execute("""
+                    CREATE TABLE #quote_stage (
+                        symbol NVARCHAR(50) NOT NULL, price FLOAT NOT NULL, change FLOAT, changePercent FLOAT,
+                        dayVolume BIGINT, dayHigh FLOAT, dayLow FLOAT, quoteTime DATETIME2 NOT NULL
+                    )
+                """)
+                cursor.fast_executemany = True
+                cursor.executemany(f"INSERT INTO #quote_stage ({columns}) VALUES (?,?,?,?,?,?,?,?)", rows)
+                cursor.execute(f"""
+                    MERGE {table} WITH (HOLDLOCK) AS t
+                    USING #quote_stage AS s ON t.symbol = s.symbol
+                    WHEN MATCHED AND s.quoteTime >= t.quoteTime THEN
+                        UPDATE SET price=s.price, change=s.change, changePercent=s.changePercent,
+                                   dayVolume=s.dayVolume, dayHigh=s.dayHigh, dayLow=s.dayLow,
+                                   quoteTime=s.quoteTime, lastUpdate=GETDATE()
+                    WHEN NOT MATCHED THEN INSERT ({columns})
+                        VALUES (s.symbol, s.price, s.change, s.changePercent, s.dayVolume, s.dayHigh, s.dayLow, s.quoteTime);
+                """)
+                cursor.execute("DROP TABLE #quote_stage")
+                self._commit()
+
+    # --- 缺漏偵測區塊 ---
+    def get_date_bounds(self, market: str):
+        """取得時間序列的最早與最新日期 (無資料時回傳 (None, None))"""
+        table = self._get_table_name(market)
+        if not self._table_exists(table):
+            return None, None
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT MIN(date), MAX(date) FROM {table}")
+        row = cursor.fetchone()
+        return row[0], row[1]
+
+    def _ensure_coverage_table(self):
+        if self._coverage_ready:
+            return
+        with self.conn:
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+                IF OBJECT_ID(N'{COVERAGE_TABLE}', 'U') IS NULL
+                CREATE TABLE {COVERAGE_TABLE} (
+                    market NVARCHAR(20) NOT NULL,
+                    startDate DATE NOT NULL,
+                    endDate DATE NOT NULL,
+                    fetchedAt DATETIME DEFAULT GETDATE(),
+                    CONSTRAINT PK_{COVERAGE_TABLE} PRIMARY KEY CLUSTERED (market, startDate, endDate)
                 )
-            self.conn.commit()
\ No newline at end of file
+            """)
+            self.conn.commit()
+        self._coverage_ready = True
+
+    def mark_covered(self, market: str, start_date: str, end_date: str):
+        """記錄已向上游下載過的日期區間 (不論是否取得資料)"""
+        self._ensure_coverage_table()
+        with self.conn:
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+                IF NOT EXISTS (SELECT 1 FROM {COVERAGE_TABLE} WHERE market=? AND startDate=? AND endDate=?)
+                INSERT INTO {COVERAGE_TABLE} (market, startDate, endDate) VALUES (?, ?, ?)
+            """, market, start_date, end_date, market, start_date, end_date)
+            self._commit()
+
+    def find_missing_dates(self, market: str, start_date: str, end_date: str, frequency: str):
+        """以單一查詢比對預期日曆與已儲存日期，回傳缺漏日期 (YYYY-MM-DD)
+
+        frequency: 'B' 為工作日 (週一至週五)，'M' 為每月第一天。已記錄為下載過的區間 (mark_covered) 不列入。
+        """
+        with metrics.timer('db.ensure_table'):
+            self._ensure_table(market)
+            self._ensure_coverage_table()
+        table = self._get_table_name(market)
+        if frequency == 'M':
+            anchor = "DATEFROMPARTS(YEAR(CAST(? AS DATE)), MONTH(CAST(? AS DATE)), 1)"
+            step = "DATEADD(month, 1, d)"
+            weekday_filter = ""
+            params = [start_date, start_date, end_date]
+        else:
+            anchor = "CAST(? AS DATE)"
+            step = "DATEADD(day, 1, d)"
+            # 1900-01-01 為星期一，不受 DATEFIRST 設定影響
+            weekday_filter = "AND DATEDIFF(day, '19000101', c.d) % 7 < 5"
+            params = [start_date, end_date]
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            WITH calendar AS (
+                SELECT {anchor} AS d
+                UNION ALL
+                SELECT {step} FROM calendar WHERE {step} <= CAST(? AS DATE)
+            )
+            SELECT CONVERT(NVARCHAR(10), c.d, 23)
+            FROM calendar c
+            LEFT JOIN {table} t ON t.date = CONVERT(NVARCHAR(10), c.d, 23)
+            WHERE t.date IS NULL {weekday_filter}
+              AND NOT EXISTS (
+                  SELECT 1 FROM {COVERAGE_TABLE} r
+                  WHERE r.market = ? AND c.d BETWEEN r.startDate AND r.endDate
+              )
+            ORDER BY c.d
+            OPTION (MAXRECURSION 0)
+        """, *params, market)
+        return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,150 @@
+import pyodbc
+from fund.config.database_config import DatabaseConfig
+
+class JobQueueRepository:
+    """寫入工作佇列儲存庫 - 多台主機共用同一資料表分配股票代號"""
+
+    TABLE = 'ingest_jobs'
+
+    def __init__(self):
+        config = DatabaseConfig()
+        self.conn_str = config.get_connection_string()
+        self.conn = pyodbc.connect(self.conn_str)
+        self._ensure_table()
+
+    def _ensure_table(self):
+        with self.conn:
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+                IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='{self.TABLE}' AND xtype='U')
+                BEGIN
+                    CREATE TABLE {self.TABLE} (
+                        id BIGINT IDENTITY(1,1) PRIMARY KEY,
+                        run_id NVARCHAR(64) NOT NULL,
+                        symbol NVARCHAR(50) NOT NULL,
+                        market NVARCHAR(20) NOT NULL,
+                        status NVARCHAR(10) NOT NULL DEFAULT 'pending',
+                        attempts INT NOT NULL DEFAULT 0,
+                        lease_owner NVARCHAR(100) NULL,
+                        lease_expires DATETIME NULL,
+                        last_error NVARCHAR(1000) NULL,
+                        created DATETIME DEFAULT GETDATE(),
+                        lastUpdate DATETIME DEFAULT GETDATE()
+                    );
+                    CREATE UNIQUE INDEX ux_{self.TABLE}_run_symbol ON {self.TABLE} (run_id, market, symbol);
+                    CREATE INDEX ix_{self.TABLE}_claim ON {self.TABLE} (run_id, status, lease_expires) INCLUDE (attempts);
+                END
+            """)
+            self.conn.commit()
+
+    def enqueue(self, run_id: str, items):
+        """批次加入 (symbol, market)，同一 run 內已存在的項目略過，回傳新增筆數"""
+        rows = [(run_id, symbol, market, run_id, market, symbol) for symbol, market in items]
+        if not rows:
+            return 0
+        with self.conn:
+            cursor = self.conn.cursor()
+            cursor.execute(f"SELECT COUNT(*) FROM {self.TABLE} WHERE run_id=?", run_id)
+            before = cursor.fetchone()[0]
+            cursor.fast_executemany = True
+            cursor.executemany(f"""
+                INSERT INTO {self.TABLE} (run_id, symbol, market)
+                SELECT ?, ?, ?
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM {self.TABLE} WHERE run_id=? AND market=? AND symbol=?
+                )
+            """, rows)
+            cursor.execute(f"SELECT COUNT(*) FROM {self.TABLE} WHERE run_id=?", run_id)
+            after = cursor.fetchone()[0]
+            self.conn.commit()
+        return after - before
+
+    def claim(self, run_id: str, owner: str, batch_size: int, lease_seconds: int, max_attempts: int):
+        """原子性領取一批工作 (略過已鎖定列，逾期租約可被重新領取)，回傳 [(id, symbol, market)]"""
+        with self.conn:
+            cursor = self.conn.cursor()
+            # 已達重試上限且租約逾期 (worker 當機) 的工作直接標記失敗
+            cursor.execute(f"""
+                UPDATE {self.TABLE}
+                SET status = 'failed', lease_owner = NULL, lease_expires = NULL,
+                    last_error = COALESCE(last_error, 'lease expired'), lastUpdate = GETDATE()
+                WHERE run_id = ? AND status = 'running' AND lease_expires < GETDATE() AND attempts >= ?
+            """, run_id, int(max_attempts))
+            cursor.execute(f"""
+                WITH batch AS (
+                    SELECT TOP (?) *
+                    FROM {self.TABLE} WITH (UPDLOCK, READPAST, ROWLOCK)
+                    WHERE run_id = ?
+                      AND attempts < ?
+                      AND (status = 'pending' OR (status = 'running' AND lease_expires < GETDATE()))
+                    ORDER BY id
+                )
+                UPDATE batch
+                SET status = 'running',
+                    lease_owner = ?,
+                    lease_expires = DATEADD(second, ?, GETDATE()),
+                    attempts = attempts + 1,
+                    lastUpdate = GETDATE()
+                OUTPUT inserted.id, inserted.symbol, inserted.market;
+            """, int(batch_size), run_id, int(max_attempts), owner, int(lease_seconds))
+            jobs = [(row[0], row[1], row[2]) for row in cursor.fetchall()]
+            self.conn.commit()
+        return jobs
+
+    def extend_lease(self, job_ids, owner: str, lease_seconds: int):
+        """延長仍由自己持有的租約"""
+        if not job_ids:
+            return
+        placeholders = ','.join('?' for _ in job_ids)
+        with self.conn:
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+                UPDATE {self.TABLE}
+                SET lease_expires = DATEADD(second, ?, GETDATE())
+                WHERE lease_owner = ? AND status = 'running' AND id IN ({placeholders})
+            """, int(lease_seconds), owner, *job_ids)
+            self.conn.commit()
+
+    def mark_done(self, job_id, owner: str):
+        """標記完成 (僅限仍持有租約者)"""
+        with self.conn:
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+                UPDATE {self.TABLE}
+                SET status = 'done', lease_owner = NULL, lease_expires = NULL, last_error = NULL, lastUpdate = GETDATE()
+                WHERE id = ? AND lease_owner = ?
+            """, job_id, owner)
+            self.conn.commit()
+
+    def mark_failed(self, job_id, owner: str, error: str, max_attempts: int):
+        """標記失敗，未達重試上限者重新排入佇列"""
+        with self.conn:
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+                UPDATE {self.TABLE}
+                SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                    lease_owner = NULL, lease_expires = NULL, last_error = ?, lastUpdate = GETDATE()
+                WHERE id = ? AND lease_owner = ?
+            """, int(max_attempts), error[:1000], job_id, owner)
+            self.conn.commit()
+
+    def get_status(self, run_id: str):
+        """各狀態的工作數量 (逾期的 running 另列為 expired)"""
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT CASE WHEN status = 'running' AND lease_expires < GETDATE() THEN 'expired' ELSE status END,
+                   COUNT(*)
+            FROM {self.TABLE}
+            WHERE run_id = ?
+            GROUP BY CASE WHEN status = 'running' AND lease_expires < GETDATE() THEN 'expired' ELSE status END
+        """, run_id)
+        return {row[0]: row[1] for row in cursor.fetchall()}
+
+    def get_failures(self, run_id: str):
+        """列出失敗的工作"""
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT symbol, market, attempts, last_error FROM {self.TABLE}
+            WHERE run_id = ? AND status = 'failed' ORDER BY id
+        """, run_id)
+        return [tuple(row) for row in cursor.fetchall()]
@@ -0,0 +1,187 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from fund.config.config_manage import ConfigManager
+from fund.providers.records import SeriesBatch
+
+# 日期以 datetime64[D] 的天數儲存，數值為 float64 (缺值為 NaN)
+DATE_DTYPE = np.dtype('<i8')
+VALUE_DTYPE = np.dtype('<f8')
+
+def _to_days(value):
+    return np.datetime64(value, 'D').astype(DATE_DTYPE)
+
+class SeriesStore:
+    """本機時間序列檔案庫 - 每個序列存為連續的日期與數值陣列 (.fund/series/)，以 np.memmap 讀取
+
+    {name}.dates.bin 為遞增的日期陣列，{name}.values.bin 為 (筆數, 欄位數) 的列優先陣列，
+    期間查詢以 searchsorted 定位後直接切片，不複製資料。只支援單一寫入者。
+    整體重寫時以新的世代編號 ({name}.{世代}.dates.bin) 寫入兩個檔案，再以取代 meta.json 一次切換，
+    中斷時仍讀取舊世代，不會出現新數值檔配舊日期檔的情形。
+    """
+
+    def __init__(self, root=None):
+        self.root = root or os.path.join(os.path.dirname(ConfigManager().config_path), "series")
+
+    def _paths(self, name, generation=0):
+        base = os.path.join(self.root, name)
+        data = f"{base}.{generation}" if generation else base
+        return f"{data}.dates.bin", f"{data}.values.bin", f"{base}.meta.json"
+
+    def _data_paths(self, name, meta):
+        """meta 記錄的目前世代的 (日期檔, 數值檔)"""
+        return self._paths(name, meta.get('generation', 0) if meta else 0)[:2]
+
+    def _load_meta(self, name):
+        meta_path = self._paths(name)[2]
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _open(self, name, mode='r'):
+        """開啟序列，回傳 (meta, 日期陣列, 數值陣列)；序列不存在時回傳 (None, 空陣列, 空陣列)"""
+        meta = self._load_meta(name)
+        dates_path, values_path = self._data_paths(name, meta)
+        if meta is None or not os.path.exists(dates_path) or os.path.getsize(dates_path) < DATE_DTYPE.itemsize:
+            width = len(meta['columns']) if meta else 0
+            return meta, np.empty(0, DATE_DTYPE), np.empty((0, width), VALUE_DTYPE)
+        # 只對應完整寫入的日期 (中斷時可能留下不足一筆的位元組)
+        count = os.path.getsize(dates_path) // DATE_DTYPE.itemsize
+        dates = np.memmap(dates_path, dtype=DATE_DTYPE, mode=mode, shape=(count,))
+        # 以日期筆數決定數值列數 (附加寫入中斷時多出的數值不在讀取範圍內，下次附加前截除)
+        values = np.memmap(values_path, dtype=VALUE_DTYPE, mode=mode, shape=(len(dates), len(meta['columns'])))
+        return meta, dates, values
+
+    def read(self, name, start_date=None, end_date=None):
+        """取得期間內的 (meta, 日期切片, 數值切片)，切片為 memmap 的 view"""
+        meta, dates, values = self._open(name)
+        lo = int(np.searchsorted(dates, _to_days(start_date), 'left')) if start_date else 0
+        hi = int(np.searchsorted(dates, _to_days(end_date), 'right')) if end_date else len(dates)
+        return meta, dates[lo:hi], values[lo:hi]
+
+    def read_frame(self, name, start_date=None, end_date=None):
+        """以 DataFrame 取得期間資料 (索引為日期)"""
+        meta, dates, values = self.read(name, start_date, end_date)
+        if meta is None:
+            return pd.DataFrame()
+        return pd.DataFrame(values, index=pd.DatetimeIndex(dates.astype('datetime64[D]'), name='date'),
+                            columns=meta['columns'], copy=False)
+
+    def read_rows(self, name, start_date=None, end_date=None):
+        """以資料列 (與資料庫寫入格式相同) 取得期間資料"""
+        meta, dates, values = self.read(name, start_date, end_date)
+        if meta is None:
+            return []
+        columns = meta['columns']
+        constants = meta.get('constants', {})
+        rows = []
+        for day, row in zip(np.datetime_as_string(dates.astype('datetime64[D]')), values.tolist()):
+            item = {'date': str(day)}
+            item.update(constants)
+            item.update((column, None if value != value else value) for column, value in zip(columns, row))
+            rows.append(item)
+        return rows
+
+    def _write_meta(self, name, meta):
+        meta_path = self._paths(name)[2]
+        tmp_path = f"{meta_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, meta_path)
+
+    def _rewrite(self, name, meta, dates, values):
+        """整個序列重寫 (只在補入中間日期時發生): 寫入下一世代的檔案後更新 meta 切換，再刪除舊世代"""
+        old_paths = self._data_paths(name, meta)
+        meta['generation'] = meta.get('generation', 0) + 1
+        dates_path, values_path = self._data_paths(name, meta)
+        for path, array in ((values_path, values), (dates_path, dates)):
+            with open(path, "wb") as f:
+                f.write(np.ascontiguousarray(array).tobytes())
+        self._write_meta(name, meta)
+        for path in old_paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def append(self, name, rows):
+        """寫入資料列 (list 或 SeriesBatch): 新日期附加於尾端，既有日期就地覆寫數值，回傳附加筆數"""
+        if not len(rows):
+            return 0
+        meta = self._load_meta(name)
+        if meta is None:
+            os.makedirs(self.root, exist_ok=True)
+            if isinstance(rows, SeriesBatch):
+                meta = {'columns': list(rows.columns), 'constants': dict(rows.constants)}
+            else:
+                sample = rows[0]
+                meta = {
+                    'columns': [k for k, v in sample.items() if k != 'date' and not isinstance(v, str)],
+                    'constants': {k: v for k, v in sample.items() if k != 'date' and isinstance(v, str)},
+                }
+            self._write_meta(name, meta)
+        columns = meta['columns']
+
+        if isinstance(rows, SeriesBatch):
+            # 欄位導向資料直接取用陣列，不逐筆轉換
+            days = rows.dates.astype(DATE_DTYPE)
+            incoming = np.column_stack([rows.column(c) if c in rows.columns else np.full(len(rows), np.nan)
+                                        for c in columns]).astype(VALUE_DTYPE, copy=False) \
+                if columns else np.empty((len(rows), 0), VALUE_DTYPE)
+        else:
+            days = np.array([_to_days(row['date']) for row in rows], dtype=DATE_DTYPE)
+            incoming = np.array([[np.nan if row.get(c) is None else float(row[c]) for c in columns]
+                                 for row in rows], dtype=VALUE_DTYPE).reshape(len(days), len(columns))
+        # 依日期排序，同一日期以最後一筆為準
+        order = np.argsort(days, kind='stable')
+        days, incoming = days[order], incoming[order]
+        last_of_day = np.append(days[1:] != days[:-1], True)
+        days, incoming = days[last_of_day], incoming[last_of_day]
+
+        _, dates, values = self._open(name, mode='r+')
+        last = dates[-1] if len(dates) else None
+        tail = days > last if last is not None else np.ones(len(days), dtype=bool)
+
+        if (~tail).any():
+            idx = np.searchsorted(dates, days[~tail])
+            found = dates[np.minimum(idx, len(dates) - 1)] == days[~tail]
+            if not found.all():
+                merged_days = np.concatenate([np.asarray(dates), days[~tail][~found]])
+                merged_values = np.concatenate([np.asarray(values), incoming[~tail][~found]])
+                keep = np.argsort(merged_days, kind='stable')
+                merged_days, merged_values = merged_days[keep], merged_values[keep]
+                # 覆寫既有日期的數值後整體重寫
+                pos = np.searchsorted(merged_days, days[~tail][found])
+                merged_values[pos] = incoming[~tail][found]
+                # 先釋放 memmap 再取代檔案
+                del dates, values
+                self._rewrite(name, meta, merged_days, merged_values)
+            else:
+                values[idx] = incoming[~tail]
+                values.flush()
+                del dates, values
+        else:
+            del dates, values
+
+        if tail.any():
+            dates_path, values_path = self._data_paths(name, meta)
+            # 先截除前次中斷附加留下的殘餘位元組，使數值列與日期筆數對齊後再附加
+            count = os.path.getsize(dates_path) // DATE_DTYPE.itemsize if os.path.exists(dates_path) else 0
+            for path, size in ((dates_path, count * DATE_DTYPE.itemsize),
+                               (values_path, count * len(columns) * VALUE_DTYPE.itemsize)):
+                if os.path.exists(path) and os.path.getsize(path) != size:
+                    os.truncate(path, size)
+            # 先寫數值再寫日期，讀取端以日期筆數為準
+            with open(values_path, "ab") as f:
+                f.write(np.ascontiguousarray(incoming[tail]).tobytes())
+            with open(dates_path, "ab") as f:
+                f.write(days[tail].tobytes())
+        return int(tail.sum())
+
+    def rebuild(self, name, rows):
+        """以完整資料列重建序列 (例如由資料庫同步)"""
+        meta = self._load_meta(name)
+        for path in (*self._data_paths(name, meta), self._paths(name)[2]):
+            if os.path.exists(path):
+                os.remove(path)
+        return self.append(name, rows)
@@ -0,0 +1,120 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from fund.providers.fundamental_data_provider import FundamentalDataProvider
+from fund.repositories.fundamental_data_repository import FundamentalDataRepository
+
+# 各序列的預期日曆與期間查詢方法
+BACKFILL_SPECS = {
+    'oil': {'frequency': 'B', 'fetch': 'get_oil_price_range'},
+    'gold': {'frequency': 'B', 'fetch': 'get_gold_price_range'},
+    'cpi_us': {'frequency': 'M', 'fetch': 'get_cpi_us_range'},
+    'nfp_us': {'frequency': 'M', 'fetch': 'get_nfp_us_range'},
+}
+
+def _next_period(day, frequency):
+    """日曆上的下一期"""
+    if frequency == 'M':
+        return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+    day += timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day
+
+def _previous_period(day, frequency):
+    """日曆上的前一期 (day 所在的期間不算)"""
+    if frequency == 'M':
+        return date(day.year - (day.month == 1), (day.month - 2) % 12 + 1, 1)
+    day -= timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+# 上游公布延遲: 晚於此期限的期間下載後仍可能補上資料，不記錄為已下載
+SETTLE_PERIODS = {
+    'B': 5,
+    'M': 2,
+}
+
+def settled_before(today, frequency):
+    """已確定公布完畢的最後一期 (其後的缺漏之後仍會重試)"""
+    day = today
+    for _ in range(SETTLE_PERIODS[frequency] + 1):
+        day = _previous_period(day, frequency)
+    return day
+
+def coalesce_ranges(dates, frequency, max_gap=0):
+    """將缺漏日期合併為最少的連續區間 [(起日, 迄日)]
+
+    max_gap 允許區間之間跨過的已存在期數 (例如 2 可吸收假日造成的零星間隔)。
+    """
+    ranges = []
+    for value in sorted(dates):
+        day = datetime.strptime(value, "%Y-%m-%d").date()
+        if ranges:
+            expected = _next_period(ranges[-1][1], frequency)
+            for _ in range(max_gap):
+                if day <= expected:
+                    break
+                expected = _next_period(expected, frequency)
+            if day <= expected:
+                ranges[-1][1] = day
+                continue
+        ranges.append([day, day])
+    return [(start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")) for start, end in ranges]
+
+class BackfillService:
+    """缺漏回補服務 - 找出時間序列中缺少的日期，只下載缺漏區間"""
+
+    def __init__(self, provider=None, repository=None, series_store=None):
+        self.provider = provider or FundamentalDataProvider()
+        self.repository = repository or FundamentalDataRepository()
+        self.series_store = series_store
+
+    def plan(self, market: str, start_date=None, end_date=None, max_gap=0):
+        """規劃回補區間，未指定起日時以已儲存的最早日期為起點，未指定迄日時不含尚未結束的本期"""
+        spec = BACKFILL_SPECS[market]
+        if start_date is None:
+            start_date = self.repository.get_date_bounds(market)[0]
+            if start_date is None:
+                raise Exception(f"{market} 尚無資料，請指定 --start")
+        end_date = end_date or _previous_period(date.today(), spec['frequency']).strftime("%Y-%m-%d")
+        missing = self.repository.find_missing_dates(market, start_date, end_date, spec['frequency'])
+        return coalesce_ranges(missing, spec['frequency'], max_gap)
+
+    def _fetch(self, market: str, start_date, end_date):
+        fetch = getattr(self.provider, BACKFILL_SPECS[market]['fetch'])
+        if market == 'gold':
+            # yfinance 的 end 不含當日
+            end_date = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        return fetch(start_date, end_date)
+
+    def backfill(self, market: str, start_date=None, end_date=None, max_workers=4, max_gap=0, on_range=None):
+        """平行下載缺漏區間並依序寫入，回傳 [(起日, 迄日, 取得筆數或錯誤訊息)]
+
+        下載成功的區間 (含上游沒有資料的假日) 記錄為已下載，之後不再重試；
+        尚在公布期限內的近期部分不記錄，下次執行仍會再檢查。
+        """
+        ranges = self.plan(market, start_date, end_date, max_gap)
+        results = []
+        if not ranges:
+            return results
+        settled = settled_before(date.today(), BACKFILL_SPECS[market]['frequency']).strftime("%Y-%m-%d")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [(start, end, executor.submit(self._fetch, market, start, end)) for start, end in ranges]
+            # 資料庫連線不可跨執行緒共用，寫入留在主執行緒
+            for start, end, future in futures:
+                try:
+                    rows = future.result()
+                    if rows:
+                        self.repository.save_fundamental_data(market, rows)
+                        if self.series_store is not None:
+                            self.series_store.append(market, rows)
+                    if start <= settled:
+                        self.repository.mark_covered(market, start, min(end, settled))
+                    result = (start, end, len(rows))
+                except Exception as e:
+                    result = (start, end, str(e))
+                results.append(result)
+                if on_range:
+                    on_range(*result)
+        return results
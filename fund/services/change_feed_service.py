@@ -0,0 +1,29 @@
+from fund.repositories.change_feed_repository import ChangeFeedRepository
+
+class ChangeFeedService:
+    """變動紀錄服務 - 下游只處理有變動的股票，不必重新讀取整張資料表"""
+
+    def __init__(self, repository=None):
+        self.repository = repository or ChangeFeedRepository()
+
+    def run_changes(self, run_id: str):
+        """取得單次執行的變動紀錄"""
+        return self.repository.read_run(run_id)
+
+    def consume(self, consumer: str, limit: int = 1000, commit: bool = True, handler=None):
+        """讀取消費者尚未處理的變動紀錄並交給 handler 輸出
+
+        handler 成功完成後 (commit 時) 才將讀取位置推進至最後一筆；handler 拋出例外時讀取位置不變，
+        下次重新讀取同一批 (至少一次傳遞)。
+        """
+        offset = self.repository.get_offset(consumer)
+        changes = self.repository.read_after(offset, limit)
+        if handler:
+            handler(changes)
+        if commit and changes:
+            self.repository.commit_offset(consumer, changes[-1]['id'], changes[-1]['version'])
+        return changes
+
+    def reset(self, consumer: str, last_id: int = 0):
+        """重設消費者讀取位置至 id 為 last_id 的紀錄之後"""
+        self.repository.reset_offset(consumer, last_id)
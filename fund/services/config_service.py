@@ -1,5 +1,8 @@
 from fund.config.database_config import DatabaseConfig
 from fund.config.fred_config import FredConfig
+from fund.config.field_config import FieldConfig
+from fund.config.http_config import HttpConfig
+from fund.providers.fundamental_data_provider import FIELD_NAMES
 
 class ConfigService:
     """配置管理服務 - 提供配置的業務邏輯"""
@@ -7,6 +10,8 @@ class ConfigService:
     def __init__(self):
         self.db_config = DatabaseConfig()
         self.fred_config = FredConfig()
+        self.field_config = FieldConfig()
+        self.http_config = HttpConfig()
     
     def show_db_config(self):
         """顯示資料庫配置"""
@@ -15,7 +20,8 @@ class ConfigService:
             'database': self.db_config.database or 'Not configured',
             'username': self.db_config.username or 'Not configured',
             'password': '***' if self.db_config.password else 'Not configured',
-            'driver': self.db_config.driver or 'Not configured'
+            'driver': self.db_config.driver or 'Not configured',
+            'equity_layout': self.db_config.equity_layout
         }
     
     def show_fred_config(self):
@@ -34,9 +40,10 @@ class ConfigService:
                 'status': 'Not configured'
             }
     
-    def update_db_config(self, server=None, database=None, username=None, password=None, driver=None):
+    def update_db_config(self, server=None, database=None, username=None, password=None, driver=None,
+                         equity_layout=None):
         """更新資料庫配置"""
-        self.db_config.update_database(server, database, username, password, driver)
+        self.db_config.update_database(server, database, username, password, driver, equity_layout)
         return "database configuration updated"
     
     def clear_db_config(self):
@@ -53,3 +60,55 @@ class ConfigService:
         """清除 FRED API Key"""
         self.fred_config.clear_api_key()
         return "FRED API Key cleared"
+
+    def show_http_config(self):
+        """顯示 HTTP 連線配置"""
+        return {
+            'pool_size': self.http_config.pool_size,
+            'timeout': self.http_config.timeout,
+            'retries': self.http_config.retries
+        }
+
+    def update_http_config(self, pool_size=None, timeout=None, retries=None):
+        """更新 HTTP 連線配置"""
+        if pool_size is not None and pool_size < 1:
+            raise ValueError("pool size 必須大於 0")
+        self.http_config.update_http(pool_size, timeout, retries)
+        return "HTTP configuration updated"
+
+    def clear_http_config(self):
+        """清除 HTTP 連線配置"""
+        self.http_config.clear_http_config()
+        return "HTTP configuration cleared"
+
+    def _validate_fields(self, fields):
+        if not fields:
+            raise ValueError("欄位清單不可為空")
+        unknown = [f for f in fields if f not in FIELD_NAMES]
+        if unknown:
+            raise ValueError(f"未知的欄位: {', '.join(unknown)}")
+        return list(dict.fromkeys(fields))
+
+    def resolve_fields(self, spec):
+        """將 --fields 參數 (profile 名稱或逗號分隔欄位) 轉為欄位清單"""
+        profile = self.field_config.get_profile(spec)
+        if profile is not None:
+            # 配置檔中的 profile 可能被手動改為空清單
+            if not profile:
+                raise ValueError(f"欄位組合 '{spec}' 沒有任何欄位")
+            return list(profile)
+        return self._validate_fields([f.strip() for f in spec.split(',') if f.strip()])
+
+    def show_field_profiles(self):
+        """顯示欄位組合"""
+        return self.field_config.profiles
+
+    def update_field_profile(self, name, spec):
+        """新增或更新欄位組合"""
+        self.field_config.set_profile(name, self._validate_fields([f.strip() for f in spec.split(',') if f.strip()]))
+        return f"Field profile '{name}' updated"
+
+    def delete_field_profile(self, name):
+        """刪除欄位組合"""
+        self.field_config.delete_profile(name)
+        return f"Field profile '{name}' deleted"
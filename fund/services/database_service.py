@@ -1,5 +1,6 @@
 import pyodbc
 from fund.config.database_config import DatabaseConfig
+from fund.repositories.fundamental_data_repository import FundamentalDataRepository
 
 class DatabaseService:
     """資料庫管理服務"""
@@ -46,32 +47,71 @@ class DatabaseService:
         except Exception as e:
             return False, str(e)
     
+    def _table_stats(self, cursor, name_filter, params):
+        """由系統目錄與分割區統計取得資料表筆數、空間與最後寫入時間 (不掃描資料表)"""
+        cursor.execute(f"""
+            SELECT t.name,
+                   SUM(CASE WHEN ps.index_id IN (0, 1) THEN ps.row_count ELSE 0 END) AS row_count,
+                   SUM(ps.reserved_page_count) * 8 AS reserved_kb,
+                   MAX(us.last_user_update) AS last_user_update
+            FROM sys.tables AS t
+            JOIN sys.dm_db_partition_stats AS ps ON ps.object_id = t.object_id
+            OUTER APPLY (
+                SELECT MAX(u.last_user_update) AS last_user_update
+                FROM sys.dm_db_index_usage_stats AS u
+                WHERE u.database_id = DB_ID() AND u.object_id = t.object_id
+            ) AS us
+            WHERE {name_filter}
+            GROUP BY t.object_id, t.name
+            ORDER BY t.name
+        """, *params)
+        return [
+            {'table': row[0], 'rows': row[1], 'reserved_kb': row[2], 'last_update': row[3]}
+            for row in cursor.fetchall()
+        ]
+
+    def get_table_stats(self):
+        """列出所有 fundamental_data_* 資料表的筆數、空間與最後寫入時間
+
+        last_update 取自 sys.dm_db_index_usage_stats，SQL Server 重新啟動後至下次寫入前為 None。
+        """
+        try:
+            conn_str = self.config.get_connection_string()
+            with pyodbc.connect(conn_str) as conn:
+                return True, self._table_stats(conn.cursor(), "t.name LIKE 'fundamental[_]data[_]%'", [])
+        except Exception as e:
+            return False, str(e)
+
     def get_table_info(self, table_name):
         """取得資料表詳細資訊"""
         try:
             conn_str = self.config.get_connection_string()
             with pyodbc.connect(conn_str) as conn:
                 cursor = conn.cursor()
-                cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-                count = cursor.fetchone()[0]
-                
-                cursor.execute(f"""
-                    SELECT MAX(lastUpdate) FROM {table_name}
-                    WHERE lastUpdate IS NOT NULL
-                """)
-                last_update = cursor.fetchone()[0]
-                
-                cursor.execute(f"""
+                stats = self._table_stats(cursor, "t.name = ?", [table_name])
+                if not stats:
+                    return False, f"table '{table_name}' not found"
+
+                cursor.execute("""
                     SELECT COLUMN_NAME, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH
                     FROM INFORMATION_SCHEMA.COLUMNS
-                    WHERE TABLE_NAME = '{table_name}'
+                    WHERE TABLE_NAME = ?
                     ORDER BY ORDINAL_POSITION
-                """)
+                """, table_name)
                 columns = cursor.fetchall()
                 return True, {
-                    'count': count,
-                    'last_update': last_update,
+                    'count': stats[0]['rows'],
+                    'reserved_kb': stats[0]['reserved_kb'],
+                    'last_update': stats[0]['last_update'],
                     'columns': columns
                 }
         except Exception as e:
-            return False, str(e)
\ No newline at end of file
+            return False, str(e)
+
+    def migrate_to_unified(self):
+        """將各市場股票資料表搬移至統一資料表 fundamental_data_equity"""
+        try:
+            moved = FundamentalDataRepository().migrate_to_unified()
+            return True, moved
+        except Exception as e:
+            return False, str(e)
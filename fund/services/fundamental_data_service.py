@@ -1,11 +1,25 @@
+from datetime import datetime, timedelta
 from fund.providers.fundamental_data_provider import FundamentalDataProvider
+from fund.providers.records import SeriesBatch
 from fund.repositories.fundamental_data_repository import FundamentalDataRepository
+from fund.services.symbol_resolver_service import SymbolResolverService, is_valid_info
+from fund.utils.metrics import metrics
 
 class FundamentalDataService:
     """基本面數據服務類"""
-    def __init__(self):
-        self.provider = FundamentalDataProvider()
-        self.repository = FundamentalDataRepository()
+    def __init__(self, provider=None, repository=None, series_store=None):
+        self.provider = provider or FundamentalDataProvider()
+        self.repository = repository or FundamentalDataRepository()
+        # 本機時間序列檔案庫 (選用)，總經/大宗商品寫入時同步附加
+        self.series_store = series_store
+        self._resolver = None
+
+    @property
+    def resolver(self):
+        """延遲建立代號解析服務 (只有 --auto 需要讀取 .fund/symbols.json)"""
+        if self._resolver is None:
+            self._resolver = SymbolResolverService(self.provider)
+        return self._resolver
 
     def _get_ticker_with_suffix(self, ticker: str, market: str):
         suffix_map = {
@@ -23,56 +37,102 @@ class FundamentalDataService:
             return ticker + suffix
         return ticker
 
-    def fetch_and_store(self, ticker: str, market: str):
+    def fetch_and_store(self, ticker: str, market: str, fields=None):
         ticker_with_suffix = self._get_ticker_with_suffix(ticker, market)
-        data = self.provider.get_fundamental_data(ticker_with_suffix)
+        data = self.provider.get_fundamental_data(ticker_with_suffix, fields)
         self.repository.save_fundamental_data(market, data)
         return data
 
+    def fetch_and_store_auto(self, ticker: str, fields=None):
+        """自動判斷市場後取得並儲存，回傳 (市場, 資料)"""
+        market, ticker_with_suffix, info = self.resolver.resolve(ticker)
+        if info is None:
+            info = self.provider._ticker_info(ticker_with_suffix)
+            if not is_valid_info(info):
+                # 已解析的代號失效 (例如下市)，改列入負向快取，之後不再重試
+                self.resolver.mark_missing(ticker)
+                raise Exception(f"{ticker_with_suffix} 已查無資料")
+        with metrics.timer('transform.fundamental', rows=1):
+            data = self.provider._map_info(info, ticker_with_suffix, fields)
+        self.repository.save_fundamental_data(market, data)
+        return market, data
+
+    def fetch_and_store_history(self, tickers, market: str, start_date=None, end_date=None, batch_size=50):
+        """批次取得並儲存日線價格，已有資料的股票只下載缺少的尾段，回傳 {symbol: 寫入筆數}"""
+        symbols = [self._get_ticker_with_suffix(t, market) for t in tickers]
+        latest = self.repository.get_latest_price_dates(symbols)
+
+        # 依下載起日分組，起日相同的股票合併為同一次 yf.download
+        groups = {}
+        for symbol in symbols:
+            start = start_date
+            if symbol in latest:
+                tail_start = (datetime.strptime(latest[symbol], "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+                if start is None or tail_start > start:
+                    start = tail_start
+            if start and end_date and start >= end_date:
+                continue
+            groups.setdefault(start, []).append(symbol)
+
+        counts = {symbol: 0 for symbol in symbols}
+        for start, group in groups.items():
+            for i in range(0, len(group), batch_size):
+                rows = self.provider.get_price_history_batch(group[i:i + batch_size], start, end_date)
+                self.repository.save_price_history(rows)
+                for row in rows:
+                    counts[row[0]] += 1
+        return counts
+
+    def _save_series(self, market: str, data):
+        """寫入時間序列，並附加至本機檔案庫"""
+        self.repository.save_fundamental_data(market, data)
+        if self.series_store is not None:
+            self.series_store.append(market, data if isinstance(data, (list, SeriesBatch)) else [data])
+
     def fetch_and_store_cpi_us(self):
         """取得並儲存美國CPI資料"""
         data = self.provider.get_cpi_us()
-        self.repository.save_fundamental_data('cpi_us', data)
+        self._save_series('cpi_us', data)
         return data
 
     def fetch_and_store_nfp_us(self):
         """取得並儲存美國NFP資料"""
         data = self.provider.get_nfp_us()
-        self.repository.save_fundamental_data('nfp_us', data)
+        self._save_series('nfp_us', data)
         return data
 
     def fetch_and_store_cpi_us_range(self, start_date, end_date):
         """取得並儲存美國CPI指定期間資料"""
         data_list = self.provider.get_cpi_us_range(start_date, end_date)
-        self.repository.save_fundamental_data('cpi_us', data_list)
+        self._save_series('cpi_us', data_list)
         return data_list
 
     def fetch_and_store_nfp_us_range(self, start_date, end_date):
         """取得並儲存美國NFP指定期間資料"""
         data_list = self.provider.get_nfp_us_range(start_date, end_date)
-        self.repository.save_fundamental_data('nfp_us', data_list)
+        self._save_series('nfp_us', data_list)
         return data_list
 
     def fetch_and_store_oil_price(self):
         """取得並儲存最新WTI原油價格"""
         data = self.provider.get_oil_price()
-        self.repository.save_fundamental_data('oil', data)
+        self._save_series('oil', data)
         return data
 
     def fetch_and_store_oil_price_range(self, start_date, end_date):
         """取得並儲存WTI原油價格指定期間資料"""
         data_list = self.provider.get_oil_price_range(start_date, end_date)
-        self.repository.save_fundamental_data('oil', data_list)
+        self._save_series('oil', data_list)
         return data_list
 
     def fetch_and_store_gold_price(self):
         """取得並儲存最新黃金期貨價格"""
         data = self.provider.get_gold_price()
-        self.repository.save_fundamental_data('gold', data)
+        self._save_series('gold', data)
         return data
 
     def fetch_and_store_gold_price_range(self, start_date, end_date):
         """取得並儲存黃金期貨指定期間價格"""
         data_list = self.provider.get_gold_price_range(start_date, end_date)
-        self.repository.save_fundamental_data('gold', data_list)
+        self._save_series('gold', data_list)
         return data_list
\ No newline at end of file
@@ -0,0 +1,135 @@
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from fund.config.fx_rates import FxRateCache
+from fund.providers.fundamental_data_provider import FundamentalDataProvider
+from fund.repositories.fundamental_data_repository import (
+    MARKET_AMOUNT_COLUMNS, FINANCIAL_AMOUNT_COLUMNS, PRICE_COLUMNS
+)
+from fund.utils.metrics import metrics
+
+# 快取匯率以 1 單位幣別可換得的美元表示
+BASE_CURRENCY = 'USD'
+
+# Yahoo 以輔幣報價的幣別: 代碼 -> (主幣, 倍數)；只有價格欄位以輔幣計價，市值與財報金額為主幣
+MINOR_UNITS = {
+    'GBp': ('GBP', 0.01),
+    'GBX': ('GBP', 0.01),
+    'ZAc': ('ZAR', 0.01),
+    'ILA': ('ILS', 0.01),
+}
+
+def _major(currency):
+    return MINOR_UNITS.get(currency, (currency, 1.0))[0]
+
+def convert_records(records, factors, currency):
+    """將整批資料列的金額與價格欄位一次乘上各自幣別的換算倍數，回傳新的 dict list
+
+    factors 為 FxService.factors 的結果 {'amount': {幣別: 倍數}, 'price': {幣別: 倍數}}。市值依交易幣別 (currency)、
+    財報金額依 financialCurrency (缺少時視同交易幣別)、價格欄位依交易幣別的報價單位換算；
+    換算後幣別欄位改為目標幣別，缺少任一所需匯率的資料列維持原值與原幣別。
+    """
+    rows = [dict(record) for record in records]
+    if not rows:
+        return rows
+    with metrics.timer('transform.fx', rows=len(rows)):
+        frame = pd.DataFrame(rows)
+        if 'currency' not in frame.columns:
+            return rows
+        trading = frame['currency']
+        financial = frame['financialCurrency'].fillna(trading) if 'financialCurrency' in frame.columns else trading
+        market_factor = trading.map(factors['amount']).to_numpy(dtype='float64', na_value=np.nan)
+        financial_factor = financial.map(factors['amount']).to_numpy(dtype='float64', na_value=np.nan)
+        price_factor = trading.map(factors['price']).to_numpy(dtype='float64', na_value=np.nan)
+        present, column_factors = [], []
+        for columns, factor in ((MARKET_AMOUNT_COLUMNS, market_factor), (FINANCIAL_AMOUNT_COLUMNS, financial_factor),
+                                (PRICE_COLUMNS, price_factor)):
+            for column in columns:
+                if column in frame.columns:
+                    present.append(column)
+                    column_factors.append(factor)
+        if not present:
+            return rows
+        values = frame[present].to_numpy(dtype='float64', na_value=np.nan) * np.column_stack(column_factors)
+        converted = ~np.isnan(market_factor) & ~np.isnan(financial_factor)
+        for row, values_row in zip((row for row, ok in zip(rows, converted) if ok), values[converted].tolist()):
+            row.update((column, None if np.isnan(v) else v) for column, v in zip(present, values_row) if column in row)
+            row['currency'] = currency
+            if 'financialCurrency' in row:
+                row['financialCurrency'] = currency
+    return rows
+
+class FxService:
+    """匯率換算服務 - 每日經由外匯市場 (=X) 下載一次匯率並快取於本機，整批換算金額與價格欄位至報告幣別"""
+
+    def __init__(self, provider=None, cache=None, lookback_days=7):
+        # 只需下載匯率，不建立資料庫連線
+        self.provider = provider or FundamentalDataProvider()
+        self.cache = cache or FxRateCache()
+        # 週末與假日沒有報價，取最近幾天內的最後收盤
+        self.lookback_days = lookback_days
+
+    def _refresh(self, currencies, today):
+        """下載 {幣別}USD=X 最近的收盤匯率並寫入快取 (下載失敗時沿用舊快取)"""
+        tickers = {f"{currency}{BASE_CURRENCY}=X": currency for currency in currencies}
+        start = (date.fromisoformat(today) - timedelta(days=self.lookback_days)).isoformat()
+        try:
+            rows = self.provider.get_price_history_batch(list(tickers), start)
+        except Exception:
+            return
+        # 查無報價的幣別也記錄下載日，當天不再重試 (保留先前的匯率)
+        entries = {currency: dict(self.cache.get(currency) or {'rate': None, 'date': None}, fetched=today)
+                   for currency in currencies}
+        # 資料列依代號、日期遞增，保留每個代號最後一筆
+        for ticker, day, _, _, _, close, _, _ in rows:
+            entries[tickers[ticker]] = {'rate': close, 'date': day, 'fetched': today}
+        self.cache.update(entries)
+
+    def usd_rates(self, currencies):
+        """取得各幣別 1 單位可換得的美元 {幣別: 匯率}，當日已下載的幣別直接使用快取"""
+        today = date.today().isoformat()
+        majors = {_major(currency) for currency in currencies if currency}
+        stale = sorted(currency for currency in majors - {BASE_CURRENCY}
+                       if (self.cache.get(currency) or {}).get('fetched') != today)
+        if stale:
+            self._refresh(stale, today)
+        rates = {}
+        for currency in set(currencies) | majors | {BASE_CURRENCY}:
+            if not currency:
+                continue
+            major, scale = MINOR_UNITS.get(currency, (currency, 1.0))
+            if major == BASE_CURRENCY:
+                rates[currency] = scale
+            elif (self.cache.get(major) or {}).get('rate'):
+                rates[currency] = self.cache.get(major)['rate'] * scale
+        return rates
+
+    def factors(self, currencies, currency: str):
+        """各幣別換算為 currency 的倍數 {'amount': {原幣別: 倍數}, 'price': {原幣別: 倍數}} (取不到匯率的幣別不列入)
+
+        amount 用於以主幣計價的市值與財報金額 (GBp 視同 GBP)，price 用於以報價單位計價的價格欄位 (GBp 為便士)。
+        """
+        currency = currency.upper()
+        rates = self.usd_rates(list(currencies) + [currency])
+        if currency not in rates:
+            raise ValueError(f"無法取得 {currency} 匯率")
+        target = rates[currency]
+        return {
+            'amount': {code: rates[_major(code)] / target for code in rates if _major(code) in rates},
+            'price': {code: rate / target for code, rate in rates.items()},
+        }
+
+    def convert(self, records, currency: str):
+        """將資料列的金額與價格欄位換算為 currency，回傳新的 dict list"""
+        records = list(records)
+        currencies = {record.get(key) for record in records for key in ('currency', 'financialCurrency')} - {None}
+        return convert_records(records, self.factors(currencies, currency), currency.upper())
+
+    def rate_dates(self, currencies):
+        """快取中各幣別匯率的報價日 {幣別: 'YYYY-MM-DD'}"""
+        dates = {}
+        for currency in currencies:
+            entry = self.cache.get(_major(currency))
+            if entry and entry.get('date'):
+                dates[currency] = entry['date']
+        return dates
@@ -0,0 +1,72 @@
+import pandas as pd
+from fund.providers.fundamental_data_provider import FundamentalDataProvider, derive_cpi, derive_nfp, frame_to_rows
+from fund.repositories.fundamental_data_repository import FundamentalDataRepository
+from fund.utils.metrics import metrics
+
+# 可增量更新的總經序列
+SERIES_SPECS = {
+    'cpi_us': {'series_id': 'CPIAUCSL', 'derive': derive_cpi},
+    'nfp_us': {'series_id': 'PAYEMS', 'derive': derive_nfp},
+}
+
+# YoY 需要往前 12 期
+LOOKBACK_PERIODS = 12
+
+class IncrementalSeriesService:
+    """總經序列增量更新 - 只下載與重算變動區間，並只寫入數值有變動的資料列"""
+
+    def __init__(self, provider=None, repository=None, revision_months=3, series_store=None):
+        self.provider = provider or FundamentalDataProvider()
+        self.repository = repository or FundamentalDataRepository()
+        self.series_store = series_store
+        # FRED 會修正最近幾期公布值，預設從最新日期往前重算 3 個月
+        self.revision_months = revision_months
+
+    def _window_start(self, market: str, since=None):
+        if since:
+            return pd.Timestamp(since).strftime("%Y-%m-%d")
+        latest = self.repository.get_latest_date(market)
+        if latest is None:
+            return None
+        return (pd.Timestamp(latest) - pd.DateOffset(months=self.revision_months)).strftime("%Y-%m-%d")
+
+    def _load_series(self, series_id: str, market: str, window_start):
+        """組合計算所需的序列: 儲存的前 12 期 + 上游的變動區間"""
+        if window_start is None:
+            return self.provider.get_fred_series_since(series_id)
+        lookback = self.repository.get_series_values_before(market, window_start, LOOKBACK_PERIODS)
+        start = (pd.Timestamp(window_start) - pd.DateOffset(months=LOOKBACK_PERIODS)).strftime("%Y-%m-%d")
+        if not lookback or min(str(d)[:10] for d, _ in lookback) > start:
+            # 儲存的歷史未涵蓋前 12 個月，改由上游補齊回溯區間
+            return self.provider.get_fred_series_since(series_id, start)
+        tail = self.provider.get_fred_series_since(series_id, window_start)
+        stored = pd.Series([float(v) if v is not None else None for _, v in lookback], dtype='float64', index=pd.to_datetime([d for d, _ in lookback]))
+        return pd.concat([stored, tail[tail.index >= window_start]]).sort_index()
+
+    def refresh(self, market: str, since=None):
+        """增量更新 cpi_us / nfp_us，回傳 (變動區間起日, 新增列, 更新列)"""
+        spec = SERIES_SPECS[market]
+        window_start = self._window_start(market, since)
+        # 缺漏月份由 derive 對齊為 NaN，YoY/MoM 依日曆月份計算
+        series = self._load_series(spec['series_id'], market, window_start)
+
+        with metrics.timer(f'transform.{market}_incremental') as sample:
+            derived = spec['derive'](series)
+            if window_start is not None:
+                derived = derived[derived.index >= window_start]
+            rows = frame_to_rows(derived)
+            sample.rows = len(rows)
+
+        stored = {row['date']: row for row in self.repository.get_series_range(market, window_start)}
+        inserts, updates = [], []
+        for row in rows:
+            existing = stored.get(row['date'])
+            if existing is None:
+                inserts.append(row)
+            elif any(existing.get(k) != v for k, v in row.items() if k != 'date'):
+                updates.append(row)
+        if inserts or updates:
+            self.repository.upsert_series_rows(market, inserts, updates)
+            if self.series_store is not None:
+                self.series_store.append(market, inserts + updates)
+        return window_start, inserts, updates
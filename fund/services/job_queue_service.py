@@ -0,0 +1,66 @@
+import os
+import socket
+import time
+from fund.repositories.job_queue_repository import JobQueueRepository
+from fund.services.fundamental_data_service import FundamentalDataService
+
+class JobQueueService:
+    """分散式寫入服務 - 由資料庫佇列領取股票代號並交由 FundamentalDataService 處理"""
+
+    def __init__(self, queue_repository=None, data_service=None):
+        self.queue = queue_repository or JobQueueRepository()
+        self._data_service = data_service
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+    @property
+    def data_service(self):
+        # 只負責加入佇列的主機不需建立資料來源
+        if self._data_service is None:
+            self._data_service = FundamentalDataService()
+        return self._data_service
+
+    def enqueue(self, run_id: str, symbols, market: str):
+        """將股票代號加入佇列，回傳新增筆數"""
+        return self.queue.enqueue(run_id, [(symbol, market) for symbol in symbols])
+
+    def work(self, run_id: str, batch_size=20, lease_seconds=300, max_attempts=3,
+             wait=False, poll_seconds=5.0, on_result=None):
+        """持續領取並處理工作，直到佇列中沒有可領取項目
+
+        wait=True 時會等待其他主機持有的租約完成或逾期，確保整個 run 結束。
+        回傳 (成功數, 失敗數)。
+        """
+        done = failed = 0
+        while True:
+            jobs = self.queue.claim(run_id, self.worker_id, batch_size, lease_seconds, max_attempts)
+            if not jobs:
+                status = self.queue.get_status(run_id)
+                in_flight = status.get('running', 0) + status.get('expired', 0) + status.get('pending', 0)
+                if wait and in_flight:
+                    time.sleep(poll_seconds)
+                    continue
+                return done, failed
+
+            lease_deadline = time.monotonic() + lease_seconds
+            remaining = [job_id for job_id, _, _ in jobs]
+            for job_id, symbol, market in jobs:
+                # 租約剩餘不到一半時續約，避免處理中的工作被其他主機重複領取
+                if time.monotonic() > lease_deadline - lease_seconds / 2:
+                    self.queue.extend_lease(remaining, self.worker_id, lease_seconds)
+                    lease_deadline = time.monotonic() + lease_seconds
+                try:
+                    data = self.data_service.fetch_and_store(symbol, market)
+                    self.queue.mark_done(job_id, self.worker_id)
+                    done += 1
+                    if on_result:
+                        on_result(symbol, market, True, data)
+                except Exception as e:
+                    self.queue.mark_failed(job_id, self.worker_id, str(e), max_attempts)
+                    failed += 1
+                    if on_result:
+                        on_result(symbol, market, False, str(e))
+                remaining.remove(job_id)
+
+    def status(self, run_id: str):
+        """取得佇列狀態與失敗清單"""
+        return self.queue.get_status(run_id), self.queue.get_failures(run_id)
@@ -0,0 +1,97 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from fund.services.fundamental_data_service import FundamentalDataService
+from fund.utils.metrics import metrics
+
+# 階段結束標記
+_DONE = object()
+
+class PipelineService:
+    """非同步管線服務 - fetch / transform / write 三個階段以有界佇列串接
+
+    fetch 以 concurrency 條執行緒同時向上游取得 Ticker.info，transform 在事件迴圈內轉為資料列，
+    write 固定由單一執行緒寫入 (pyodbc 連線不可跨執行緒共用)。佇列滿時上游階段會等待，
+    資料庫寫入變慢時抓取也隨之放慢，記憶體中最多只有 queue_size 筆待處理資料。
+    """
+
+    def __init__(self, service=None, concurrency=8, queue_size=32):
+        self.service = service or FundamentalDataService()
+        self.concurrency = max(1, concurrency)
+        self.queue_size = max(1, queue_size)
+
+    async def stream(self, symbols, market: str, fields=None):
+        """依完成順序逐筆產生 (代號, 是否成功, 資料或錯誤訊息)，供嵌入其他 asyncio 服務使用"""
+        symbols = list(symbols)
+        if not symbols:
+            return
+        loop = asyncio.get_running_loop()
+        provider = self.service.provider
+        repository = self.service.repository
+        fetched = asyncio.Queue(self.queue_size)
+        transformed = asyncio.Queue(self.queue_size)
+        results = asyncio.Queue(self.queue_size)
+        pending = iter(symbols)
+        fetch_pool = ThreadPoolExecutor(min(self.concurrency, len(symbols)), thread_name_prefix='fund-fetch')
+        write_pool = ThreadPoolExecutor(1, thread_name_prefix='fund-write')
+
+        async def fetch():
+            # 多個 fetch 協程共用同一個代號迭代器
+            for symbol in pending:
+                ticker = self.service._get_ticker_with_suffix(symbol, market)
+                try:
+                    info = await loop.run_in_executor(fetch_pool, provider._ticker_info, ticker)
+                    await fetched.put((symbol, ticker, info, None))
+                except Exception as e:
+                    await fetched.put((symbol, ticker, None, e))
+
+        async def produce():
+            await asyncio.gather(*(fetch() for _ in range(min(self.concurrency, len(symbols)))))
+            await fetched.put(_DONE)
+
+        async def transform():
+            while (item := await fetched.get()) is not _DONE:
+                symbol, ticker, info, error = item
+                data = None
+                if error is None:
+                    try:
+                        with metrics.timer('transform.fundamental', rows=1):
+                            data = provider._map_info(info, ticker, fields)
+                    except Exception as e:
+                        error = e
+                await transformed.put((symbol, data, error))
+            await transformed.put(_DONE)
+
+        async def write():
+            while (item := await transformed.get()) is not _DONE:
+                symbol, data, error = item
+                if error is None:
+                    try:
+                        await loop.run_in_executor(write_pool, repository.save_fundamental_data, market, data)
+                    except Exception as e:
+                        error = e
+                await results.put((symbol, True, data) if error is None else (symbol, False, str(error)))
+            await results.put(_DONE)
+
+        tasks = [asyncio.create_task(stage) for stage in (produce(), transform(), write())]
+        try:
+            while (item := await results.get()) is not _DONE:
+                yield item
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            fetch_pool.shutdown(wait=False, cancel_futures=True)
+            write_pool.shutdown(wait=True)
+
+    async def run(self, symbols, market: str, fields=None, on_result=None):
+        """執行管線並回傳 [(代號, 是否成功, 資料或錯誤訊息)] (依完成順序)"""
+        results = []
+        async for symbol, ok, payload in self.stream(symbols, market, fields):
+            results.append((symbol, ok, payload))
+            if on_result:
+                on_result(symbol, ok, payload)
+        return results
+
+    def run_sync(self, symbols, market: str, fields=None, on_result=None):
+        """在沒有事件迴圈的程式 (例如 CLI) 中執行管線"""
+        return asyncio.run(self.run(symbols, market, fields, on_result))
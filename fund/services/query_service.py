@@ -0,0 +1,121 @@
+import gzip
+import hashlib
+import json
+import threading
+import time
+from datetime import date
+from fund.repositories.fundamental_data_repository import (
+    FundamentalDataRepository, EQUITY_MARKETS, SERIES_MARKETS, ALL_MARKETS
+)
+from fund.services.fx_service import FxService, convert_records
+from fund.utils.lru_cache import LRUCache
+
+# API 路徑名稱對應的時間序列資料表
+SERIES_ALIASES = {
+    'cpi': 'cpi_us',
+    'nfp': 'nfp_us',
+    'oil': 'oil',
+    'gold': 'gold',
+}
+
+class CachedResponse:
+    """已序列化的查詢結果 (含 gzip 壓縮版本與 ETag)"""
+    __slots__ = ('version', 'body', 'gzip_body', 'etag')
+
+    def __init__(self, version, payload):
+        self.version = version
+        self.body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        self.gzip_body = gzip.compress(self.body, compresslevel=6)
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest() + '"'
+
+class QueryService:
+    """唯讀查詢服務 - 以 lastUpdate 為版本的 LRU 快取包裝資料庫查詢"""
+
+    def __init__(self, repository=None, cache_size=1024, revalidate_seconds=1.0, fx_service=None):
+        self.repository = repository or FundamentalDataRepository()
+        # 只有指定報告幣別的篩選需要匯率
+        self.fx_service = fx_service
+        self.cache = LRUCache(cache_size)
+        self.revalidate_seconds = revalidate_seconds
+        self._versions = {}
+        # pyodbc 連線不可跨執行緒同時使用
+        self._db_lock = threading.Lock()
+
+    def _table_version(self, market: str):
+        """取得資料表版本 (MAX(lastUpdate))，在 revalidate_seconds 內直接使用記憶體中的值"""
+        now = time.monotonic()
+        cached = self._versions.get(market)
+        if cached is not None and now - cached[1] < self.revalidate_seconds:
+            return cached[0]
+        with self._db_lock:
+            version = self.repository.get_last_update(market)
+        self._versions[market] = (version, now)
+        return version
+
+    def _cached(self, market: str, key, loader):
+        version = self._table_version(market)
+        entry = self.cache.get(key)
+        if entry is not None and entry.version == version:
+            return entry
+        with self._db_lock:
+            payload = loader()
+        entry = CachedResponse(version, payload)
+        self.cache.set(key, entry)
+        return entry
+
+    def _check_equity_market(self, market: str, allow_all=False):
+        if market not in EQUITY_MARKETS and not (allow_all and market == ALL_MARKETS):
+            raise ValueError(f"不支援的市場: {market}")
+
+    def list_symbols(self, market: str):
+        """列出市場內所有股票代號"""
+        self._check_equity_market(market)
+        return self._cached(market, ('symbols', market),
+                            lambda: self.repository.list_symbols(market))
+
+    def get_symbol(self, market: str, symbol: str):
+        """取得單一股票的基本面資料 (不存在時回傳 None)"""
+        self._check_equity_market(market)
+        entry = self._cached(market, ('symbol', market, symbol),
+                             lambda: self.repository.get_fundamental_data(market, symbol))
+        return None if entry.body == b'null' else entry
+
+    def screen(self, market: str, filters, order_by=None, descending=False, limit=100, currency=None):
+        """依條件篩選股票 (unified 配置下可用 all 跨市場篩選)
+
+        currency 指定時金額欄位的條件、排序與輸出皆以該幣別計 (匯率每日更新，快取鍵含日期)。
+        """
+        self._check_equity_market(market, allow_all=True)
+        if currency is None:
+            key = ('screen', market, tuple(filters), order_by, descending, limit)
+            return self._cached(market, key, lambda: self.repository.screen(
+                market, filters, order_by=order_by, descending=descending, limit=limit))
+        currency = currency.upper()
+        key = ('screen', market, tuple(filters), order_by, descending, limit, currency, date.today())
+        return self._cached(market, key, lambda: self._screen_converted(
+            market, filters, order_by, descending, limit, currency))
+
+    def _screen_converted(self, market, filters, order_by, descending, limit, currency):
+        if self.fx_service is None:
+            self.fx_service = FxService()
+        factors = self.fx_service.factors(self.repository.list_currencies(market), currency)
+        rows = self.repository.screen(market, filters, order_by=order_by, descending=descending,
+                                      limit=limit, fx=factors)
+        return convert_records(rows, factors, currency)
+
+    def get_series(self, name: str, start_date=None, end_date=None):
+        """取得總經/大宗商品時間序列"""
+        market = SERIES_ALIASES.get(name, name)
+        if market not in SERIES_MARKETS:
+            raise ValueError(f"不支援的資料序列: {name}")
+        key = ('series', market, start_date, end_date)
+        return self._cached(market, key, lambda: self.repository.get_series_range(
+            market, start_date, end_date))
+
+    def stats(self):
+        """快取統計"""
+        return {
+            'entries': len(self.cache),
+            'hits': self.cache.hits,
+            'misses': self.cache.misses,
+        }
@@ -0,0 +1,120 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fund.providers.quote_stream import QuoteStreamProvider, parse_tick
+from fund.repositories.fundamental_data_repository import FundamentalDataRepository
+from fund.utils.metrics import metrics
+
+class QuoteCoalescer:
+    """報價合併 - 每個代號只保留最新一筆，累積 batch_size 檔或距上次送出超過 flush_seconds 時整批送出"""
+
+    def __init__(self, batch_size=500, flush_seconds=1.0):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.latest = {}
+        self.ticks = 0
+        self.last_flush = time.monotonic()
+
+    def add(self, row):
+        """加入一筆報價，回傳是否已達批次大小"""
+        current = self.latest.get(row[0])
+        # 亂序到達的舊報價不覆蓋較新的報價
+        if current is None or row[-1] >= current[-1]:
+            self.latest[row[0]] = row
+        self.ticks += 1
+        return len(self.latest) >= self.batch_size
+
+    def due(self):
+        """是否已超過送出間隔"""
+        return bool(self.latest) and time.monotonic() - self.last_flush >= self.flush_seconds
+
+    def drain(self):
+        """取出待寫入的報價 (每個代號一筆) 與期間收到的 tick 數"""
+        rows, ticks = list(self.latest.values()), self.ticks
+        self.latest = {}
+        self.ticks = 0
+        self.last_flush = time.monotonic()
+        return rows, ticks
+
+    def restore(self, rows, ticks):
+        """寫入失敗時將取出的報價放回 (期間已收到較新報價的代號保留較新者)，下次送出時重試"""
+        for row in rows:
+            current = self.latest.get(row[0])
+            if current is None or row[-1] > current[-1]:
+                self.latest[row[0]] = row
+        self.ticks += ticks
+
+class QuoteStreamService:
+    """即時報價寫入服務 - 訂閱串流報價，於記憶體合併後以小批次寫入報價資料表"""
+
+    def __init__(self, provider=None, repository=None, batch_size=500, flush_seconds=1.0):
+        self.provider = provider or QuoteStreamProvider()
+        self.repository = repository or FundamentalDataRepository()
+        self.coalescer = QuoteCoalescer(batch_size, flush_seconds)
+        self.stats = {'ticks': 0, 'rows': 0, 'flushes': 0, 'failures': 0}
+
+    async def run(self, symbols, duration=None, on_flush=None, on_error=None):
+        """持續接收報價直到 duration 秒後或連線結束，回傳統計 {ticks, rows, flushes, failures}
+
+        on_flush(報價資料列, tick 數) 於每次寫入完成後呼叫；寫入失敗時報價放回合併區待下次重試，
+        並呼叫 on_error(報價資料列, tick 數, 例外)。
+        """
+        loop = asyncio.get_running_loop()
+        # 資料庫寫入固定在同一執行緒 (pyodbc 連線不可跨執行緒共用)，不阻塞接收
+        write_pool = ThreadPoolExecutor(1, thread_name_prefix='fund-quotes')
+        lock = asyncio.Lock()
+        pending = set()
+
+        async def flush():
+            async with lock:
+                rows, ticks = self.coalescer.drain()
+                if not rows:
+                    return
+                try:
+                    with metrics.timer('stream.flush', rows=len(rows)):
+                        await loop.run_in_executor(write_pool, self.repository.save_quotes, rows)
+                except Exception as e:
+                    self.coalescer.restore(rows, ticks)
+                    self.stats['failures'] += 1
+                    if on_error:
+                        on_error(rows, ticks, e)
+                    return
+                self.stats['ticks'] += ticks
+                self.stats['rows'] += len(rows)
+                self.stats['flushes'] += 1
+                if on_flush:
+                    on_flush(rows, ticks)
+
+        def schedule_flush():
+            task = asyncio.create_task(flush())
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+        def on_message(message):
+            row = parse_tick(message)
+            if row is not None and self.coalescer.add(row) and not lock.locked():
+                schedule_flush()
+
+        async def timer():
+            interval = min(self.coalescer.flush_seconds, 0.25)
+            while True:
+                await asyncio.sleep(interval)
+                if self.coalescer.due() and not lock.locked():
+                    schedule_flush()
+
+        listener = asyncio.create_task(self.provider.listen(symbols, on_message))
+        ticker = asyncio.create_task(timer())
+        try:
+            await asyncio.wait([listener], timeout=duration)
+        finally:
+            for task in (listener, ticker):
+                task.cancel()
+            await asyncio.gather(listener, ticker, *pending, return_exceptions=True)
+            # 結束前寫入剩餘的報價
+            await flush()
+            write_pool.shutdown(wait=True)
+        return self.stats
+
+    def run_sync(self, symbols, duration=None, on_flush=None, on_error=None):
+        """在沒有事件迴圈的程式 (例如 CLI) 中執行"""
+        return asyncio.run(self.run(symbols, duration, on_flush, on_error))
@@ -0,0 +1,64 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from fund.providers.replay_provider import create_provider
+from fund.services.fundamental_data_service import FundamentalDataService
+from fund.utils.metrics import metrics
+
+# 子行程內的服務實例 (每個行程各自持有 provider 與資料庫連線)
+_worker_service = None
+_worker_error = None
+
+def _init_worker(provider_options):
+    global _worker_service, _worker_error
+    # fork 啟動時會繼承父行程的統計，先清空避免重複計算
+    metrics.reset()
+    try:
+        _worker_service = FundamentalDataService(provider=create_provider(**provider_options))
+    except Exception as e:
+        # 初始化失敗 (例如資料庫無法連線) 時，將錯誤回報給分片內每檔股票
+        _worker_error = str(e)
+
+def _ingest_shard(shard, market, fields=None):
+    """在子行程中處理一個分片，回傳 ([(索引, 代號, 是否成功, 資料或錯誤訊息)], 統計)"""
+    results = []
+    for index, symbol in shard:
+        if _worker_error is not None:
+            results.append((index, symbol, False, _worker_error))
+            continue
+        try:
+            data = _worker_service.fetch_and_store(symbol, market, fields)
+            results.append((index, symbol, True, data))
+        except Exception as e:
+            results.append((index, symbol, False, str(e)))
+    snapshot = metrics.snapshot()
+    metrics.reset()
+    return results, snapshot
+
+class ShardedIngestService:
+    """多行程分片寫入服務 - 將股票代號分散至多個行程處理並彙整結果"""
+
+    def __init__(self, workers=None, provider_options=None, chunk_size=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.provider_options = provider_options or {}
+        self.chunk_size = chunk_size
+
+    def _shards(self, symbols):
+        # 分片數量為行程數的數倍，避免單一慢分片拖住整體
+        size = self.chunk_size or max(1, -(-len(symbols) // (self.workers * 4)))
+        indexed = list(enumerate(symbols))
+        return [indexed[i:i + size] for i in range(0, len(indexed), size)]
+
+    def fetch_and_store_many(self, symbols, market: str, fields=None, on_result=None):
+        """分片處理股票代號，依原始順序回傳 [(代號, 是否成功, 資料或錯誤訊息)]"""
+        ordered = [None] * len(symbols)
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.provider_options,)) as executor:
+            futures = [executor.submit(_ingest_shard, shard, market, fields) for shard in self._shards(symbols)]
+            for future in as_completed(futures):
+                results, snapshot = future.result()
+                metrics.merge(snapshot)
+                for index, symbol, ok, payload in results:
+                    ordered[index] = (symbol, ok, payload)
+                    if on_result:
+                        on_result(symbol, ok, payload)
+        return ordered
@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from fund.services.fundamental_data_service import FundamentalDataService
+
+class StatementService:
+    """財務報表服務 - 多檔股票同時下載季報/年報，只寫入新公布的期別並批次載入資料庫"""
+
+    def __init__(self, service=None, concurrency=8, batch_rows=20000):
+        self.service = service or FundamentalDataService()
+        self.concurrency = max(1, concurrency)
+        self.batch_rows = batch_rows
+
+    def fetch_and_store_many(self, symbols, market: str, on_result=None):
+        """下載並寫入財務報表，依寫入完成順序回傳 [(代號, 是否成功, 寫入筆數或錯誤訊息)]
+
+        成功與否在該代號所屬的批次寫入資料庫後才回報；批次寫入失敗時，該批所有代號皆記為失敗。
+        """
+        provider = self.service.provider
+        repository = self.service.repository
+        tickers = [self.service._get_ticker_with_suffix(symbol, market) for symbol in symbols]
+        latest = repository.get_latest_statement_periods(tickers)
+        since = {}
+        for (ticker, statement, frequency), period in latest.items():
+            since.setdefault(ticker, {})[(statement, frequency)] = period
+
+        results = []
+        buffer = []
+        # 資料列尚在緩衝區、等待寫入的 (代號, 筆數)
+        waiting = []
+
+        def report(result):
+            results.append(result)
+            if on_result:
+                on_result(*result)
+
+        def flush():
+            nonlocal buffer, waiting
+            try:
+                repository.save_statements(buffer)
+            except Exception as e:
+                done = [(symbol, False, str(e)) for symbol, _ in waiting]
+            else:
+                done = [(symbol, True, count) for symbol, count in waiting]
+            buffer, waiting = [], []
+            for result in done:
+                report(result)
+
+        # 下載在執行緒中並行，寫入留在本執行緒 (pyodbc 連線不跨執行緒使用)
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(tickers) or 1)) as executor:
+            futures = {executor.submit(provider.get_statements, ticker, since.get(ticker)): symbol
+                       for symbol, ticker in zip(symbols, tickers)}
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    report((symbol, False, str(e)))
+                    continue
+                buffer.extend(rows)
+                waiting.append((symbol, len(rows)))
+                if len(buffer) >= self.batch_rows:
+                    flush()
+        flush()
+        return results
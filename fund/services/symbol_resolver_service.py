@@ -0,0 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+from fund.config.symbol_index import SymbolIndex
+
+# 查無代號的負向快取有效期 (7 天)
+MISSING_TTL_SECONDS = 7 * 24 * 3600
+
+def is_valid_info(info):
+    """Ticker.info 是否代表存在的標的 (查無代號時 yfinance 回傳近乎空白的 dict)"""
+    if not info:
+        return False
+    return bool(info.get('shortName') or info.get('longName') or info.get('regularMarketPrice') is not None)
+
+class SymbolResolverService:
+    """代號市場自動解析 - 平行嘗試候選後綴一次，結果於 flush() 時寫入 .fund/symbols.json"""
+
+    def __init__(self, provider=None, index=None, missing_ttl_seconds=MISSING_TTL_SECONDS):
+        self.provider = provider
+        self.index = index or SymbolIndex()
+        self.missing_ttl_seconds = missing_ttl_seconds
+
+    def candidates(self, symbol: str):
+        """依優先順序列出候選 (市場, ticker)"""
+        if symbol.isdigit() or (symbol[:-1].isdigit() and symbol[-1:].isalpha()):
+            # 台股代號: 上市 .TW 優先，其次上櫃/興櫃 .TWO
+            return [('tw', f"{symbol}.TW"), ('two', f"{symbol}.TWO")]
+        return [('us', symbol), ('crypto', f"{symbol}-USD")]
+
+    def _probe(self, ticker: str):
+        try:
+            info = self.provider._ticker_info(ticker)
+        except Exception:
+            return None
+        return info if is_valid_info(info) else None
+
+    def resolve(self, symbol: str):
+        """解析代號，回傳 (市場, ticker, 已取得的 info 或 None)
+
+        索引命中時不發出任何請求 (info 為 None)；查無代號時拋出例外並寫入負向快取。
+        """
+        entry = self.index.get(symbol)
+        if entry and not entry.get('missing'):
+            return entry['market'], entry['ticker'], None
+        if self.index.is_missing(symbol, self.missing_ttl_seconds):
+            raise Exception(f"查無此代號 (已快取): {symbol}")
+
+        candidates = self.candidates(symbol)
+        with ThreadPoolExecutor(max_workers=len(candidates)) as executor:
+            infos = list(executor.map(lambda c: self._probe(c[1]), candidates))
+        for (market, ticker), info in zip(candidates, infos):
+            if info is not None:
+                self.index.set_resolved(symbol, market, ticker)
+                return market, ticker, info
+
+        self.index.set_missing(symbol)
+        raise Exception(f"查無此代號: {symbol}")
+
+    def mark_missing(self, symbol: str):
+        """已解析的代號失效 (例如下市) 時改寫為負向快取"""
+        self.index.set_missing(symbol)
+
+    def flush(self):
+        """將本次解析結果寫入索引檔 (整批執行結束時呼叫一次)"""
+        self.index.flush()
+
+    def entries(self):
+        """列出索引中的所有代號"""
+        return self.index.items()
+
+    def forget(self, symbols=None):
+        """清除指定代號的解析結果，未指定時清除全部"""
+        self.index.delete(symbols)
@@ -0,0 +1,50 @@
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from fund.repositories.fundamental_data_repository import FundamentalDataRepository, VALUATION_COLUMNS
+from fund.utils.metrics import metrics
+
+def recompute_valuation(inputs, prices, max_move=0.5):
+    """以最新價格向量化更新估值欄位，回傳以 symbol 為索引的 DataFrame (price 與 VALUATION_COLUMNS)
+
+    估值欄位皆與價格成正比，以 新價格 / 已存的 currentPrice (抓取或上次重算時的價格) 等比例調整 Yahoo 原值，
+    不以原始財報數字或 市值 / 流通股數 反推 (ADR 的股數單位、多類股公司的市值涵蓋所有類股)。
+    新價格與已存價格相差超過 max_move 的股票 (多為報價單位不一致) 與缺少價格、已存價格或市值者不輸出。
+    """
+    frame = inputs.join(prices[['price']], how='inner')
+    price = frame['price']
+    scale = price / frame['currentPrice'].where(frame['currentPrice'] > 0)
+    scale = scale.where((scale - 1).abs() <= max_move)
+    result = pd.DataFrame({'price': price}, index=frame.index)
+    for column in VALUATION_COLUMNS:
+        result[column] = frame[column] * scale
+    result['marketCap'] = result['marketCap'].round()
+    return result.replace([np.inf, -np.inf], np.nan).dropna(subset=['marketCap'])
+
+class ValuationService:
+    """估值重算服務 - 以最新價格等比例調整已儲存的估值欄位，一次更新整個市場"""
+
+    def __init__(self, repository=None, data_service=None):
+        self.repository = repository or FundamentalDataRepository()
+        # 只在 refresh_prices 時需要 (下載日線價格)
+        self.data_service = data_service
+
+    def refresh_prices(self, market: str, days: int = 7):
+        """下載市場內所有股票最近幾天的日線價格 (已有資料的股票只補尾段)"""
+        symbols = self.repository.list_symbols(market)
+        if not symbols:
+            return {}
+        start = (date.today() - timedelta(days=days)).strftime("%Y-%m-%d")
+        return self.data_service.fetch_and_store_history(symbols, market, start_date=start)
+
+    def recompute(self, market: str, dry_run: bool = False):
+        """重算並寫回估值欄位，回傳 (重算結果 DataFrame, 無法重算的代號)"""
+        inputs = self.repository.get_valuation_inputs(market)
+        prices = self.repository.get_latest_prices(market)
+        with metrics.timer('transform.valuation') as sample:
+            result = recompute_valuation(inputs, prices)
+            sample.rows = len(result)
+        missing = sorted(set(inputs.index) - set(result.index))
+        if not dry_run:
+            self.repository.save_valuation(market, result[list(VALUATION_COLUMNS)])
+        return result, missing
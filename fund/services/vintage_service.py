@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+from fund.providers.fundamental_data_provider import FundamentalDataProvider, monthly
+from fund.providers.records import SeriesBatch
+from fund.repositories.fundamental_data_repository import FundamentalDataRepository
+from fund.services.incremental_series_service import SERIES_SPECS, LOOKBACK_PERIODS
+from fund.utils.metrics import metrics
+
+def compress_vintages(releases, stored=None):
+    """差異壓縮發布版本: 只保留與同一觀測日前一版本數值不同的資料列 [(date, vintage, value)]
+
+    releases 與 stored 皆為 DataFrame (date, vintage, value)；stored 為各觀測日已儲存的最新版本，
+    不晚於該版本的下載資料視為已知而略過。數值相同 (含皆為缺值) 的新版本不輸出。
+    """
+    releases = releases.assign(stored=False)
+    if stored is not None and len(stored):
+        known = releases['date'].map(stored.set_index('date')['vintage'])
+        releases = releases[~(releases['vintage'] <= known)]
+        releases = pd.concat([stored.assign(stored=True), releases], ignore_index=True)
+    frame = releases.sort_values(['date', 'vintage', 'stored'], ascending=[True, True, False], kind='stable')
+    frame = frame.drop_duplicates(['date', 'vintage'], keep='first')
+
+    dates = frame['date'].to_numpy()
+    values = frame['value'].to_numpy(dtype='float64')
+    same_date = np.r_[False, dates[1:] == dates[:-1]]
+    previous = np.r_[np.nan, values[:-1]]
+    unchanged = same_date & ((values == previous) | (np.isnan(values) & np.isnan(previous)))
+    keep = ~unchanged & ~frame['stored'].to_numpy(dtype=bool)
+
+    kept = frame[keep]
+    return list(zip(
+        pd.DatetimeIndex(kept['date']).strftime("%Y-%m-%d"),
+        pd.DatetimeIndex(kept['vintage']).strftime("%Y-%m-%d"),
+        [None if np.isnan(v) else float(v) for v in kept['value'].to_numpy(dtype='float64')],
+    ))
+
+class VintageService:
+    """總經序列發布版本服務 - 保存 FRED 每次公布與修正的數值，並重建任一日期當時已知的序列"""
+
+    def __init__(self, provider=None, repository=None):
+        self.provider = provider or FundamentalDataProvider()
+        self.repository = repository or FundamentalDataRepository()
+
+    def refresh(self, market: str):
+        """下載新發布的版本並寫入差異，回傳 (寫入列, 其中屬於既有觀測日修正的列數)"""
+        spec = SERIES_SPECS[market]
+        stored = self.repository.get_latest_vintages(market)
+        # 只需下載最新已存版本日之後仍有效或新發布的版本
+        since = pd.Timestamp(stored['vintage'].max()).strftime("%Y-%m-%d") if len(stored) else None
+        releases = self.provider.get_fred_vintages(spec['series_id'], since)
+        with metrics.timer(f'transform.{market}_vintages') as sample:
+            rows = compress_vintages(releases, stored)
+            sample.rows = len(rows)
+        self.repository.save_vintages(market, rows)
+        # 與本次或先前寫入的較早版本同一觀測日者即為修正
+        first_seen = set(pd.DatetimeIndex(stored['date']).strftime("%Y-%m-%d"))
+        revisions = 0
+        for date, _, _ in rows:
+            if date in first_seen:
+                revisions += 1
+            first_seen.add(date)
+        return rows, revisions
+
+    def as_of(self, market: str, as_of: str, start_date=None, end_date=None):
+        """重建 as_of 當日已知的序列並計算衍生指標，回傳 SeriesBatch (value 與 YoY/MoM 欄位)"""
+        spec = SERIES_SPECS[market]
+        # YoY 需要起日前 12 期
+        lookback = (pd.Timestamp(start_date) - pd.DateOffset(months=LOOKBACK_PERIODS)).strftime("%Y-%m-%d") \
+            if start_date else None
+        # 當時尚未公布或已撤回的月份保留為 NaN，derive 依日曆月份對齊，不讓後續月份錯位
+        series = monthly(self.repository.get_series_as_of(market, as_of, lookback, end_date))
+        with metrics.timer(f'transform.{market}_as_of') as sample:
+            derived = spec['derive'](series)
+            if start_date:
+                derived = derived[derived.index >= start_date]
+            sample.rows = len(derived)
+        return SeriesBatch.from_frame(derived)
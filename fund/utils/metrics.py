@@ -0,0 +1,178 @@
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# 延遲直方圖分桶上限 (秒)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+
+class StageStats:
+    """單一階段的統計資料"""
+    __slots__ = ('count', 'errors', 'total', 'max', 'rows', 'bytes', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+    def observe(self, seconds, rows=0, nbytes=0, error=False):
+        self.count += 1
+        self.errors += 1 if error else 0
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.rows += rows
+        self.bytes += nbytes
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+
+    def merge(self, other):
+        """合併其他行程回傳的統計"""
+        self.count += other.count
+        self.errors += other.errors
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        self.rows += other.rows
+        self.bytes += other.bytes
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+    def quantile(self, q):
+        """由直方圖估計分位數 (回傳所在分桶上限)"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(LATENCY_BUCKETS, self.buckets):
+            seen += n
+            if seen >= target:
+                return self.max if math.isinf(bound) else min(bound, self.max)
+        return self.max
+
+class Sample:
+    """計時區塊內可回填的資料量"""
+    __slots__ = ('rows', 'bytes')
+
+    def __init__(self, rows=0, nbytes=0):
+        self.rows = rows
+        self.bytes = nbytes
+
+class Metrics:
+    """各階段 (provider / transform / db) 的次數、延遲與資料量統計"""
+
+    def __init__(self):
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, stage, rows=0, nbytes=0):
+        """量測區塊耗時，可於區塊內設定 sample.rows / sample.bytes"""
+        sample = Sample(rows, nbytes)
+        start = time.perf_counter()
+        error = False
+        try:
+            yield sample
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - start, sample.rows, sample.bytes, error)
+
+    def record(self, stage, seconds, rows=0, nbytes=0, error=False):
+        """記錄一次觀測值"""
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = StageStats()
+            stats.observe(seconds, rows, nbytes, error)
+
+    def merge(self, snapshot):
+        """合併 snapshot() 的結果 (例如子行程回傳的統計)"""
+        with self._lock:
+            for stage, other in snapshot.items():
+                stats = self._stages.get(stage)
+                if stats is None:
+                    stats = self._stages[stage] = StageStats()
+                stats.merge(other)
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+    def snapshot(self):
+        """回傳 {階段: StageStats} 的排序副本"""
+        with self._lock:
+            return dict(sorted(self._stages.items()))
+
+    def format_table(self):
+        """格式化為摘要表"""
+        header = f"{'stage':<28}{'count':>8}{'err':>6}{'total(s)':>11}{'avg(ms)':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'max(ms)':>10}{'rows':>10}{'bytes':>12}"
+        lines = [header, '-' * len(header)]
+        for stage, s in self.snapshot().items():
+            avg = s.total / s.count * 1000 if s.count else 0.0
+            lines.append(
+                f"{stage:<28}{s.count:>8}{s.errors:>6}{s.total:>11.3f}{avg:>10.2f}"
+                f"{s.quantile(0.5) * 1000:>10.2f}{s.quantile(0.95) * 1000:>10.2f}{s.max * 1000:>10.2f}"
+                f"{s.rows:>10}{s.bytes:>12}"
+            )
+        return '\n'.join(lines)
+
+    def format_json_lines(self):
+        """格式化為 JSON lines (每個階段一行)"""
+        lines = []
+        for stage, s in self.snapshot().items():
+            lines.append(json.dumps({
+                'stage': stage,
+                'count': s.count,
+                'errors': s.errors,
+                'total_seconds': round(s.total, 6),
+                'max_seconds': round(s.max, 6),
+                'p50_seconds': round(s.quantile(0.5), 6),
+                'p95_seconds': round(s.quantile(0.95), 6),
+                'rows': s.rows,
+                'bytes': s.bytes,
+                'buckets': {('+Inf' if math.isinf(b) else str(b)): n for b, n in zip(LATENCY_BUCKETS, s.buckets)},
+            }))
+        return '\n'.join(lines)
+
+    def format_prometheus(self):
+        """格式化為 Prometheus textfile collector 格式"""
+        lines = [
+            '# HELP fund_stage_seconds Latency of fund ingestion stages.',
+            '# TYPE fund_stage_seconds histogram',
+        ]
+        snapshot = self.snapshot()
+        for stage, s in snapshot.items():
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS, s.buckets):
+                cumulative += n
+                le = '+Inf' if math.isinf(bound) else repr(bound)
+                lines.append(f'fund_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'fund_stage_seconds_sum{{stage="{stage}"}} {s.total:.6f}')
+            lines.append(f'fund_stage_seconds_count{{stage="{stage}"}} {s.count}')
+        for name, attr, help_text in (
+            ('fund_stage_errors_total', 'errors', 'Failed calls per stage.'),
+            ('fund_stage_rows_total', 'rows', 'Rows moved per stage.'),
+            ('fund_stage_bytes_total', 'bytes', 'Bytes moved per stage.'),
+        ):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for stage, s in snapshot.items():
+                lines.append(f'{name}{{stage="{stage}"}} {getattr(s, attr)}')
+        return '\n'.join(lines) + '\n'
+
+    def render(self, fmt):
+        """依格式輸出: table / jsonl / prom"""
+        if fmt == 'jsonl':
+            return self.format_json_lines()
+        if fmt == 'prom':
+            return self.format_prometheus()
+        return self.format_table()
+
+# 行程內共用的統計實例
+metrics = Metrics()
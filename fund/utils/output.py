@@ -0,0 +1,74 @@
+import csv
+import io
+import json
+import sys
+from collections.abc import Mapping
+
+OUTPUT_MODES = ('text', 'ndjson', 'csv', 'quiet')
+
+def _json_default(value):
+    # FundamentalRecord 等非 dict 的 Mapping 只在輸出時展開
+    return dict(value) if isinstance(value, Mapping) else str(value)
+
+class OutputWriter:
+    """命令輸出 - text 為原本的格式化顯示，ndjson/csv 每筆資料一行並批次寫出，quiet 不輸出資料
+
+    非 text 模式下狀態與錯誤訊息改寫至 stderr，stdout 只保留資料列供下游程式讀取。
+    """
+
+    def __init__(self, mode='text', stream=None, batch_size=500):
+        if mode not in OUTPUT_MODES:
+            raise ValueError(f"不支援的輸出格式: {mode}")
+        self.mode = mode
+        self.stream = stream or sys.stdout
+        self.batch_size = batch_size
+        self._buffer = io.StringIO()
+        self._pending = 0
+        self._csv_writer = None
+
+    @property
+    def text(self):
+        return self.mode == 'text'
+
+    def info(self, message):
+        """進度訊息"""
+        if self.mode == 'text':
+            print(message, file=self.stream)
+        elif self.mode != 'quiet':
+            print(message, file=sys.stderr)
+
+    def error(self, message):
+        """錯誤訊息 (quiet 模式仍會輸出)"""
+        print(message, file=self.stream if self.mode == 'text' else sys.stderr)
+
+    def record(self, record):
+        """寫入一筆資料 (text/quiet 模式忽略)"""
+        if self.mode == 'ndjson':
+            self._buffer.write(json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=_json_default))
+            self._buffer.write('\n')
+        elif self.mode == 'csv':
+            if self._csv_writer is None:
+                # 欄位以第一筆資料為準
+                self._csv_writer = csv.DictWriter(self._buffer, fieldnames=list(record), extrasaction='ignore',
+                                                  lineterminator='\n')
+                self._csv_writer.writeheader()
+            self._csv_writer.writerow(record)
+        else:
+            return
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self.flush()
+
+    def records(self, records):
+        for record in records:
+            self.record(record)
+        self.flush()
+
+    def flush(self):
+        """將緩衝的資料列一次寫出"""
+        if self._pending:
+            self.stream.write(self._buffer.getvalue())
+            self.stream.flush()
+            self._buffer.seek(0)
+            self._buffer.truncate()
+            self._pending = 0
@@ -0,0 +1,39 @@
+import cProfile
+import io
+import os
+import pstats
+import tracemalloc
+from contextlib import contextmanager
+
+@contextmanager
+def profile_run(output_dir, top=40):
+    """以 cProfile 與 tracemalloc 記錄一次執行，結果寫入 output_dir
+
+    產出檔案:
+      profile.prof   - cProfile 原始資料 (可用 snakeviz / pstats 開啟)
+      profile.txt    - 依累計時間排序的前 top 名函式
+      memory.txt     - tracemalloc 峰值與配置量前 top 名程式位置
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    profiler = cProfile.Profile()
+    tracemalloc.start(25)
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        profiler.dump_stats(os.path.join(output_dir, 'profile.prof'))
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(top)
+        with open(os.path.join(output_dir, 'profile.txt'), 'w', encoding='utf-8') as f:
+            f.write(stream.getvalue())
+
+        with open(os.path.join(output_dir, 'memory.txt'), 'w', encoding='utf-8') as f:
+            f.write(f"current: {current / 1024 / 1024:.2f} MiB\n")
+            f.write(f"peak: {peak / 1024 / 1024:.2f} MiB\n\n")
+            for stat in snapshot.statistics('lineno')[:top]:
+                f.write(f"{stat}\n")